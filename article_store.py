@@ -0,0 +1,174 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+# Only the fields a details view needs, kept as a tuple per article
+StoredArticle = namedtuple(
+    'StoredArticle',
+    ['title', 'source', 'author', 'publishedAt', 'url', 'description', 'content']
+)
+
+
+def compact_article(article):
+    """
+    Reduce a raw NewsAPI article to the fields served by details requests
+
+    Args:
+        article (dict): Article as returned by NewsAPI
+
+    Returns:
+        StoredArticle: Compact immutable copy of the article
+    """
+    return StoredArticle(
+        title=article.get('title') or 'No title',
+        source=(article.get('source') or {}).get('name') or 'Unknown',
+        author=article.get('author') or 'Unknown',
+        publishedAt=article.get('publishedAt') or 'Unknown',
+        url=article.get('url') or '',
+        description=article.get('description') or '',
+        content=article.get('content') or ''
+    )
+
+
+def article_key(article):
+    """
+    Derive a short id for one version of an article's list view fields
+
+    The key stays the same across listings while the article is unchanged,
+    and changes when any field a listing shows is edited upstream.
+
+    Args:
+        article (StoredArticle): Stored article
+
+    Returns:
+        str: Short hexadecimal article key
+    """
+    fields = (article.url, article.title, article.source, article.author, article.publishedAt)
+    return hashlib.sha1('\0'.join(fields).encode('utf-8')).hexdigest()[:10]
+
+
+def make_result_id(cache_key, articles):
+    """
+    Derive a stable id for one listing
+
+    The id only depends on the query and the content of the articles in
+    it, so every client that receives the same listing gets the same id
+    and clients can use it as a version token for the listing.
+
+    Args:
+        cache_key (tuple): Normalized request key from make_cache_key
+        articles (list): Raw NewsAPI articles in listing order
+
+    Returns:
+        str: Short hexadecimal result-set id
+    """
+    digest = hashlib.sha1(repr(cache_key).encode('utf-8'))
+    for article in articles:
+        for field in compact_article(article):
+            digest.update(b'\0')
+            digest.update(field.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class ArticleStore:
+    """
+    ArticleStore Class - Bounded store of recent headline listings
+
+    Listings are kept by result-set id so details requests can be
+    answered by index without the client shipping the articles back.
+    """
+
+    def __init__(self, max_results=256):
+        """
+        Constructor method - initializes the store
+
+        Args:
+            max_results (int): Number of listings kept before the least
+                recently used one is dropped
+        """
+        self.max_results = max_results
+        self.results = OrderedDict()  # result_id -> tuple of StoredArticle
+        self.lock = threading.Lock()
+
+    def put(self, result_id, articles):
+        """
+        Store a listing unless it is already present
+
+        Args:
+            result_id (str): Result-set id from make_result_id
+            articles (list): Raw NewsAPI articles in listing order
+        """
+        with self.lock:
+            if result_id in self.results:
+                self.results.move_to_end(result_id)
+                return
+
+        compacted = tuple(compact_article(article) for article in articles)
+
+        with self.lock:
+            self.results[result_id] = compacted
+            self.results.move_to_end(result_id)
+            while len(self.results) > self.max_results:
+                self.results.popitem(last=False)
+
+    def touch(self, result_id):
+        """
+        Mark a listing as recently used
+
+        Args:
+            result_id (str): Result-set id
+
+        Returns:
+            bool: True if the listing is still stored
+        """
+        with self.lock:
+            if result_id not in self.results:
+                return False
+            self.results.move_to_end(result_id)
+            return True
+
+    def get(self, result_id, index):
+        """
+        Look up one article of a stored listing
+
+        Args:
+            result_id (str): Result-set id
+            index (int): Position of the article in the listing
+
+        Returns:
+            StoredArticle: The article, or None if the listing expired or
+            the index is out of range
+        """
+        with self.lock:
+            articles = self.results.get(result_id)
+            if articles is None:
+                return None
+            self.results.move_to_end(result_id)
+
+        if 0 <= index < len(articles):
+            return articles[index]
+        return None
+
+    def page(self, result_id, offset, limit):
+        """
+        Slice a window out of a stored listing
+
+        Args:
+            result_id (str): Result-set id
+            offset (int): Index of the first article in the window
+            limit (int): Maximum number of articles in the window
+
+        Returns:
+            tuple: (list of StoredArticle, total articles in the listing),
+            or None if the listing expired
+        """
+        with self.lock:
+            articles = self.results.get(result_id)
+            if articles is None:
+                return None
+            self.results.move_to_end(result_id)
+
+        return list(articles[offset:offset + limit]), len(articles)
+
+    def __len__(self):
+        return len(self.results)
@@ -0,0 +1,123 @@
+import argparse
+import os
+import time
+from article_store import make_result_id
+from cache import make_cache_key
+from protocol import CBORCodec, CODECS, JSONCodec, MsgpackCodec
+from server import NewsServer
+from snapshot_store import SnapshotStore
+
+# Every codec the protocol knows about, installed or not
+ALL_CODECS = [JSONCodec(), MsgpackCodec(), CBORCodec()]
+
+
+def synthetic_listing(size=100):
+    """
+    Build a NewsAPI-shaped listing for when no snapshots are stored yet
+
+    Args:
+        size (int): Number of articles
+
+    Returns:
+        list: Raw NewsAPI articles
+    """
+    return [
+        {
+            'source': {'id': None, 'name': f'Example News {i % 12}'},
+            'author': f'Reporter {i % 30}',
+            'title': f'Headline number {i} about markets, weather and the latest sports results',
+            'description': 'A short summary of the story that NewsAPI returns with each article. ' * 2,
+            'url': f'https://news.example.com/2026/10/16/story-{i}',
+            'urlToImage': f'https://news.example.com/images/{i}.jpg',
+            'publishedAt': f'2026-10-16T{i % 24:02d}:{i % 60:02d}:00Z',
+            'content': 'Body text truncated by NewsAPI after two hundred characters... [+1234 chars]'
+        }
+        for i in range(size)
+    ]
+
+
+def headline_payloads(store_path, page_size):
+    """
+    Build headlines_list responses exactly as the server sends them
+
+    Args:
+        store_path (str): SQLite snapshot store to read listings from
+        page_size (int): Articles per response page
+
+    Returns:
+        tuple: (list of response dicts, description of where they came from)
+    """
+    server = NewsServer(store_path=None, prefetch_interval=0)
+    listings = []
+    if store_path and os.path.exists(store_path):
+        store = SnapshotStore(store_path)
+        for key, data, _ in store.recent_snapshots(max_age=float('inf')):
+            if key[0] == 'top-headlines' and data.get('articles'):
+                listings.append((key, data['articles']))
+        store.close()
+
+    source = f'{len(listings)} stored listings from {store_path}'
+    if not listings:
+        key = make_cache_key('top-headlines', {'country': 'us'})
+        listings = [(key, synthetic_listing())]
+        source = 'a synthetic 100-article listing (no stored snapshots found)'
+
+    payloads = []
+    for key, articles in listings:
+        result_id = make_result_id(key, articles)
+        server.article_store.put(result_id, articles)
+        payloads.append(server.headlines_page(result_id, 0, page_size))
+    server.upstream.close()
+    return payloads, source
+
+
+def time_per_message(function, items, rounds):
+    """Average microseconds per call of function over every item"""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for item in items:
+            function(item)
+    return (time.perf_counter() - started) / (rounds * len(items)) * 1e6
+
+
+def benchmark(payloads, rounds):
+    """
+    Compare size and speed of every codec on the same payloads
+
+    Args:
+        payloads (list): Response dicts to encode
+        rounds (int): Passes over the payloads per measurement
+    """
+    print(f"{'codec':<10}{'avg bytes':>12}{'vs json':>10}{'encode us':>12}{'decode us':>12}")
+    json_size = None
+    for codec in ALL_CODECS:
+        if codec.name not in CODECS:
+            print(f"{codec.name:<10}  skipped (package not installed)")
+            continue
+
+        encoded = [codec.encode(payload) for payload in payloads]
+        assert all(codec.decode(body) == payload for body, payload in zip(encoded, payloads))
+
+        size = sum(len(body) for body in encoded) / len(encoded)
+        if json_size is None:
+            json_size = size
+        encode_time = time_per_message(codec.encode, payloads, rounds)
+        decode_time = time_per_message(codec.decode, encoded, rounds)
+        print(f"{codec.name:<10}{size:>12.0f}{size / json_size:>10.2f}"
+              f"{encode_time:>12.1f}{decode_time:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare wire codecs on headlines_list responses')
+    parser.add_argument('--store', default='news_store.db', help='SQLite snapshot store to read')
+    parser.add_argument('--rounds', type=int, default=200, help='passes over the payloads per timing')
+    args = parser.parse_args()
+
+    for page_size in (15, 100):
+        payloads, source = headline_payloads(args.store, page_size)
+        print(f"\nheadlines_list pages of {page_size} built from {source}")
+        benchmark(payloads, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
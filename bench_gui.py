@@ -0,0 +1,120 @@
+import argparse
+import sys
+import time
+import tkinter as tk
+from tkinter import ttk
+from virtual_list import VirtualList
+
+
+def synthetic_sources(size):
+    """
+    Build sources_list rows shaped like the server's
+
+    Args:
+        size (int): Number of sources
+
+    Returns:
+        list: Source dictionaries
+    """
+    return [
+        {
+            'name': f'Example News {i}',
+            'country': ('us', 'gb', 'ca', 'au', 'de')[i % 5],
+            'category': ('business', 'general', 'health', 'science', 'sports')[i % 5],
+            'language': ('en', 'ar')[i % 2],
+            'url': f'https://news{i}.example.com',
+            'description': 'A source returned by the NewsAPI sources endpoint.'
+        }
+        for i in range(size)
+    ]
+
+
+def describe_source(source, index):
+    """Row text used by the sources view in gui_client.py"""
+    return (f"{index}. {source['name']}",
+            f"Country: {source['country']} | Category: {source['category']} "
+            f"| Language: {source['language']}")
+
+
+def count_widgets(widget):
+    """Number of Tk widgets below widget"""
+    return sum(1 + count_widgets(child) for child in widget.winfo_children())
+
+
+def render_every_row(parent, sources):
+    """Build one frame, two labels and a button per source, as the GUI used to"""
+    canvas = tk.Canvas(parent, bg='#f0f8ff')
+    scrollbar = ttk.Scrollbar(parent, orient="vertical", command=canvas.yview)
+    scrollable_frame = tk.Frame(canvas, bg='#f0f8ff')
+    scrollable_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+    canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
+    canvas.configure(yscrollcommand=scrollbar.set)
+
+    for i, source in enumerate(sources):
+        source_frame = tk.Frame(scrollable_frame, relief=tk.RAISED, borderwidth=1, bg='white',
+                                padx=10, pady=10)
+        source_frame.pack(fill=tk.X, padx=5, pady=5)
+        title, info = describe_source(source, i)
+        tk.Label(source_frame, text=title, font=('Arial', 12, 'bold'), bg='white').pack(anchor=tk.W)
+        tk.Label(source_frame, text=info, font=('Arial', 10), bg='white', fg='#666').pack(anchor=tk.W)
+        ttk.Button(source_frame, text="View Details").pack(anchor=tk.E)
+
+    canvas.pack(side="left", fill="both", expand=True)
+    scrollbar.pack(side="right", fill="y")
+    return canvas
+
+
+def timed(root, function):
+    """Run function and wait for Tk to finish drawing; returns (result, seconds)"""
+    started = time.perf_counter()
+    result = function()
+    root.update()
+    return result, time.perf_counter() - started
+
+
+def scroll_through(root, yview, steps):
+    """Jump through the whole list in equal steps, redrawing after each"""
+    for step in range(steps + 1):
+        yview('moveto', step / steps)
+        root.update_idletasks()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time rendering a long sources list in Tkinter')
+    parser.add_argument('--rows', type=int, default=10000, help='number of rows to render')
+    parser.add_argument('--steps', type=int, default=200, help='scroll positions visited')
+    parser.add_argument('--skip-full', action='store_true',
+                        help='only time the virtualized list (building every row is slow)')
+    args = parser.parse_args()
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"Tk is not available: {e}")
+        sys.exit(1)
+    root.geometry("900x700")
+    sources = synthetic_sources(args.rows)
+    print(f"{'view':<14}{'render s':>10}{'scroll s':>10}{'widgets':>10}")
+
+    frame = tk.Frame(root)
+    frame.pack(fill=tk.BOTH, expand=True)
+    view = VirtualList(frame, describe_source, lambda source, i: None)
+    view.pack(fill=tk.BOTH, expand=True)
+    _, render_time = timed(root, lambda: view.set_items(sources))
+    _, scroll_time = timed(root, lambda: scroll_through(root, view.yview, args.steps))
+    print(f"{'virtualized':<14}{render_time:>10.3f}{scroll_time:>10.3f}{count_widgets(frame):>10}")
+    frame.destroy()
+
+    if not args.skip_full:
+        frame = tk.Frame(root)
+        frame.pack(fill=tk.BOTH, expand=True)
+        canvas, render_time = timed(root, lambda: render_every_row(frame, sources))
+        _, scroll_time = timed(root, lambda: scroll_through(root, canvas.yview, args.steps))
+        print(f"{'every row':<14}{render_time:>10.3f}{scroll_time:>10.3f}{count_widgets(frame):>10}")
+        frame.destroy()
+
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
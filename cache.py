@@ -0,0 +1,206 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(endpoint, params):
+    """
+    Build a hashable cache key from an endpoint and its query parameters
+
+    Values are normalized so that requests differing only in case or
+    surrounding whitespace share one entry.
+
+    Args:
+        endpoint (str): NewsAPI endpoint name, e.g. 'top-headlines'
+        params (dict): Query parameters without the API key
+
+    Returns:
+        tuple: (endpoint, sorted normalized parameter pairs)
+    """
+    normalized = []
+    for name, value in params.items():
+        if isinstance(value, str):
+            value = value.strip().lower()
+        normalized.append((name, value))
+    return (endpoint, tuple(sorted(normalized)))
+
+
+class _InFlight:
+    """Fetch currently running for one key that other callers can wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    TTLCache Class - Thread-safe LRU cache with per-entry expiry
+
+    Concurrent misses for the same key are coalesced: the first caller
+    runs the fetch while the others wait for its result, so N identical
+    requests arriving together cost a single upstream call.
+    """
+
+    def __init__(self, max_entries=512, default_ttl=60):
+        """
+        Constructor method - initializes cache storage
+
+        Args:
+            max_entries (int): Maximum number of entries kept before the
+                least recently used one is evicted
+            default_ttl (float): Lifetime in seconds for entries stored
+                without an explicit ttl
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.entries = OrderedDict()  # key -> (value, expires_at, stored_at)
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key):
+        """
+        Return a fresh cached value
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value, evicting least recently used entries when full
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl (float): Lifetime in seconds, defaults to default_ttl
+        """
+        if ttl is None:
+            ttl = self.default_ttl
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl, time.time())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_stale(self, key):
+        """
+        Return a cached value even if it has expired
+
+        Expired entries stay until evicted, so they can stand in for fresh
+        data while the upstream service cannot be asked.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            tuple: (value, wall-clock time it was stored), or None if the
+            key is not cached
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            return entry[0], entry[2]
+
+    def time_to_live(self, key):
+        """
+        Report how long an entry stays fresh
+
+        Args:
+            key: Cache key
+
+        Returns:
+            float: Seconds until the entry expires (negative once expired),
+            or None if the key is not cached
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            return entry[1] - time.monotonic()
+
+    def invalidate(self, key):
+        """Remove one entry from the cache if present"""
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def get_or_fetch(self, key, fetch, ttl=None):
+        """
+        Return a cached value, fetching it once if missing or expired
+
+        Args:
+            key: Cache key
+            fetch (callable): Zero-argument function producing the value
+            ttl (float): Lifetime in seconds for a newly fetched value
+
+        Returns:
+            The cached or freshly fetched value
+
+        Raises:
+            Exception: Whatever fetch raised; waiting callers see the
+            same error and nothing is cached
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            pending = self.in_flight.get(key)
+            if pending is None:
+                pending = _InFlight()
+                self.in_flight[key] = pending
+                leader = True
+                self.misses += 1
+            else:
+                leader = False
+                self.coalesced += 1
+
+        if not leader:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            pending.value = fetch()
+            self.set(key, pending.value, ttl)
+            return pending.value
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            pending.event.set()
+
+    def stats(self):
+        """
+        Report cache effectiveness counters
+
+        Returns:
+            dict: Entry count, hits, misses and coalesced waits
+        """
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced
+            }
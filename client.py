@@ -1,7 +1,14 @@
+import argparse
 import socket
 import json
+import sys
+from collections import deque
+from contextlib import redirect_stdout
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from client_cache import CachingClient, ClientCache
+from protocol import MAX_IN_FLIGHT, ProtocolError, MultiplexedConnection, client_handshake
 
-class NewsClient:
+class NewsClient(CachingClient):
     """
     NewsClient Class - Handles server communication and user interface
     
@@ -9,20 +16,35 @@ class NewsClient:
     - Encapsulation: Network operations and UI logic are contained within the class
     - Abstraction: Complex socket operations are hidden behind simple methods
     - Modularity: Each method handles a specific aspect of client functionality
+    - Inheritance: Request, cache and listing logic comes from CachingClient,
+      shared with the GUI client
     """
     
-    def __init__(self, host='localhost', port=12345):
+    def __init__(self, host='localhost', port=12345, codec='auto', compression='auto',
+                 request_timeout=30, cache=None):
         """
         Constructor method - initializes client attributes
         
         Args:
             host (str): Server hostname to connect to
             port (int): Server port number
+            codec (str): Wire codec to ask for ('auto', 'json', 'msgpack'
+                or 'cbor'); 'auto' picks the most compact one available
+            compression (str): Compression to ask for ('auto', 'zstd',
+                'zlib' or 'none')
+            request_timeout (float): Seconds send_request waits for a response
+            cache (ClientCache): Local response cache, or None to always
+                ask the server
         """
+        super().__init__(cache=cache, request_timeout=request_timeout, verbose=True)
         self.host = host
         self.port = port
         self.socket = None
         self.username = ""
+        self.preferred_codec = codec
+        self.preferred_compression = compression
+        self.subscriptions = {}  # subscription id -> update callback
+        self.max_in_flight = MAX_IN_FLIGHT
         
     def connect(self):
         """
@@ -37,62 +59,150 @@ class NewsClient:
             
             if not self.username:
                 self.username = input("Enter your username: ")
-            self.socket.send(self.username.encode('utf-8'))
+            welcome, codec, compression = client_handshake(
+                self.socket, self.username, self.preferred_codec, self.preferred_compression
+            )
+            self.max_in_flight = welcome.get('max_in_flight', MAX_IN_FLIGHT)
             
-            print(f"Connected to server as {self.username}")
+            # Responses are matched to requests by stream id from here on
+            self.connection = MultiplexedConnection(
+                self.socket, codec, compression, on_push=self.handle_push
+            )
+            # Ping well within the server's idle timeout while the menu sits unused
+            if welcome.get('idle_timeout'):
+                self.connection.start_heartbeat(welcome['idle_timeout'] / 3)
+            
+            print(f"Connected to server as {self.username} ({codec.name} encoding, "
+                  f"{compression.name if compression else 'no'} compression)")
             return True
             
         except ConnectionRefusedError:
             print("Connection refused. Is the server running?")
             return False
+        except ProtocolError as e:
+            print(f"Handshake failed: {e}")
+            return False
         except Exception as e:
             print(f"Connection failed: {e}")
             return False
     
-    def send_request(self, request_data):
+    def send_batch(self, requests):
         """
-        Send request to server and receive response
+        Send several requests as one batch and receive all responses
         
         Args:
-            request_data (dict): Request data to send
+            requests (list): Request dictionaries, e.g. headlines for
+                every country in the menu
             
         Returns:
-            dict: Server response or None if failed
+            list: One response per request in the same order (failed items
+            are error responses), or None if the batch itself failed
         """
-        try:
-            request_json = json.dumps(request_data)
-            print(f"Sending request: {request_data.get('type', 'unknown')}")
+        response = self.send_request({'type': 'batch', 'requests': requests})
+        if not response or response.get('type') != 'batch_results':
+            return None
+        return response['data']
+    
+    def subscribe(self, callback=None, **filters):
+        """
+        Ask the server to push new headlines matching a filter
+        
+        Args:
+            callback (callable): Called with each headlines_update message
+                on the connection's reader thread; prints them by default
+            **filters: Any of country, category and keyword
             
-            self.socket.send(request_json.encode('utf-8'))
+        Returns:
+            int: Subscription id, or None if the server refused
+        """
+        response = self.send_request({'type': 'subscribe', **filters})
+        if not response or response.get('type') != 'subscribed':
+            if response:
+                print(f"Subscription failed: {response.get('message', 'Unknown error')}")
+            return None
+        
+        self.subscriptions[response['subscription_id']] = callback or self.print_update
+        return response['subscription_id']
+    
+    def unsubscribe(self, subscription_id):
+        """Stop the pushes of one subscription"""
+        self.subscriptions.pop(subscription_id, None)
+        self.send_request({'type': 'unsubscribe', 'subscription_id': subscription_id})
+    
+    def handle_push(self, message):
+        """Route a pushed message to the callback of its subscription"""
+        callback = self.subscriptions.get(message.get('subscription_id'))
+        if callback is not None:
+            callback(message)
+    
+    def print_update(self, message):
+        """Default subscription callback: print the new headlines"""
+        print(f"\n[Live] {len(message['data'])} new headline(s):")
+        for article in message['data']:
+            print(f"  {article['id']}. {article['title']} ({article['source']})")
+    
+    def run_requests(self, requests, out):
+        """
+        Send requests pipelined over one connection and write NDJSON results
+        
+        Up to the server's max_in_flight requests are outstanding at once;
+        results are written in request order as soon as each is available,
+        one {"index", "line", "request", "response"} object per line. Lines
+        that held no valid request get an error record without being sent.
+        
+        Args:
+            requests (iterable): (line number, request, problem) tuples as
+                yielded by read_requests; line is None for a request built
+                from the command line, problem is None for a valid request
+            out (file): Stream the JSON lines are written to
             
-            # Receive response in chunks to handle large data
-            response_data = b""
-            while True:
-                try:
-                    chunk = self.socket.recv(4096)
-                    if not chunk:
-                        break
-                    response_data += chunk
-                    
-                    # Try to parse complete JSON
+        Returns:
+            int: Exit status - 0 if every request succeeded, 1 if any failed,
+            2 if the server could not be reached
+        """
+        if not self.connect():
+            return 2
+        
+        status = 0
+        pending = deque()  # (index, line, request, future) in request order
+        
+        def write_oldest():
+            index, line, request, future = pending.popleft()
+            try:
+                response = future.result(self.request_timeout)
+            except FutureTimeoutError:
+                response = {'type': 'error', 'message': 'Request timeout'}
+            except Exception as e:
+                response = {'type': 'error', 'message': f'Request failed: {e}'}
+            record = {'index': index}
+            if line is not None:
+                record['line'] = line
+            record.update(request=request, response=response)
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            return response.get('type') != 'error'
+        
+        try:
+            for index, (line, request, problem) in enumerate(requests):
+                if len(pending) >= self.max_in_flight and not write_oldest():
+                    status = 1
+                future = Future()
+                if problem is not None:
+                    # Keep the output in step with the input: the bad line
+                    # gets its own error record instead of vanishing
+                    future.set_result({'type': 'error', 'message': problem})
+                else:
                     try:
-                        response = json.loads(response_data.decode('utf-8'))
-                        print(f"Received response: {response.get('type', 'unknown')}")
-                        return response
-                    except json.JSONDecodeError:
-                        # Continue receiving if JSON is incomplete
-                        continue
-                        
-                except socket.timeout:
-                    print("Request timeout")
-                    break
-                    
-        except ConnectionResetError:
-            print("Connection lost")
-            return None
-        except Exception as e:
-            print(f"Request failed: {e}")
-            return None
+                        future = self.submit(request)
+                    except Exception as e:
+                        future.set_exception(e)
+                pending.append((index, line, request, future))
+            while pending:
+                if not write_oldest():
+                    status = 1
+        finally:
+            self.connection.close()
+        return status
     
     def display_main_menu(self):
         """Display main menu with enhanced formatting"""
@@ -181,7 +291,7 @@ class NewsClient:
         elif option == '4':
             print("\nLISTING ALL HEADLINES")
             
-        response = self.send_request(request_data)
+        response = self.request_headlines(request_data)
         if response:
             if response.get('type') == 'error':
                 print(f"Error: {response.get('message', 'Unknown error')}")
@@ -189,40 +299,63 @@ class NewsClient:
                 self.display_headlines_list(response)
     
     def display_headlines_list(self, response):
-        """Display headlines with enhanced formatting"""
-        print("\n" + "="*80)
-        print("HEADLINES RESULTS")
-        print("="*80)
-        
-        articles = response.get('data', [])
-        
-        if not articles:
-            print("No headlines found")
-            return
-        
-        for article in articles:
-            print(f"\n{article['id']}. {article['title']}")
-            print(f"   Source: {article['source']} | Author: {article['author']}")
-            print("-" * 80)
-        
-        print(f"\nTotal: {len(articles)} headlines")
-        print("="*80)
-        
+        """Display headlines one page at a time, fetching later pages on demand"""
         while True:
-            choice = input("\nEnter article number for details (or 'back' to return): ").strip().lower()
+            print("\n" + "="*80)
+            print(f"HEADLINES RESULTS - PAGE {response.get('page', 1)}")
+            if response.get('stale'):
+                print("(News service unavailable - showing last saved results)")
+            print("="*80)
             
-            if choice == 'back':
-                break
+            articles = response.get('data', [])
             
-            try:
-                article_id = int(choice)
-                if 0 <= article_id < len(articles):
-                    self.request_article_details(article_id, response.get('full_data', []))
-                    break
-                else:
-                    print(f"Invalid article number. Please enter 0-{len(articles)-1}")
-            except ValueError:
-                print("Please enter a valid number or 'back'")
+            if not articles:
+                print("No headlines found")
+                return
+            
+            for article in articles:
+                print(f"\n{article['id']}. {article['title']}")
+                print(f"   Source: {article['source']} | Author: {article['author']}")
+                print("-" * 80)
+            
+            total = response.get('total', len(articles))
+            first_id = articles[0]['id']
+            last_id = articles[-1]['id']
+            next_cursor = response.get('next_cursor')
+            print(f"\nShowing {first_id}-{last_id} of {total} headlines")
+            print("="*80)
+            
+            prompt = "\nEnter article number for details"
+            if next_cursor:
+                prompt += ", 'next' for more"
+            prompt += " (or 'back' to return): "
+            
+            while True:
+                choice = input(prompt).strip().lower()
+                
+                if choice == 'back':
+                    return
+                
+                if choice == 'next' and next_cursor:
+                    next_page = self.send_request({'type': 'headlines', 'cursor': next_cursor})
+                    if next_page and next_page.get('type') == 'headlines_list':
+                        response = next_page
+                        break
+                    if next_page and next_page.get('type') == 'error':
+                        print(f"Error: {next_page['message']}")
+                    else:
+                        print("Failed to retrieve the next page.")
+                    continue
+                
+                try:
+                    article_id = int(choice)
+                    if first_id <= article_id <= last_id:
+                        self.request_article_details(article_id, response.get('result_id'))
+                        return
+                    else:
+                        print(f"Invalid article number. Please enter {first_id}-{last_id}")
+                except ValueError:
+                    print("Please enter a valid number or 'back'")
     
     def handle_sources_request(self, sources_type):
         """Handle sources requests with enhanced user interaction"""
@@ -289,40 +422,63 @@ class NewsClient:
             print("Failed to retrieve sources.")
     
     def display_sources_list(self, response):
-        """Display sources with enhanced formatting"""
-        print("\n" + "="*80)
-        print("NEWS SOURCES")
-        print("="*80)
-        
-        sources = response.get('data', [])
-        
-        if not sources:
-            print("No sources found")
-            return
-        
-        for i, source in enumerate(sources):
-            print(f"\n{i}. {source['name']}")
-            print(f"   {source['country']} | {source['category']} | {source['language']}")
-            print("-" * 80)
-        
-        print(f"\nTotal: {len(sources)} sources")
-        print("="*80)
-        
+        """Display sources one page at a time, fetching later pages on demand"""
         while True:
-            choice = input("\nEnter source number for details (or 'back' to return): ").strip().lower()
+            print("\n" + "="*80)
+            print(f"NEWS SOURCES - PAGE {response.get('page', 1)}")
+            if response.get('stale'):
+                print("(News service unavailable - showing last saved results)")
+            print("="*80)
             
-            if choice == 'back':
-                break
+            sources = response.get('data', [])
             
-            try:
-                source_id = int(choice)
-                if 0 <= source_id < len(sources):
-                    self.display_source_details(sources[source_id])
-                    break
-                else:
-                    print(f"Invalid source number. Please enter 0-{len(sources)-1}")
-            except ValueError:
-                print("Please enter a valid number or 'back'")
+            if not sources:
+                print("No sources found")
+                return
+            
+            offset = response.get('offset', 0)
+            for i, source in enumerate(sources, offset):
+                print(f"\n{i}. {source['name']}")
+                print(f"   {source['country']} | {source['category']} | {source['language']}")
+                print("-" * 80)
+            
+            total = response.get('total', len(sources))
+            last = offset + len(sources) - 1
+            next_cursor = response.get('next_cursor')
+            print(f"\nShowing {offset}-{last} of {total} sources")
+            print("="*80)
+            
+            prompt = "\nEnter source number for details"
+            if next_cursor:
+                prompt += ", 'next' for more"
+            prompt += " (or 'back' to return): "
+            
+            while True:
+                choice = input(prompt).strip().lower()
+                
+                if choice == 'back':
+                    return
+                
+                if choice == 'next' and next_cursor:
+                    next_page = self.send_request({'type': 'sources', 'cursor': next_cursor})
+                    if next_page and next_page.get('type') == 'sources_list':
+                        response = next_page
+                        break
+                    if next_page and next_page.get('type') == 'error':
+                        print(f"Error: {next_page['message']}")
+                    else:
+                        print("Failed to retrieve the next page.")
+                    continue
+                
+                try:
+                    source_id = int(choice)
+                    if offset <= source_id <= last:
+                        self.display_source_details(sources[source_id - offset])
+                        return
+                    else:
+                        print(f"Invalid source number. Please enter {offset}-{last}")
+                except ValueError:
+                    print("Please enter a valid number or 'back'")
     
     def display_source_details(self, source):
         """Display detailed source information"""
@@ -337,12 +493,14 @@ class NewsClient:
         print(f"Description: {source['description']}")
         print("="*80)
 
-    def request_article_details(self, article_id, full_data=None):
-        """Request and display article details"""
+    def request_article_details(self, article_id, result_id=None):
+        """Request and display article details from the server's stored listing"""
         request_data = {
             'type': 'details',
             'article_id': article_id
         }
+        if result_id:
+            request_data['result_id'] = result_id
         
         response = self.send_request(request_data)
         
@@ -375,7 +533,9 @@ class NewsClient:
         print("Starting News Client...")
         
         if not self.connect():
-            return
+            if self.cache is None or not len(self.cache):
+                return
+            print("Working offline - only cached results are available")
             
         try:
             while True:
@@ -410,13 +570,118 @@ class NewsClient:
         except KeyboardInterrupt:
             print("\nClient shutdown requested")
         finally:
-            if self.socket:
+            if self.connection:
                 try:
-                    self.socket.close()
+                    self.connection.close()
                     print("Connection closed")
                 except:
                     pass
+            if self.cache is not None:
+                self.cache.close()
+
+def open_requests(path):
+    """
+    Open a requests file ('-' for stdin) before anything is sent
+    
+    Args:
+        path (str): File such as requests.jsonl
+        
+    Returns:
+        file: Open text stream
+        
+    Raises:
+        OSError: If the file cannot be opened
+    """
+    return sys.stdin if path == '-' else open(path, encoding='utf-8')
+
+def read_requests(stream):
+    """
+    Read one JSON request per line from an open stream
+    
+    Args:
+        stream (file): Stream returned by open_requests, closed when done
+        
+    Yields:
+        tuple: (line number, request, problem) - problem is None for a
+        valid request; for a malformed line request is None and problem
+        says what is wrong with it. Blank lines are skipped.
+    """
+    try:
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                yield number, None, f'Line {number} skipped, not JSON ({e})'
+                continue
+            if not isinstance(request, dict):
+                yield number, None, f'Line {number} skipped, not a JSON object'
+                continue
+            yield number, request, None
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def request_from_args(args):
+    """Build the single request described by the command-line options"""
+    request = {'type': args.type}
+    for name in ('country', 'category', 'keyword', 'language', 'result_id',
+                 'article_id', 'page', 'page_size'):
+        value = getattr(args, name)
+        if value is not None:
+            request[name] = value
+    return request
 
 if __name__ == "__main__":
-    client = NewsClient()
+    parser = argparse.ArgumentParser(
+        description='News Service client. Without a request type or --requests the '
+                    'interactive menus are shown; otherwise responses are printed as NDJSON.'
+    )
+    parser.add_argument('type', nargs='?', choices=['headlines', 'sources', 'details', 'stats'],
+                        help='send one request of this type and print the response')
+    parser.add_argument('--country')
+    parser.add_argument('--category')
+    parser.add_argument('--keyword')
+    parser.add_argument('--language')
+    parser.add_argument('--result-id')
+    parser.add_argument('--article-id', type=int)
+    parser.add_argument('--page', type=int)
+    parser.add_argument('--page-size', type=int)
+    parser.add_argument('--requests', metavar='FILE',
+                        help="send every JSON request in FILE (one per line, '-' for stdin) pipelined")
+    parser.add_argument('--username', help='username for non-interactive runs (default: cli)')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=12345)
+    parser.add_argument('--cache', action='store_true',
+                        help='answer repeated requests from a local cache')
+    parser.add_argument('--cache-file', default=None,
+                        help='SQLite file that keeps the cache between runs (implies --cache)')
+    parser.add_argument('--cache-ttl', type=float, default=60,
+                        help='seconds a cached response is used without asking the server')
+    args = parser.parse_args()
+    
+    cache = None
+    if args.cache or args.cache_file:
+        cache = ClientCache(ttl=args.cache_ttl, path=args.cache_file)
+    client = NewsClient(args.host, args.port, cache=cache)
+    
+    if args.type or args.requests:
+        if args.requests:
+            # Fail before connecting, not after the handshake
+            try:
+                requests = read_requests(open_requests(args.requests))
+            except OSError as e:
+                print(f"Cannot read requests from {args.requests}: {e.strerror or e}", file=sys.stderr)
+                sys.exit(2)
+        else:
+            requests = [(None, request_from_args(args), None)]
+        client.username = args.username or 'cli'
+        # Only the JSON lines go to stdout; progress messages go to stderr
+        out = sys.stdout
+        with redirect_stdout(sys.stderr):
+            sys.exit(client.run_requests(requests, out))
+    
+    if args.username:
+        client.username = args.username
     client.run()
@@ -0,0 +1,312 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from protocol import merge_headlines_delta
+
+# Request types whose responses only depend on the request
+CACHEABLE_TYPES = ('headlines', 'sources', 'details')
+CACHED_RESPONSE_TYPES = ('headlines_list', 'sources_list', 'article_details')
+
+# Headline listings remembered so repeated requests only fetch changes
+MAX_LISTINGS = 32
+
+
+def request_key(request):
+    """
+    Build the cache key of a request
+
+    Args:
+        request (dict): Request data; a 'since' version token is ignored
+
+    Returns:
+        str: Canonical JSON of the request, or None if not cacheable
+    """
+    if request.get('type') not in CACHEABLE_TYPES:
+        return None
+    # Without a result_id the server can only answer with an error
+    if request['type'] == 'details' and not request.get('result_id'):
+        return None
+    return json.dumps({name: value for name, value in request.items() if name != 'since'},
+                      sort_keys=True)
+
+
+class ClientCache:
+    """
+    ClientCache Class - Local cache of server responses for NewsClient
+
+    Fresh entries are answered without a round trip. Entries past their
+    TTL but inside the stale window are still answered at once while the
+    client refreshes them in the background (stale-while-revalidate).
+    Older entries are only used when the server cannot be reached. With
+    a path, entries are also kept in SQLite so they survive a restart.
+    """
+
+    def __init__(self, ttl=60, stale_ttl=600, max_entries=128, path=None):
+        """
+        Constructor method - initializes the cache and loads saved entries
+
+        Args:
+            ttl (float): Seconds an entry is answered without contacting
+                the server
+            stale_ttl (float): Further seconds an entry is answered while
+                it is refreshed in the background
+            max_entries (int): Entries kept before the least recently used
+                one is dropped
+            path (str): SQLite file to persist entries in, or None to keep
+                them in memory only
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (response, stored_at)
+        self.lock = threading.Lock()
+        self.connection = None
+
+        if path:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'request TEXT PRIMARY KEY, body TEXT NOT NULL, stored_at REAL NOT NULL)'
+            )
+            self.connection.commit()
+            rows = self.connection.execute(
+                'SELECT request, body, stored_at FROM responses ORDER BY stored_at DESC LIMIT ?',
+                (max_entries,)
+            ).fetchall()
+            for key, body, stored_at in reversed(rows):
+                self.entries[key] = (json.loads(body), stored_at)
+
+    def lookup(self, request):
+        """
+        Find a cached response for a request
+
+        Args:
+            request (dict): Request data
+
+        Returns:
+            tuple: (response, state) where state is 'fresh', 'stale' or
+            'expired', or None if nothing is cached
+        """
+        key = request_key(request)
+        if key is None:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+
+        response, stored_at = entry
+        age = time.time() - stored_at
+        if age < self.ttl:
+            return response, 'fresh'
+        if age < self.ttl + self.stale_ttl:
+            return response, 'stale'
+        return response, 'expired'
+
+    def store(self, request, response):
+        """
+        Remember a successful response
+
+        Args:
+            request (dict): Request data
+            response (dict): Full response; other types, and responses the
+                server marked stale (served from its own old copy), are ignored
+        """
+        key = request_key(request)
+        if key is None or response.get('type') not in CACHED_RESPONSE_TYPES or response.get('stale'):
+            return
+
+        now = time.time()
+        with self.lock:
+            self.entries[key] = (response, now)
+            self.entries.move_to_end(key)
+            evicted = []
+            while len(self.entries) > self.max_entries:
+                evicted.append(self.entries.popitem(last=False)[0])
+
+            if self.connection is not None:
+                try:
+                    self.connection.execute(
+                        'INSERT OR REPLACE INTO responses (request, body, stored_at) VALUES (?, ?, ?)',
+                        (key, json.dumps(response), now)
+                    )
+                    self.connection.executemany(
+                        'DELETE FROM responses WHERE request = ?', [(old,) for old in evicted]
+                    )
+                    self.connection.commit()
+                except sqlite3.Error as e:
+                    print(f"Could not save cached response: {e}")
+
+    def __len__(self):
+        return len(self.entries)
+
+    def close(self):
+        """Close the database connection, if any"""
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+
+class CachingClient:
+    """
+    CachingClient Class - Request logic shared by the CLI and GUI clients
+
+    Sends requests over the client's MultiplexedConnection, answers them
+    from a ClientCache when it has one, and remembers recent headline
+    listings so asking again only transfers what changed. Subclasses
+    open the connection and set self.connection.
+    """
+
+    def __init__(self, cache=None, request_timeout=30, verbose=False):
+        """
+        Constructor method - initializes request state
+
+        Args:
+            cache (ClientCache): Local response cache, or None to always
+                ask the server
+            request_timeout (float): Seconds send_request waits for a response
+            verbose (bool): Print every request sent and response received
+        """
+        self.connection = None
+        self.cache = cache
+        self.request_timeout = request_timeout
+        self.verbose = verbose
+        self.listings = OrderedDict()  # request -> last headlines_list response
+
+    def submit(self, request_data):
+        """
+        Send a request without waiting for its response
+
+        Several requests can be in flight at once; the server may answer
+        them in any order and each Future gets its own response.
+
+        Args:
+            request_data (dict): Request data to send
+
+        Returns:
+            concurrent.futures.Future: Resolves to the server response
+        """
+        return self.connection.submit(request_data)
+
+    def request_headlines(self, request_data):
+        """
+        Request a headlines listing, receiving only changes if seen before
+
+        The result_id of the last listing for the same request is sent as
+        'since'; the server answers not_modified or a delta that is merged
+        into the remembered listing here.
+
+        Args:
+            request_data (dict): Headlines request data
+
+        Returns:
+            dict: Full headlines_list (or error) response, or None if failed
+        """
+        listing_key = json.dumps(request_data, sort_keys=True)
+        previous = self.listings.get(listing_key)
+
+        request = dict(request_data)
+        if previous:
+            request['since'] = previous['result_id']
+        response = self.send_request(request)
+
+        if response and response.get('type') == 'not_modified':
+            response = previous
+        elif response and response.get('type') == 'headlines_delta':
+            try:
+                response = merge_headlines_delta(previous, response)
+            except ValueError:
+                response = self.send_request(request_data)
+
+        if response and response.get('type') == 'headlines_list':
+            if self.cache is not None:
+                self.cache.store(request_data, response)
+            self.listings[listing_key] = response
+            self.listings.move_to_end(listing_key)
+            while len(self.listings) > MAX_LISTINGS:
+                self.listings.popitem(last=False)
+        return response
+
+    def revalidate(self, request_data, cached):
+        """
+        Refresh a stale cache entry in the background, sending only what changed
+
+        Args:
+            request_data (dict): Request whose entry is refreshed
+            cached (dict): Response currently cached for it
+        """
+        request = {name: value for name, value in request_data.items() if name != 'since'}
+        if cached.get('type') == 'headlines_list':
+            request['since'] = cached['result_id']
+
+        def remember(future):
+            try:
+                response = future.result()
+            except Exception:
+                return
+            if response.get('type') == 'not_modified':
+                response = cached
+            elif response.get('type') == 'headlines_delta':
+                try:
+                    response = merge_headlines_delta(cached, response)
+                except ValueError:
+                    return
+            self.cache.store(request_data, response)
+
+        try:
+            self.submit(request).add_done_callback(remember)
+        except Exception:
+            pass
+
+    def send_request(self, request_data):
+        """
+        Send request to server and receive response
+
+        With a cache, fresh entries are answered locally, stale ones are
+        answered locally and refreshed in the background, and any cached
+        entry is returned marked 'stale' when the server cannot be reached.
+
+        Args:
+            request_data (dict): Request data to send
+
+        Returns:
+            dict: Server response or None if failed
+        """
+        cached = self.cache.lookup(request_data) if self.cache is not None else None
+        if cached and (cached[1] == 'fresh' or (cached[1] == 'stale' and self.connection)):
+            if self.verbose:
+                print(f"Using cached response: {cached[0].get('type', 'unknown')}")
+            if cached[1] == 'stale':
+                self.revalidate(request_data, cached[0])
+            return cached[0]
+
+        try:
+            if self.connection is None:
+                raise ConnectionError("not connected")
+            if self.verbose:
+                print(f"Sending request: {request_data.get('type', 'unknown')}")
+            # Other requests may be in flight on the same connection
+            response = self.submit(request_data).result(self.request_timeout)
+
+            if self.verbose:
+                print(f"Received response: {response.get('type', 'unknown')}")
+            if self.cache is not None:
+                self.cache.store(request_data, response)
+            return response
+
+        except FutureTimeoutError:
+            print("Request timeout")
+        except ConnectionError:
+            print("Connection lost")
+        except Exception as e:
+            print(f"Request failed: {e}")
+
+        # Offline: fall back to whatever was cached, however old
+        if cached:
+            return dict(cached[0], stale=True)
+        return None
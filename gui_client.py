@@ -1,12 +1,24 @@
+import argparse
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, simpledialog
-import json
 import socket
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from client_cache import CachingClient, ClientCache
+from protocol import MultiplexedConnection, client_handshake
+from virtual_list import VirtualList
 
-class NewsClient:
+# Default file for --cache-file, which keeps responses between runs so
+# reopening the window shows results at once
+CACHE_FILE = 'news_client_cache.db'
+
+# How often the Tk loop checks whether a background request has finished
+POLL_INTERVAL_MS = 50
+
+class NewsClient(CachingClient):
     
-    def __init__(self, host='localhost', port=12345):
+    def __init__(self, host='localhost', port=12345, cache=None):
+        super().__init__(cache=cache, request_timeout=10)
         self.host = host
         self.port = port
         self.socket = None
@@ -19,47 +31,27 @@ class NewsClient:
             self.socket.settimeout(10)
             self.socket.connect((self.host, self.port))
             
-            # Send username to server
-            if self.username:
-                self.socket.send(self.username.encode('utf-8'))
+            # Send username to server and wait for the framing handshake
+            welcome, codec, compression = client_handshake(self.socket, self.username)
+            self.connection = MultiplexedConnection(self.socket, codec, compression)
+            
+            # Keep the connection while the window is open but nobody clicks
+            if welcome.get('idle_timeout'):
+                self.connection.start_heartbeat(welcome['idle_timeout'] / 3)
             
             return True
         except Exception as e:
             print(f"Connection failed: {e}")
             return False
-    
-    def send_request(self, request_data):
-        """Send request to server and return response"""
-        try:
-            request_json = json.dumps(request_data)
-            self.socket.send(request_json.encode('utf-8'))
-            
-            # Receive response
-            response_data = b""
-            while True:
-                try:
-                    chunk = self.socket.recv(4096)
-                    if not chunk:
-                        break
-                    response_data += chunk
-                    
-                    # Try to parse complete JSON
-                    try:
-                        response = json.loads(response_data.decode('utf-8'))
-                        return response
-                    except json.JSONDecodeError:
-                        continue
-                        
-                except socket.timeout:
-                    break
-                    
-        except Exception as e:
-            print(f"Request failed: {e}")
-            return None
 
 class NewsClientGUI:
-    def __init__(self):
+    def __init__(self, cache_file=None, use_cache=False, cache_ttl=60):
         self.client = None
+        
+        # Local response cache settings; off unless asked for
+        self.cache_file = cache_file
+        self.use_cache = use_cache or bool(cache_file)
+        self.cache_ttl = cache_ttl
         self.root = tk.Tk()
         self.root.title("News Service System - ITNE352 Project")
         self.root.geometry("900x700")
@@ -69,10 +61,20 @@ class NewsClientGUI:
         self.setup_styles()
         
         # Data storage
-        self.current_articles = []
+        self.current_result_id = None
+        self.current_headlines = []
+        self.headlines_cursor = None
+        self.headlines_total = 0
         self.current_sources = []
+        self.sources_cursor = None
+        self.sources_total = 0
         self.connected = False
         
+        # Requests run on worker threads so a slow server never freezes the window
+        self.worker = ThreadPoolExecutor(max_workers=4, thread_name_prefix='gui-request')
+        self.view_id = 0  # bumped whenever a pending response stops being wanted
+        self.progress = None
+        
     def setup_styles(self):
         """Setup custom styles for the GUI"""
         self.style = ttk.Style()
@@ -136,11 +138,74 @@ class NewsClientGUI:
         dialog.wait_window()
         return self.connection_result
     
+    def clear_window(self):
+        """Remove the current screen; responses still pending for it are dropped"""
+        self.view_id += 1
+        self.progress = None
+        for widget in self.root.winfo_children():
+            widget.destroy()
+    
+    def run_in_background(self, work, on_done, message="Loading..."):
+        """
+        Run a blocking request on a worker thread and hand its result to the UI
+        
+        Only the most recent request is delivered: a newer request, Cancel,
+        or leaving the screen drops the result when it arrives.
+        
+        Args:
+            work (callable): Blocking call run off the Tk thread
+            on_done (callable): Called on the Tk thread with work's result
+            message (str): Text shown next to the progress bar
+        """
+        self.view_id += 1
+        view_id = self.view_id
+        future = self.worker.submit(work)
+        self.show_progress(message)
+        
+        def poll():
+            if view_id != self.view_id:
+                return
+            if not future.done():
+                self.root.after(POLL_INTERVAL_MS, poll)
+                return
+            
+            self.hide_progress()
+            try:
+                result = future.result()
+            except Exception as e:
+                messagebox.showerror("Error", f"Request failed: {e}")
+                return
+            on_done(result)
+        
+        self.root.after(POLL_INTERVAL_MS, poll)
+    
+    def show_progress(self, message):
+        """Show a progress bar with a Cancel button over the bottom of the window"""
+        self.hide_progress()
+        self.progress = tk.Frame(self.root, bg='white', relief=tk.RAISED, borderwidth=1, padx=10, pady=6)
+        self.progress.place(relx=0.5, rely=1.0, anchor=tk.S, y=-10)
+        
+        ttk.Label(self.progress, text=message, background='white').pack(side=tk.LEFT, padx=(0, 10))
+        bar = ttk.Progressbar(self.progress, mode='indeterminate', length=200)
+        bar.pack(side=tk.LEFT)
+        bar.start(10)
+        ttk.Button(self.progress, text="Cancel", command=self.cancel_request).pack(side=tk.LEFT, padx=(10, 0))
+    
+    def hide_progress(self):
+        """Remove the progress bar, if shown"""
+        if self.progress is not None:
+            self.progress.destroy()
+            self.progress = None
+    
+    def cancel_request(self):
+        """Stop waiting for the pending request; its response is ignored"""
+        self.view_id += 1
+        self.hide_progress()
+    
     def create_main_window(self):
         """Create the main application window"""
         # Clear window
-        for widget in self.root.winfo_children():
-            widget.destroy()
+        self.clear_window()
             
         # Main frame
         main_frame = tk.Frame(self.root, bg='#f0f8ff')
@@ -160,6 +225,10 @@ class NewsClientGUI:
             status_text = f"Connected: {self.client.username}"
             status_label = ttk.Label(main_frame, text=status_text, style='Heading.TLabel')
             status_label.pack(pady=(0, 30))
+        elif self.client:
+            status_label = ttk.Label(main_frame, text="Offline: showing cached results",
+                                     style='Heading.TLabel')
+            status_label.pack(pady=(0, 30))
         
         # Menu buttons frame
         button_frame = tk.Frame(main_frame, bg='#f0f8ff')
@@ -179,8 +248,7 @@ class NewsClientGUI:
     def show_headlines_menu(self):
         """Show headlines menu"""
         # Clear window
-        for widget in self.root.winfo_children():
-            widget.destroy()
+        self.clear_window()
             
         # Main frame
         main_frame = tk.Frame(self.root, bg='#f0f8ff')
@@ -212,8 +280,7 @@ class NewsClientGUI:
     def show_sources_menu(self):
         """Show sources menu"""
         # Clear window
-        for widget in self.root.winfo_children():
-            widget.destroy()
+        self.clear_window()
             
         # Main frame
         main_frame = tk.Frame(self.root, bg='#f0f8ff')
@@ -372,33 +439,50 @@ class NewsClientGUI:
         dialog.wait_window()
         return result
     
-    def send_request_and_display(self, request_data, request_type):
-        """Send request to server and display results"""
+    def send_request_and_display(self, request_data, request_type, append=False):
+        """Send request to server in the background and display results"""
         if not self.client:
             messagebox.showerror("Error", "Not connected to server")
             return
-            
+        
+        # Repeated listings only transfer what changed since the last view
+        if request_type == 'headlines' and not append:
+            work = lambda: self.client.request_headlines(request_data)
+        else:
+            work = lambda: self.client.send_request(request_data)
+        
+        self.run_in_background(
+            work,
+            lambda response: self.display_response(response, request_type, append),
+            f"Loading {request_type}..."
+        )
+    
+    def display_response(self, response, request_type, append=False):
+        """Display a response received for send_request_and_display"""
         try:
-            response = self.client.send_request(request_data)
-            
             if response:
                 if response.get('type') == 'error':
                     messagebox.showerror("Server Error", response.get('message', 'Unknown error'))
                 elif request_type == 'headlines':
-                    self.display_headlines(response)
+                    self.display_headlines(response, append)
                 elif request_type == 'sources':
-                    self.display_sources(response)
+                    self.display_sources(response, append)
             else:
                 messagebox.showerror("Connection Error", "Failed to get response from server")
                 
         except Exception as e:
             messagebox.showerror("Error", f"Request failed: {e}")
     
-    def display_headlines(self, response):
-        """Display headlines results"""
+    def display_headlines(self, response, append=False):
+        """
+        Display headlines results
+        
+        Args:
+            response (dict): headlines_list response
+            append (bool): Add this page to the rows already shown
+        """
         # Clear window
-        for widget in self.root.winfo_children():
-            widget.destroy()
+        self.clear_window()
             
         # Main frame
         main_frame = tk.Frame(self.root, bg='#f0f8ff')
@@ -406,10 +490,19 @@ class NewsClientGUI:
         
         # Title
         ttk.Label(main_frame, text="Headlines Results", style='Title.TLabel').pack(pady=(0, 20))
+        if response.get('stale'):
+            ttk.Label(main_frame, text="News service unavailable - showing last saved results",
+                     style='Info.TLabel').pack(pady=(0, 10))
         
-        # Get articles
-        articles = response.get('data', [])
-        self.current_articles = response.get('full_data', [])
+        # Get articles, keeping earlier pages when loading more
+        if append:
+            self.current_headlines.extend(response.get('data', []))
+        else:
+            self.current_headlines = list(response.get('data', []))
+        articles = self.current_headlines
+        self.current_result_id = response.get('result_id')
+        self.headlines_cursor = response.get('next_cursor')
+        self.headlines_total = response.get('total', len(articles))
         
         if not articles:
             ttk.Label(main_frame, text="No headlines found", style='Heading.TLabel').pack(expand=True)
@@ -417,61 +510,44 @@ class NewsClientGUI:
                       style='Custom.TButton').pack(pady=20)
             return
         
-        # Results frame with scrollbar
-        results_frame = tk.Frame(main_frame, bg='#f0f8ff')
-        results_frame.pack(fill=tk.BOTH, expand=True)
-        
-        canvas = tk.Canvas(results_frame, bg='#f0f8ff')
-        scrollbar = ttk.Scrollbar(results_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg='#f0f8ff')
-        
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+        # Only the rows in view get widgets, however long the listing is
+        results = VirtualList(
+            main_frame,
+            describe=lambda article, i: (f"{article['id']}. {article['title']}",
+                                         f"Source: {article['source']} | Author: {article['author']}"),
+            on_select=lambda article, i: self.show_article_details(article['id'])
         )
-        
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        # Display articles
-        for i, article in enumerate(articles):
-            article_frame = tk.Frame(scrollable_frame, relief=tk.RAISED, 
-                                   borderwidth=1, bg='white', padx=10, pady=10)
-            article_frame.pack(fill=tk.X, padx=5, pady=5)
-            
-            # Article title
-            title_label = tk.Label(article_frame, text=f"{i}. {article['title']}", 
-                                  font=('Arial', 12, 'bold'), bg='white', 
-                                  wraplength=700, justify=tk.LEFT)
-            title_label.pack(anchor=tk.W, pady=(0, 5))
-            
-            # Article info
-            info_text = f"Source: {article['source']} | Author: {article['author']}"
-            info_label = tk.Label(article_frame, text=info_text, 
-                                 font=('Arial', 10), bg='white', fg='#666')
-            info_label.pack(anchor=tk.W, pady=(0, 10))
-            
-            # Details button
-            ttk.Button(article_frame, text="View Details", 
-                      command=lambda idx=i: self.show_article_details(idx)).pack(anchor=tk.E)
-        
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        results.pack(fill=tk.BOTH, expand=True)
+        results.set_items(articles)
         
         # Bottom frame with info and back button
         bottom_frame = tk.Frame(main_frame, bg='#f0f8ff')
         bottom_frame.pack(fill=tk.X, pady=20)
         
-        ttk.Label(bottom_frame, text=f"Total: {len(articles)} headlines", 
+        ttk.Label(bottom_frame, text=f"Showing {len(articles)} of {self.headlines_total} headlines", 
                  style='Info.TLabel').pack(side=tk.LEFT)
         ttk.Button(bottom_frame, text="Back to Headlines Menu", 
                   command=self.show_headlines_menu, style='Custom.TButton').pack(side=tk.RIGHT)
+        if self.headlines_cursor:
+            ttk.Button(bottom_frame, text="Load More", 
+                      command=self.load_more_headlines, style='Custom.TButton').pack(side=tk.RIGHT, padx=10)
     
-    def display_sources(self, response):
-        """Display sources results"""
+    def load_more_headlines(self):
+        """Fetch the next page of the current headlines listing"""
+        if self.headlines_cursor:
+            request_data = {'type': 'headlines', 'cursor': self.headlines_cursor}
+            self.send_request_and_display(request_data, 'headlines', append=True)
+    
+    def display_sources(self, response, append=False):
+        """
+        Display sources results
+        
+        Args:
+            response (dict): sources_list response
+            append (bool): Add this page to the rows already shown
+        """
         # Clear window
-        for widget in self.root.winfo_children():
-            widget.destroy()
+        self.clear_window()
             
         # Main frame
         main_frame = tk.Frame(self.root, bg='#f0f8ff')
@@ -479,10 +555,18 @@ class NewsClientGUI:
         
         # Title
         ttk.Label(main_frame, text="Sources Results", style='Title.TLabel').pack(pady=(0, 20))
+        if response.get('stale'):
+            ttk.Label(main_frame, text="News service unavailable - showing last saved results",
+                     style='Info.TLabel').pack(pady=(0, 10))
         
-        # Get sources
-        sources = response.get('data', [])
-        self.current_sources = sources
+        # Get sources, keeping earlier pages when loading more
+        if append:
+            self.current_sources.extend(response.get('data', []))
+        else:
+            self.current_sources = list(response.get('data', []))
+        sources = self.current_sources
+        self.sources_cursor = response.get('next_cursor')
+        self.sources_total = response.get('total', len(sources))
         
         if not sources:
             ttk.Label(main_frame, text="No sources found", style='Heading.TLabel').pack(expand=True)
@@ -490,62 +574,47 @@ class NewsClientGUI:
                       style='Custom.TButton').pack(pady=20)
             return
         
-        # Results frame with scrollbar
-        results_frame = tk.Frame(main_frame, bg='#f0f8ff')
-        results_frame.pack(fill=tk.BOTH, expand=True)
-        
-        canvas = tk.Canvas(results_frame, bg='#f0f8ff')
-        scrollbar = ttk.Scrollbar(results_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg='#f0f8ff')
-        
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+        # Only the rows in view get widgets, however many sources there are
+        results = VirtualList(
+            main_frame,
+            describe=lambda source, i: (f"{i}. {source['name']}",
+                                        f"Country: {source['country']} | Category: {source['category']} "
+                                        f"| Language: {source['language']}"),
+            on_select=lambda source, i: self.show_source_details(source)
         )
-        
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        # Display sources
-        for i, source in enumerate(sources):
-            source_frame = tk.Frame(scrollable_frame, relief=tk.RAISED, 
-                                  borderwidth=1, bg='white', padx=10, pady=10)
-            source_frame.pack(fill=tk.X, padx=5, pady=5)
-            
-            # Source name
-            name_label = tk.Label(source_frame, text=f"{i}. {source['name']}", 
-                                 font=('Arial', 12, 'bold'), bg='white')
-            name_label.pack(anchor=tk.W, pady=(0, 5))
-            
-            # Source info
-            info_text = f"Country: {source['country']} | Category: {source['category']} | Language: {source['language']}"
-            info_label = tk.Label(source_frame, text=info_text, 
-                                 font=('Arial', 10), bg='white', fg='#666')
-            info_label.pack(anchor=tk.W, pady=(0, 10))
-            
-            # Details button
-            ttk.Button(source_frame, text="View Details", 
-                      command=lambda src=source: self.show_source_details(src)).pack(anchor=tk.E)
-        
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        results.pack(fill=tk.BOTH, expand=True)
+        results.set_items(sources)
         
         # Bottom frame
         bottom_frame = tk.Frame(main_frame, bg='#f0f8ff')
         bottom_frame.pack(fill=tk.X, pady=20)
         
-        ttk.Label(bottom_frame, text=f"Total: {len(sources)} sources", 
+        ttk.Label(bottom_frame, text=f"Showing {len(sources)} of {self.sources_total} sources", 
                  style='Info.TLabel').pack(side=tk.LEFT)
         ttk.Button(bottom_frame, text="Back to Sources Menu", 
                   command=self.show_sources_menu, style='Custom.TButton').pack(side=tk.RIGHT)
+        if self.sources_cursor:
+            ttk.Button(bottom_frame, text="Load More", 
+                      command=self.load_more_sources, style='Custom.TButton').pack(side=tk.RIGHT, padx=10)
+    
+    def load_more_sources(self):
+        """Fetch the next page of the current sources listing"""
+        if self.sources_cursor:
+            request_data = {'type': 'sources', 'cursor': self.sources_cursor}
+            self.send_request_and_display(request_data, 'sources', append=True)
     
     def show_article_details(self, article_id):
         """Show detailed article information"""
         request_data = {'type': 'details', 'article_id': article_id}
+        if self.current_result_id:
+            request_data['result_id'] = self.current_result_id
         
+        self.run_in_background(lambda: self.client.send_request(request_data),
+                               self.display_article_details, "Loading article...")
+    
+    def display_article_details(self, response):
+        """Open a window with the details from an article_details response"""
         try:
-            response = self.client.send_request(request_data)
-            
             if response and response.get('type') == 'article_details':
                 data = response['data']
                 
@@ -653,11 +722,15 @@ DESCRIPTION
     
     def quit_app(self):
         """Quit the application"""
+        self.view_id += 1
+        self.worker.shutdown(wait=False)
         try:
-            if self.client and self.client.socket:
-                self.client.socket.close()
+            if self.client and self.client.connection:
+                self.client.connection.close()
         except:
             pass
+        if self.client and self.client.cache is not None:
+            self.client.cache.close()
         self.root.quit()
         self.root.destroy()
     
@@ -670,12 +743,19 @@ DESCRIPTION
             return
         
         # Setup client
-        self.client = NewsClient()
+        cache = None
+        if self.use_cache:
+            cache = ClientCache(ttl=self.cache_ttl, path=self.cache_file)
+        self.client = NewsClient(cache=cache)
         self.client.username = username
         
-        # Connect to server
-        if self.client.connect():
-            self.connected = True
+        # Connect to server, or browse cached results while it is unreachable
+        self.connected = self.client.connect()
+        offline = not self.connected and cache is not None and len(cache) > 0
+        if offline:
+            messagebox.showwarning("Offline Mode",
+                                   "Failed to connect to server - showing cached results only")
+        if self.connected or offline:
             self.create_main_window()
             
             # Handle window close
@@ -684,8 +764,24 @@ DESCRIPTION
             # Start GUI main loop
             self.root.mainloop()
         else:
+            if cache is not None:
+                cache.close()
             messagebox.showerror("Connection Error", "Failed to connect to server")
 
-if __name__ == "__main__":
-    app = NewsClientGUI()
+def main():
+    """Parse the cache options and start the GUI"""
+    parser = argparse.ArgumentParser(description='News service GUI client')
+    parser.add_argument('--cache', action='store_true',
+                        help='answer repeated requests from a local cache')
+    parser.add_argument('--cache-file', nargs='?', const=CACHE_FILE, default=None,
+                        help=f'SQLite file that keeps the cache between runs '
+                             f'(default {CACHE_FILE}; implies --cache)')
+    parser.add_argument('--cache-ttl', type=float, default=60,
+                        help='seconds a cached response is used without asking the server')
+    args = parser.parse_args()
+    
+    app = NewsClientGUI(cache_file=args.cache_file, use_cache=args.cache, cache_ttl=args.cache_ttl)
     app.run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import threading
+
+# The fixed choices offered by the client menus (client.py and gui_client.py)
+HEADLINE_CATEGORIES = ['business', 'general', 'health', 'science', 'sports', 'technology']
+HEADLINE_COUNTRIES = ['au', 'ca', 'jp', 'ae', 'sa', 'kr', 'us', 'ma']
+SOURCE_CATEGORIES = ['business', 'entertainment', 'general', 'health', 'science', 'sports', 'technology']
+SOURCE_COUNTRIES = ['us', 'gb', 'ca', 'au', 'de']
+SOURCE_LANGUAGES = ['en', 'ar']
+
+
+def menu_requests():
+    """
+    List every request the client menus can produce without free text
+
+    Returns:
+        list: Client request dictionaries
+    """
+    menu = [{'type': 'headlines'}]
+    menu += [{'type': 'headlines', 'category': category} for category in HEADLINE_CATEGORIES]
+    menu += [{'type': 'headlines', 'country': country} for country in HEADLINE_COUNTRIES]
+    menu.append({'type': 'sources'})
+    menu += [{'type': 'sources', 'category': category} for category in SOURCE_CATEGORIES]
+    menu += [{'type': 'sources', 'country': country} for country in SOURCE_COUNTRIES]
+    menu += [{'type': 'sources', 'language': language} for language in SOURCE_LANGUAGES]
+    return menu
+
+
+class PrefetchScheduler:
+    """
+    PrefetchScheduler Class - Keeps hot NewsAPI queries warm in the cache
+
+    Every interval the scheduler refreshes the listings clients are
+    subscribed to, the menu combinations, and any other query clients
+    keep asking for, before their cache entries expire. Refreshes are
+    ordered by how often each query was requested recently and stop once
+    the upstream requests-per-minute budget is used up, so client-driven
+    misses always keep some headroom.
+    """
+
+    def __init__(self, server, interval=45, requests_per_minute=30,
+                 max_observed=50, decay=0.5):
+        """
+        Constructor method - initializes scheduler state
+
+        Args:
+            server (NewsServer): Server whose cache is kept warm
+            interval (float): Seconds between refresh cycles
+            requests_per_minute (int): Upstream calls per minute, counting
+                client-driven ones, above which refreshes are skipped
+            max_observed (int): Most-requested non-menu queries also kept warm
+            decay (float): Factor applied to request counts every cycle so
+                recent demand outweighs old demand
+        """
+        self.server = server
+        self.interval = interval
+        self.requests_per_minute = requests_per_minute
+        self.max_observed = max_observed
+        self.decay = decay
+        self.menu = []
+        menu_keys = set()
+        for request in menu_requests():
+            query = server.upstream_query(request)
+            if query[0] not in menu_keys:
+                menu_keys.add(query[0])
+                self.menu.append(query)
+        self.frequencies = {}  # cache key -> (decayed request count, endpoint, params)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.refreshed = 0
+        self.skipped = 0
+
+    def record(self, key, endpoint, params):
+        """
+        Count one client request for a query
+
+        Args:
+            key (tuple): Normalized cache key
+            endpoint (str): NewsAPI endpoint
+            params (dict): Query parameters without the API key
+        """
+        with self.lock:
+            count = self.frequencies.get(key, (0.0,))[0]
+            self.frequencies[key] = (count + 1, endpoint, params)
+
+    def start(self):
+        """Start the background refresh thread"""
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.run, name='prefetch', daemon=True)
+        self.thread.start()
+        print(f"Prefetching {len(self.menu)} menu queries every {self.interval}s "
+              f"(budget {self.requests_per_minute} upstream requests/min)")
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self.stop_event.set()
+
+    def run(self):
+        """Refresh loop executed by the background thread"""
+        while not self.stop_event.is_set():
+            self.refresh_cycle()
+            self.stop_event.wait(self.interval)
+
+    def candidates(self):
+        """
+        Rank the queries worth refreshing this cycle
+
+        Returns:
+            list: (cache key, endpoint, params) tuples, most requested first
+        """
+        with self.lock:
+            ranked = sorted(self.frequencies.items(), key=lambda item: item[1][0], reverse=True)
+            # Decay counts so the ranking follows current demand
+            self.frequencies = {
+                key: (count * self.decay, endpoint, params)
+                for key, (count, endpoint, params) in ranked
+                if count * self.decay >= 0.1
+            }
+
+        menu_keys = {key for key, _, _ in self.menu}
+        seen = set()
+        observed = 0
+
+        # Subscribed listings come first: someone is waiting for their news
+        ordered = []
+        for query in self.server.subscription_queries():
+            ordered.append(query)
+            seen.add(query[0])
+
+        for key, (count, endpoint, params) in ranked:
+            if key in seen:
+                continue
+            if key not in menu_keys:
+                if observed >= self.max_observed:
+                    continue
+                observed += 1
+            ordered.append((key, endpoint, params))
+            seen.add(key)
+        ordered += [entry for entry in self.menu if entry[0] not in seen]
+        return ordered
+
+    def refresh_cycle(self):
+        """Refresh every ranked query whose cache entry expires before the next cycle"""
+        for key, endpoint, params in self.candidates():
+            if self.stop_event.is_set():
+                return
+
+            remaining = self.server.response_cache.time_to_live(key)
+            if remaining is not None and remaining > self.interval:
+                continue
+
+            if self.server.upstream.calls_last_minute() >= self.requests_per_minute:
+                self.skipped += 1
+                continue
+            # Leave governor tokens to client requests and stay quiet while backing off
+            governor = self.server.upstream.governor
+            if governor is not None and not governor.headroom():
+                self.skipped += 1
+                continue
+
+            try:
+                self.server.refresh(endpoint, params)
+                self.refreshed += 1
+            except Exception as e:
+                print(f"Prefetch of {endpoint} {params} failed: {e}")
+
+    def stats(self):
+        """
+        Report scheduler activity
+
+        Returns:
+            dict: Refresh counts and tracked query count
+        """
+        with self.lock:
+            tracked = len(self.frequencies)
+        return {
+            'interval': self.interval,
+            'requests_per_minute': self.requests_per_minute,
+            'tracked_queries': tracked,
+            'refreshed': self.refreshed,
+            'skipped_for_budget': self.skipped
+        }
@@ -0,0 +1,893 @@
+import asyncio
+import itertools
+import json
+import socket
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+
+try:
+    import msgpack
+except ImportError:  # Optional binary codec
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # Optional binary codec
+    cbor2 = None
+
+try:
+    import zstandard
+except ImportError:  # Optional compression algorithm
+    zstandard = None
+
+# Every message on the wire is a fixed-size big-endian header (body length
+# and stream id) followed by exactly that many bytes encoded with the
+# connection's codec. A response carries the stream id of its request, so
+# many requests can be in flight on one connection and answered in any
+# order. The handshake itself (welcome and hello) is always JSON.
+PROTOCOL_VERSION = 2
+HEADER = struct.Struct('!II')
+HEADER_SIZE = HEADER.size
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+MAX_STREAM_ID = 0xFFFFFFFF
+
+# Requests a client may have in flight before the server stops reading more
+MAX_IN_FLIGHT = 16
+
+# The top bit of the length header marks a compressed body; lengths never
+# come close to it because of MAX_MESSAGE_SIZE
+COMPRESSED_FLAG = 0x80000000
+LENGTH_MASK = COMPRESSED_FLAG - 1
+
+# Bodies smaller than this are sent as-is, compressing them costs more than it saves
+COMPRESS_THRESHOLD = 1024
+
+# Compressed bytes fed to the zstd decompressor at a time. A zstd block
+# expands to at most 128 KB and costs at least 3 bytes, so one step
+# produces at most about 11 MB however the body was crafted
+ZSTD_INPUT_STEP = 256
+
+# Compression context sizes. Every connection keeps its own contexts, so
+# they are kept small: an 8 KB zlib window and a 64 KB zstd window still
+# cover a page of headlines, and a compressor costs about 55 KB (zlib) or
+# 190 KB (zstd) instead of 110 KB or 850 KB at the library defaults.
+# A zstd peer may not use a bigger window than ours
+ZLIB_WBITS = 13
+ZLIB_MEM_LEVEL = 6
+ZSTD_LEVEL = 3
+ZSTD_WINDOW_LOG = 16
+ZSTD_HASH_LOG = 14
+
+# TCP keepalive probing of idle connections: first probe after KEEPALIVE_IDLE
+# seconds of silence, then every KEEPALIVE_INTERVAL seconds, giving up after
+# KEEPALIVE_COUNT unanswered probes
+KEEPALIVE_IDLE = 60
+KEEPALIVE_INTERVAL = 15
+KEEPALIVE_COUNT = 4
+
+
+class ProtocolError(Exception):
+    """Raised when a peer sends a malformed, truncated or oversized frame"""
+
+
+class JSONCodec:
+    """Default wire encoding: compact UTF-8 JSON"""
+
+    name = 'json'
+
+    def encode(self, message):
+        return json.dumps(message, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, payload):
+        return json.loads(payload)
+
+
+class MsgpackCodec:
+    """Compact binary encoding using MessagePack (needs the msgpack package)"""
+
+    name = 'msgpack'
+
+    def encode(self, message):
+        return msgpack.packb(message, use_bin_type=True)
+
+    def decode(self, payload):
+        return msgpack.unpackb(payload, raw=False)
+
+
+class CBORCodec:
+    """Compact binary encoding using CBOR (needs the cbor2 package)"""
+
+    name = 'cbor'
+
+    def encode(self, message):
+        return cbor2.dumps(message)
+
+    def decode(self, payload):
+        return cbor2.loads(payload)
+
+
+JSON_CODEC = JSONCodec()
+
+# Codecs usable in this process, most preferred first
+CODECS = {}
+if msgpack is not None:
+    CODECS['msgpack'] = MsgpackCodec()
+if cbor2 is not None:
+    CODECS['cbor'] = CBORCodec()
+CODECS['json'] = JSON_CODEC
+
+
+COMPRESSION = ['zstd', 'zlib'] if zstandard is not None else ['zlib']
+
+
+class CompressionCounters:
+    """Thread-safe totals of bytes before and after compression"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.compressed = 0
+        self.raw_bytes = 0
+        self.wire_bytes = 0
+
+    def add(self, raw_size, wire_size, compressed):
+        with self.lock:
+            self.messages += 1
+            self.compressed += int(compressed)
+            self.raw_bytes += raw_size
+            self.wire_bytes += wire_size
+
+    def stats(self):
+        """
+        Report compression effectiveness
+
+        Returns:
+            dict: Message counts, bytes before and after, and bytes saved
+        """
+        with self.lock:
+            return {
+                'messages': self.messages,
+                'compressed': self.compressed,
+                'raw_bytes': self.raw_bytes,
+                'wire_bytes': self.wire_bytes,
+                'bytes_saved': self.raw_bytes - self.wire_bytes
+            }
+
+
+class CompressionStream:
+    """
+    Per-connection compression state for one negotiated algorithm
+
+    One compressor and one decompressor live for the whole connection and
+    every compressed body is flushed at a block boundary instead of ending
+    the stream, so later messages can reference earlier ones and repeated
+    listings shrink much further than they would compressed alone. Both
+    peers must therefore compress and decompress frames in send order.
+
+    Each context is only created for the first body that needs it: most
+    requests are below the threshold, so a server connection usually
+    never pays for a decompressor, and an idle one for neither context.
+    """
+
+    def __init__(self, name, threshold=COMPRESS_THRESHOLD, counters=None):
+        """
+        Constructor method - the streaming contexts are created on first use
+
+        Args:
+            name (str): Algorithm name, 'zlib' or 'zstd'
+            threshold (int): Smallest body size that gets compressed
+            counters (CompressionCounters): Totals to add outgoing
+                messages to, shared across connections if wanted
+        """
+        self.name = name
+        self.threshold = threshold
+        self.counters = counters or CompressionCounters()
+        self.compressor = None
+        self.decompressor = None
+        if name == 'zstd':
+            self.flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self.flush_mode = zlib.Z_SYNC_FLUSH
+
+    def new_compressor(self):
+        """Create the bounded-size compression context"""
+        if self.name == 'zstd':
+            params = zstandard.ZstdCompressionParameters.from_level(
+                ZSTD_LEVEL, window_log=ZSTD_WINDOW_LOG,
+                hash_log=ZSTD_HASH_LOG, chain_log=ZSTD_HASH_LOG
+            )
+            return zstandard.ZstdCompressor(compression_params=params).compressobj()
+        return zlib.compressobj(6, zlib.DEFLATED, ZLIB_WBITS, ZLIB_MEM_LEVEL)
+
+    def new_decompressor(self):
+        """Create the decompression context; its window is set by the peer"""
+        if self.name == 'zstd':
+            return zstandard.ZstdDecompressor(max_window_size=1 << ZSTD_WINDOW_LOG).decompressobj()
+        return zlib.decompressobj()
+
+    def compress(self, payload):
+        """
+        Compress an outgoing body if it is large enough
+
+        Args:
+            payload (bytes): Encoded message body
+
+        Returns:
+            tuple: (body to send, True if it was compressed)
+        """
+        if len(payload) < self.threshold:
+            self.counters.add(len(payload), len(payload), False)
+            return payload, False
+
+        if self.compressor is None:
+            self.compressor = self.new_compressor()
+        body = self.compressor.compress(payload) + self.compressor.flush(self.flush_mode)
+        self.counters.add(len(payload), len(body), True)
+        return body, True
+
+    def decompress(self, body):
+        """
+        Decompress an incoming body that was sent with the compressed flag
+
+        Args:
+            body (bytes): Compressed message body
+
+        Returns:
+            bytes: Original encoded body
+        """
+        try:
+            if self.decompressor is None:
+                self.decompressor = self.new_decompressor()
+            if self.name == 'zstd':
+                payload = self.decompress_zstd(body)
+            else:
+                # Stop inflating one byte past the limit; a bigger body leaves input behind
+                payload = self.decompressor.decompress(body, MAX_MESSAGE_SIZE + 1)
+                if self.decompressor.unconsumed_tail:
+                    payload += b'\0'  # Over the limit, reported below
+        except ProtocolError:
+            raise
+        except Exception as e:
+            raise ProtocolError(f'Invalid {self.name} data: {e}')
+        if len(payload) > MAX_MESSAGE_SIZE:
+            raise ProtocolError(f'Message too large: over {MAX_MESSAGE_SIZE} bytes')
+        return payload
+
+    def decompress_zstd(self, body):
+        """
+        Decompress a zstd body without ever holding much more than MAX_MESSAGE_SIZE
+
+        The zstd decompressor has no output limit, and a few KB of input
+        can expand to hundreds of MB. Input is therefore fed in small
+        steps: each step can produce at most a few MB, and decompression
+        stops as soon as the total exceeds the limit.
+
+        Args:
+            body (bytes): Compressed message body
+
+        Returns:
+            bytes: Original encoded body
+
+        Raises:
+            ProtocolError: If the body expands beyond MAX_MESSAGE_SIZE
+        """
+        parts = []
+        size = 0
+        for start in range(0, len(body), ZSTD_INPUT_STEP):
+            part = self.decompressor.decompress(body[start:start + ZSTD_INPUT_STEP])
+            size += len(part)
+            if size > MAX_MESSAGE_SIZE:
+                raise ProtocolError(f'Message too large: over {MAX_MESSAGE_SIZE} bytes')
+            parts.append(part)
+        return b''.join(parts)
+
+
+def choose_compression(offered, preferred='auto'):
+    """
+    Pick the compression algorithm for a connection
+
+    Args:
+        offered (list): Algorithm names the server supports
+        preferred (str): Algorithm name, 'auto' for the best shared one,
+            or 'none' to disable compression
+
+    Returns:
+        str: Algorithm name, or None for no compression
+    """
+    if preferred == 'none':
+        return None
+    if preferred != 'auto':
+        return preferred if preferred in COMPRESSION and preferred in offered else None
+    for name in COMPRESSION:
+        if name in offered:
+            return name
+    return None
+
+
+def choose_codec(offered, preferred='auto'):
+    """
+    Pick the codec for a connection from the names the server offers
+
+    Args:
+        offered (list): Codec names the server supports
+        preferred (str): Codec name the caller wants, or 'auto' for the
+            most compact one both sides support
+
+    Returns:
+        Codec instance; JSON when nothing better is shared
+    """
+    if preferred != 'auto':
+        if preferred in CODECS and preferred in offered:
+            return CODECS[preferred]
+        return JSON_CODEC
+    for name, codec in CODECS.items():
+        if name in offered:
+            return codec
+    return JSON_CODEC
+
+
+def frame_parts(body, stream_id=0, compression=None):
+    """
+    Build the header for one encoded body, compressing the body if needed
+
+    Args:
+        body (bytes): Encoded message body, possibly shared between connections
+        stream_id (int): Stream the message belongs to
+        compression (CompressionStream): Connection's compression state,
+            or None to send the body as-is
+
+    Returns:
+        tuple: (header, body to send after it)
+    """
+    if len(body) > MAX_MESSAGE_SIZE:
+        raise ProtocolError(f'Message too large: {len(body)} bytes')
+    compressed = False
+    if compression is not None:
+        body, compressed = compression.compress(body)
+    length = len(body) | COMPRESSED_FLAG if compressed else len(body)
+    return HEADER.pack(length, stream_id), body
+
+
+def encode_message(message, codec=JSON_CODEC, compression=None, stream_id=0):
+    """
+    Serialize a message dictionary into a framed payload
+
+    Args:
+        message (dict): Message data to send
+        codec: Wire codec of the connection
+        compression (CompressionStream): Connection's compression state,
+            or None to send the body as-is
+        stream_id (int): Stream the message belongs to
+
+    Returns:
+        bytes: Header followed by the encoded body
+    """
+    header, body = frame_parts(codec.encode(message), stream_id, compression)
+    return header + body
+
+
+def decode_message(payload, codec=JSON_CODEC):
+    """
+    Parse a frame body received from the peer
+
+    Args:
+        payload (bytes): Frame body without the header
+        codec: Wire codec of the connection
+
+    Returns:
+        dict: Decoded message
+
+    Raises:
+        ValueError: If the body is not valid for the codec
+    """
+    return codec.decode(payload)
+
+
+def send_message(sock, message, codec=JSON_CODEC, compression=None, stream_id=0):
+    """
+    Send one framed message over a socket
+
+    Callers sharing a socket between threads must hold a send lock, since
+    compressed frames have to reach the peer in compression order.
+
+    Args:
+        sock: Connected socket
+        message (dict): Message data to send
+        codec: Wire codec of the connection
+        compression (CompressionStream): Connection's compression state
+        stream_id (int): Stream the message belongs to
+    """
+    sock.sendall(encode_message(message, codec, compression, stream_id))
+
+
+def send_frame(sock, body, stream_id=0, compression=None):
+    """
+    Send an already encoded body without copying it into a new buffer
+
+    Args:
+        sock: Connected socket
+        body (bytes): Encoded message body, possibly shared between connections
+        stream_id (int): Stream the message belongs to
+        compression (CompressionStream): Connection's compression state
+    """
+    header, body = frame_parts(body, stream_id, compression)
+    if not hasattr(sock, 'sendmsg'):  # Windows
+        sock.sendall(header + body)
+        return
+
+    # Scatter/gather write of header and body, resuming after partial sends
+    parts = [memoryview(header), memoryview(body)]
+    while parts:
+        sent = sock.sendmsg(parts)
+        while parts and sent >= len(parts[0]):
+            sent -= len(parts[0])
+            parts.pop(0)
+        if parts:
+            parts[0] = parts[0][sent:]
+
+
+def recv_exact(sock, size):
+    """
+    Read exactly size bytes into a single preallocated buffer
+
+    Args:
+        sock: Connected socket
+        size (int): Number of bytes to read
+
+    Returns:
+        bytearray: The received bytes, or None if the peer closed the
+        connection before sending anything
+    """
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            if received == 0:
+                return None
+            raise ProtocolError(f'Connection closed mid-frame ({received}/{size} bytes)')
+        received += count
+
+    return buffer
+
+
+def parse_header(header):
+    """
+    Split a frame header into its fields
+
+    Args:
+        header (bytes): HEADER_SIZE bytes read from the peer
+
+    Returns:
+        tuple: (body length, stream id, True if the body is compressed)
+    """
+    value, stream_id = HEADER.unpack(header)
+    length = value & LENGTH_MASK
+    if length > MAX_MESSAGE_SIZE:
+        raise ProtocolError(f'Frame too large: {length} bytes')
+    return length, stream_id, bool(value & COMPRESSED_FLAG)
+
+
+def inflate(payload, compressed, compression):
+    """Undo compression of a received body if its frame was flagged"""
+    if not compressed:
+        return payload
+    if compression is None:
+        raise ProtocolError('Compressed frame on a connection without compression')
+    return compression.decompress(payload)
+
+
+def recv_frame(sock, compression=None):
+    """
+    Read one complete frame from a socket
+
+    Args:
+        sock: Connected socket
+        compression (CompressionStream): Connection's compression state
+
+    Returns:
+        tuple: (stream id, frame body decompressed if needed), or None if
+        the connection was closed
+    """
+    header = recv_exact(sock, HEADER_SIZE)
+    if header is None:
+        return None
+
+    length, stream_id, compressed = parse_header(header)
+    if length == 0:
+        return stream_id, bytearray()
+
+    payload = recv_exact(sock, length)
+    if payload is None:
+        raise ProtocolError('Connection closed before frame body')
+    return stream_id, inflate(payload, compressed, compression)
+
+
+def recv_message(sock, codec=JSON_CODEC, compression=None):
+    """
+    Read and decode one framed message from a socket
+
+    Args:
+        sock: Connected socket
+        codec: Wire codec of the connection
+        compression (CompressionStream): Connection's compression state
+
+    Returns:
+        dict: Decoded message, or None if the connection was closed
+    """
+    frame = recv_frame(sock, compression)
+    if frame is None:
+        return None
+    return decode_message(frame[1], codec)
+
+
+async def read_frame(reader, compression=None):
+    """
+    Read one complete frame from an asyncio stream
+
+    Args:
+        reader (asyncio.StreamReader): Connection reader
+        compression (CompressionStream): Connection's compression state
+
+    Returns:
+        tuple: (stream id, frame body decompressed if needed), or None if
+        the connection was closed
+    """
+    try:
+        header = await reader.readexactly(HEADER_SIZE)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise ProtocolError('Connection closed mid-header')
+
+    length, stream_id, compressed = parse_header(header)
+
+    try:
+        payload = await reader.readexactly(length)
+    except asyncio.IncompleteReadError as e:
+        raise ProtocolError(f'Connection closed mid-frame ({len(e.partial)}/{length} bytes)')
+    return stream_id, inflate(payload, compressed, compression)
+
+
+async def write_message(writer, message, codec=JSON_CODEC, compression=None, stream_id=0):
+    """
+    Send one framed message over an asyncio stream
+
+    Args:
+        writer (asyncio.StreamWriter): Connection writer
+        message (dict): Message data to send
+        codec: Wire codec of the connection
+        compression (CompressionStream): Connection's compression state
+        stream_id (int): Stream the message belongs to
+    """
+    writer.write(encode_message(message, codec, compression, stream_id))
+    await writer.drain()
+
+
+async def write_frame(writer, body, stream_id=0, compression=None):
+    """
+    Send an already encoded body over an asyncio stream
+
+    Args:
+        writer (asyncio.StreamWriter): Connection writer
+        body (bytes): Encoded message body, possibly shared between connections
+        stream_id (int): Stream the message belongs to
+        compression (CompressionStream): Connection's compression state
+    """
+    writer.writelines(frame_parts(body, stream_id, compression))
+    await writer.drain()
+
+
+def enable_keepalive(sock, idle=KEEPALIVE_IDLE, interval=KEEPALIVE_INTERVAL, count=KEEPALIVE_COUNT):
+    """
+    Turn on TCP keepalive so the kernel notices peers that vanished
+
+    A client whose machine crashed or lost its network never closes its
+    socket, so a blocking read on it would otherwise wait forever. The
+    probe timings are only set on platforms that expose them.
+
+    Args:
+        sock: Connected socket (or asyncio transport socket)
+        idle (int): Seconds of silence before the first probe
+        interval (int): Seconds between probes
+        count (int): Unanswered probes before the connection is dropped
+    """
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        for option, value in (('TCP_KEEPIDLE', idle), ('TCP_KEEPINTVL', interval),
+                              ('TCP_KEEPCNT', count)):
+            if hasattr(socket, option):
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+    except OSError as e:
+        print(f"Could not enable TCP keepalive: {e}")
+
+
+def build_welcome(username, compress_threshold=COMPRESS_THRESHOLD, idle_timeout=None):
+    """
+    Build the framing announcement the server sends after the username
+
+    Args:
+        username (str): Username the client identified with
+        compress_threshold (int): Smallest body size either side compresses
+        idle_timeout (float): Seconds of silence after which the server
+            closes the connection, or None if it never does
+
+    Returns:
+        dict: Welcome message describing the negotiated framing
+    """
+    return {
+        'type': 'welcome',
+        'username': username,
+        'protocol': PROTOCOL_VERSION,
+        'header_size': HEADER_SIZE,
+        'max_message_size': MAX_MESSAGE_SIZE,
+        'codecs': list(CODECS),
+        'compression': COMPRESSION,
+        'compress_threshold': compress_threshold,
+        'max_in_flight': MAX_IN_FLIGHT,
+        'idle_timeout': idle_timeout
+    }
+
+
+def parse_hello(message):
+    """
+    Read the codec and compression a client selected in its hello message
+
+    Args:
+        message (dict): First message received after the welcome
+
+    Returns:
+        tuple: (codec instance, compression name or None), or None if the
+        message is not a hello
+    """
+    if not isinstance(message, dict) or message.get('type') != 'hello':
+        return None
+    compression = message.get('compression')
+    if compression not in COMPRESSION:
+        compression = None
+    return CODECS.get(message.get('codec'), JSON_CODEC), compression
+
+
+def merge_headlines_delta(previous, delta):
+    """
+    Apply a headlines_delta response to the headlines_list it was based on
+
+    Args:
+        previous (dict): headlines_list response the client holds, whose
+            result_id was sent as 'since'
+        delta (dict): headlines_delta response from the server
+
+    Returns:
+        dict: Equivalent full headlines_list response
+
+    Raises:
+        ValueError: If the delta does not fit the previous listing
+    """
+    if previous.get('result_id') != delta.get('base'):
+        raise ValueError('Delta is based on a different listing')
+
+    articles = {article['key']: article for article in previous.get('data', [])}
+    for key in delta['removed']:
+        articles.pop(key, None)
+    for article in delta['added']:
+        articles[article['key']] = article
+
+    merged = {
+        name: value for name, value in delta.items()
+        if name not in ('added', 'removed', 'order', 'base', 'offset')
+    }
+    merged['type'] = 'headlines_list'
+    try:
+        merged['data'] = [
+            {**articles[key], 'id': delta['offset'] + index}
+            for index, key in enumerate(delta['order'])
+        ]
+    except KeyError:
+        raise ValueError('Delta refers to an article the client does not have')
+    return merged
+
+
+def client_handshake(sock, username, codec='auto', compression='auto'):
+    """
+    Perform the client side of the connection handshake
+
+    The username is sent as raw UTF-8 exactly as before. The server then
+    answers with a framed welcome message listing its codecs; the client
+    waits for it before sending anything else so the username can never
+    be coalesced with the first request. The client replies with a JSON
+    hello naming its codec and compression, and every later message in
+    either direction uses them.
+
+    Args:
+        sock: Connected socket
+        username (str): Username to identify with
+        codec (str): Preferred codec name, or 'auto'
+        compression (str): Preferred compression name, 'auto' or 'none'
+
+    Returns:
+        tuple: (welcome message, selected codec, CompressionStream or None)
+    """
+    sock.sendall(username.encode('utf-8'))
+
+    welcome = recv_message(sock)
+    if welcome is None:
+        raise ProtocolError('Server closed the connection during handshake')
+    if welcome.get('type') == 'error':
+        raise ProtocolError(welcome.get('message', 'Connection refused by server'))
+    if welcome.get('type') != 'welcome':
+        raise ProtocolError(f"Unexpected handshake reply: {welcome.get('type', 'unknown')}")
+    if welcome.get('header_size') != HEADER_SIZE or welcome.get('protocol') != PROTOCOL_VERSION:
+        raise ProtocolError('Server uses an incompatible wire protocol')
+
+    selected = choose_codec(welcome.get('codecs', ['json']), codec)
+    algorithm = choose_compression(welcome.get('compression', []), compression)
+    send_message(sock, {'type': 'hello', 'codec': selected.name, 'compression': algorithm})
+
+    stream = None
+    if algorithm is not None:
+        stream = CompressionStream(
+            algorithm,
+            threshold=welcome.get('compress_threshold', COMPRESS_THRESHOLD)
+        )
+    return welcome, selected, stream
+
+
+class MultiplexedConnection:
+    """
+    MultiplexedConnection Class - Many in-flight requests over one socket
+
+    Every request is sent under the next stream id and immediately gets a
+    Future. A background reader thread resolves each Future when the
+    response with its stream id arrives, in whatever order the server
+    finishes them, so callers can pipeline requests instead of waiting
+    for each response before sending the next. Messages the server pushes
+    on its own arrive on stream 0 and go to the on_push callback.
+    """
+
+    def __init__(self, sock, codec=JSON_CODEC, compression=None, on_push=None):
+        """
+        Constructor method - starts the reader thread
+
+        Args:
+            sock: Socket that already completed client_handshake
+            codec: Wire codec selected in the handshake
+            compression (CompressionStream): Compression selected in the
+                handshake, or None
+            on_push (callable): Called with each pushed message on the
+                reader thread, so it must not block; None drops pushes
+        """
+        self.sock = sock
+        self.codec = codec
+        self.compression = compression
+        self.on_push = on_push
+        self.send_lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.pending = {}  # stream id -> Future
+        self.ids = itertools.count()
+        self.closed = False
+        self.closed_event = threading.Event()
+        self.last_sent = time.monotonic()
+        self.heartbeat = None
+
+        # Responses are awaited through Futures, not socket timeouts
+        sock.settimeout(None)
+        self.reader = threading.Thread(target=self.read_loop, name='news-reader', daemon=True)
+        self.reader.start()
+
+    def submit(self, message):
+        """
+        Send a request without waiting for its response
+
+        Args:
+            message (dict): Request data
+
+        Returns:
+            concurrent.futures.Future: Resolves to the response dict, or
+            fails with ConnectionError if the connection is lost first
+        """
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise ConnectionError('Connection closed')
+            stream_id = next(self.ids) % MAX_STREAM_ID + 1  # 0 is never a request
+            self.pending[stream_id] = future
+
+        try:
+            with self.send_lock:
+                send_message(self.sock, message, self.codec, self.compression, stream_id)
+                self.last_sent = time.monotonic()
+        except Exception:
+            with self.lock:
+                self.pending.pop(stream_id, None)
+            raise
+        return future
+
+    def request(self, message, timeout=None):
+        """
+        Send a request and wait for its response
+
+        Args:
+            message (dict): Request data
+            timeout (float): Seconds to wait, or None to wait forever
+
+        Returns:
+            dict: Response data
+        """
+        return self.submit(message).result(timeout)
+
+    def start_heartbeat(self, interval):
+        """
+        Ping the server whenever no request was sent for interval seconds
+
+        The server closes connections it has not heard from for a while;
+        pings keep an open but idle client (such as a GUI window nobody is
+        clicking in) connected. Pongs resolve Futures nobody waits on.
+
+        Args:
+            interval (float): Seconds of silence before a ping is sent
+        """
+        if self.heartbeat is not None or not interval:
+            return
+        self.heartbeat = threading.Thread(target=self.heartbeat_loop, args=(interval,),
+                                          name='news-heartbeat', daemon=True)
+        self.heartbeat.start()
+
+    def heartbeat_loop(self, interval):
+        """Send pings until the connection closes"""
+        while True:
+            silent = time.monotonic() - self.last_sent
+            if self.closed_event.wait(max(interval - silent, 0)):
+                return
+            if time.monotonic() - self.last_sent >= interval:
+                try:
+                    self.submit({'type': 'ping'})
+                except (OSError, ConnectionError):
+                    return
+
+    def read_loop(self):
+        """Dispatch responses to their Futures until the connection ends"""
+        error = None
+        try:
+            while True:
+                frame = recv_frame(self.sock, self.compression)
+                if frame is None:
+                    break
+                stream_id, payload = frame
+                message = decode_message(payload, self.codec)
+                if stream_id == 0:
+                    if self.on_push is not None:
+                        self.on_push(message)
+                    continue
+                with self.lock:
+                    future = self.pending.pop(stream_id, None)
+                if future is not None:
+                    future.set_result(message)
+        except (OSError, ProtocolError, ValueError) as e:
+            error = e
+        finally:
+            self.fail_pending(error)
+
+    def fail_pending(self, error=None):
+        """Fail every outstanding request once the connection is gone"""
+        with self.lock:
+            self.closed = True
+            pending, self.pending = self.pending, {}
+        self.closed_event.set()
+        for future in pending.values():
+            if error is None or self.sock.fileno() == -1:
+                future.set_exception(ConnectionError('Connection closed'))
+            else:
+                future.set_exception(ConnectionError(f'Connection lost: {error}'))
+
+    def close(self):
+        """Close the socket; the reader thread then fails pending requests"""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
@@ -0,0 +1,83 @@
+import threading
+import time
+
+
+class IdleReaper:
+    """
+    IdleReaper Class - Closes connections that have gone quiet
+
+    A connection whose client has not sent a frame for idle_timeout
+    seconds is closed, which wakes its handler out of the blocking read
+    so the thread or coroutine, the socket and the registry entry are all
+    released. Clients that stay open without making requests keep their
+    connection by sending ping messages, so only abandoned sessions and
+    peers that vanished without closing the socket are reaped.
+    """
+
+    def __init__(self, server, idle_timeout=300, interval=None):
+        """
+        Constructor method - initializes reaper state
+
+        Args:
+            server (NewsServer): Server whose connections are watched
+            idle_timeout (float): Seconds without a frame from the client
+                after which its connection is closed
+            interval (float): Seconds between checks, defaults to a
+                quarter of idle_timeout capped at 30
+        """
+        self.server = server
+        self.idle_timeout = idle_timeout
+        self.interval = interval or min(idle_timeout / 4, 30)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.reaped = 0
+
+    def start(self):
+        """Start the background check thread"""
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.run, name='reaper', daemon=True)
+        self.thread.start()
+        print(f"Closing connections idle for {self.idle_timeout}s "
+              f"(checked every {self.interval:g}s)")
+
+    def stop(self):
+        """Stop the background check thread"""
+        self.stop_event.set()
+
+    def run(self):
+        """Check loop executed by the background thread"""
+        while not self.stop_event.wait(self.interval):
+            self.reap()
+
+    def reap(self):
+        """
+        Close every connection idle for longer than idle_timeout
+
+        Returns:
+            int: Number of connections closed
+        """
+        deadline = time.time() - self.idle_timeout
+        closed = 0
+        for client in list(self.server.clients.values()):
+            if client['last_active'] >= deadline:
+                continue
+            print(f"Closing idle connection {client['id']} of {client['username']} "
+                  f"({client['address']}), silent for {time.time() - client['last_active']:.0f}s")
+            self.server.close_client(client)
+            closed += 1
+        self.reaped += closed
+        return closed
+
+    def stats(self):
+        """
+        Report reaper activity
+
+        Returns:
+            dict: Timeout settings and connections closed so far
+        """
+        return {
+            'idle_timeout': self.idle_timeout,
+            'interval': self.interval,
+            'reaped': self.reaped
+        }
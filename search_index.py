@@ -0,0 +1,241 @@
+import heapq
+import itertools
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or that the '
+    'this to was were will with'.split()
+)
+
+# Articles not listed by NewsAPI for this long no longer answer searches,
+# so keyword results stay news rather than whatever was fetched once
+INDEX_MAX_AGE = 2 * 24 * 3600
+
+# Documents kept at most; the least recently listed are dropped first
+INDEX_MAX_DOCUMENTS = 20000
+
+
+def tokenize(text):
+    """
+    Split text into lowercase search terms
+
+    Args:
+        text (str): Text to tokenize
+
+    Returns:
+        list: Terms with stopwords and single characters removed
+    """
+    if not text:
+        return []
+    return [
+        term for term in TOKEN_PATTERN.findall(text.lower())
+        if len(term) > 1 and term not in STOPWORDS
+    ]
+
+
+class SearchIndex:
+    """
+    SearchIndex Class - In-memory inverted index with BM25 ranking
+
+    Every article the server fetches is indexed once (by URL) over its
+    title, description and content, so keyword searches can be answered
+    without a NewsAPI round trip. Each document remembers when it was last
+    listed; documents older than max_age are dropped before a search and
+    the least recently listed ones once max_documents is reached.
+    """
+
+    def __init__(self, k1=1.5, b=0.75, title_weight=2,
+                 max_age=INDEX_MAX_AGE, max_documents=INDEX_MAX_DOCUMENTS):
+        """
+        Constructor method - initializes an empty index
+
+        Args:
+            k1 (float): BM25 term frequency saturation
+            b (float): BM25 document length normalization
+            title_weight (int): How many times title terms are counted
+            max_age (float): Seconds since it was last listed after which
+                an article no longer matches
+            max_documents (int): Articles kept at most
+        """
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self.max_age = max_age
+        self.max_documents = max_documents
+        self.postings = {}      # term -> {doc_id: term frequency}
+        self.documents = {}     # doc_id -> raw article
+        self.terms = {}         # doc_id -> terms it has postings under
+        self.lengths = {}       # doc_id -> number of terms
+        self.countries = {}     # doc_id -> set of countries it was listed under
+        self.categories = {}    # doc_id -> set of categories it was listed under
+        self.doc_ids = {}       # url -> doc_id
+        self.listed_at = OrderedDict()  # doc_id -> time last listed, oldest first
+        self.next_id = itertools.count()
+        self.total_length = 0
+        self.evicted = 0
+        self.lock = threading.Lock()
+
+    def add(self, article, country=None, category=None, listed_at=None):
+        """
+        Index one article, or record a new listing for a known one
+
+        Args:
+            article (dict): Raw NewsAPI article
+            country (str): Country the article was listed under
+            category (str): Category the article was listed under
+            listed_at (float): Time the listing was fetched, defaults to now
+        """
+        url = article.get('url') or article.get('title')
+        if not url:
+            return
+        if listed_at is None:
+            listed_at = time.time()
+
+        with self.lock:
+            doc_id = self.doc_ids.get(url)
+            if doc_id is not None:
+                self.touch(doc_id, listed_at)
+                if country:
+                    self.countries[doc_id].add(country)
+                if category:
+                    self.categories[doc_id].add(category)
+                return
+
+        terms = tokenize(article.get('title')) * self.title_weight
+        terms += tokenize(article.get('description'))
+        terms += tokenize(article.get('content'))
+
+        frequencies = {}
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+
+        with self.lock:
+            if url in self.doc_ids:
+                return
+            doc_id = next(self.next_id)
+            self.doc_ids[url] = doc_id
+            self.documents[doc_id] = article
+            self.terms[doc_id] = tuple(frequencies)
+            self.lengths[doc_id] = len(terms)
+            self.countries[doc_id] = {country} if country else set()
+            self.categories[doc_id] = {category} if category else set()
+            self.total_length += len(terms)
+            for term, frequency in frequencies.items():
+                self.postings.setdefault(term, {})[doc_id] = frequency
+            self.touch(doc_id, listed_at)
+            while len(self.documents) > self.max_documents:
+                self.remove(next(iter(self.listed_at)))
+                self.evicted += 1
+
+    def add_all(self, articles, country=None, category=None, listed_at=None):
+        """Index every article of one listing"""
+        for article in articles:
+            self.add(article, country, category, listed_at)
+
+    def touch(self, doc_id, listed_at):
+        """
+        Record a listing time; the caller must hold the lock
+
+        listed_at keeps its oldest-first order as long as listings arrive
+        in time order, which holds for fetches and for warm-up reads that
+        are sorted by time. An older time never moves a document back.
+        """
+        if listed_at >= self.listed_at.get(doc_id, listed_at):
+            self.listed_at[doc_id] = listed_at
+            self.listed_at.move_to_end(doc_id)
+
+    def remove(self, doc_id):
+        """Drop one document and its postings; the caller must hold the lock"""
+        article = self.documents.pop(doc_id)
+        del self.doc_ids[article.get('url') or article.get('title')]
+        for term in self.terms.pop(doc_id):
+            postings = self.postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(doc_id)
+        del self.countries[doc_id]
+        del self.categories[doc_id]
+        del self.listed_at[doc_id]
+
+    def expire(self):
+        """
+        Drop documents not listed within max_age
+
+        Returns:
+            int: Number of documents dropped
+        """
+        deadline = time.time() - self.max_age
+        expired = 0
+        with self.lock:
+            while self.listed_at:
+                doc_id, listed_at = next(iter(self.listed_at.items()))
+                if listed_at >= deadline:
+                    break
+                self.remove(doc_id)
+                expired += 1
+            self.evicted += expired
+        return expired
+
+    def search(self, query, limit=15, country=None, category=None):
+        """
+        Rank recently listed articles against a keyword query
+
+        Args:
+            query (str): Keywords to search for
+            limit (int): Maximum number of results
+            country (str): Only match articles listed under this country
+            category (str): Only match articles listed under this category
+
+        Returns:
+            list: Raw articles, best match first
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        self.expire()
+        with self.lock:
+            count = len(self.documents)
+            if count == 0:
+                return []
+            average_length = self.total_length / count
+
+            scores = {}
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    if country and country not in self.countries[doc_id]:
+                        continue
+                    if category and category not in self.categories[doc_id]:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / average_length)
+                    score = idf * frequency * (self.k1 + 1) / (frequency + norm)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [self.documents[doc_id] for doc_id, _ in best]
+
+    def stats(self):
+        """
+        Report index size
+
+        Returns:
+            dict: Document and term counts, limits and documents dropped
+        """
+        with self.lock:
+            return {
+                'documents': len(self.documents),
+                'terms': len(self.postings),
+                'max_documents': self.max_documents,
+                'max_age': self.max_age,
+                'evicted': self.evicted
+            }
@@ -1,8 +1,118 @@
+import argparse
+import asyncio
+import base64
+import itertools
 import socket
 import threading
 import json
+import sqlite3
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from article_store import ArticleStore, article_key, compact_article, make_result_id
+from cache import TTLCache, make_cache_key
+from prefetch import PrefetchScheduler
+from reaper import IdleReaper
+from search_index import INDEX_MAX_AGE, SearchIndex
+from snapshot_store import SnapshotStore
+from subscriptions import MAX_SUBSCRIPTIONS, Subscription
+from upstream import CircuitOpen, RateLimited, UpstreamClient, UpstreamError, UpstreamGovernor
+from worker_pool import WorkerPool
+from protocol import (
+    COMPRESS_THRESHOLD, HEADER_SIZE, JSON_CODEC, MAX_IN_FLIGHT, CompressionCounters,
+    CompressionStream, ProtocolError, build_welcome, decode_message, enable_keepalive,
+    parse_hello, read_frame, recv_frame, send_frame, send_message, write_frame, write_message
+)
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Where keyword headline searches are answered: the local index only,
+# NewsAPI only, or the local index with NewsAPI used when nothing matches
+KEYWORD_SEARCH_MODES = ('local', 'remote', 'local_then_remote')
+
+# Listings are fetched from NewsAPI in one large page and windowed here
+UPSTREAM_PAGE_SIZE = 100
+DEFAULT_HEADLINES_PAGE_SIZE = 15
+DEFAULT_SOURCES_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+# Most sub-requests one batch request may carry
+MAX_BATCH_SIZE = 20
+
+# Sent instead of a response when the server has no capacity left for a request
+OVERLOADED_RETRY_AFTER = 1
+
+# Seconds a new connection has to send its username before it is dropped
+HANDSHAKE_TIMEOUT = 10
+
+# Seconds a cached NewsAPI response stays fresh, per endpoint
+DEFAULT_CACHE_TTLS = {
+    'top-headlines': 60,
+    'sources': 6 * 60 * 60
+}
+
+def encode_cursor(state):
+    """
+    Encode pagination state as an opaque cursor string
+    
+    Args:
+        state (dict): Offset, page size and whatever identifies the result set
+        
+    Returns:
+        str: URL-safe cursor
+    """
+    raw = json.dumps(state, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+    
+    Args:
+        cursor (str): Cursor sent back by the client
+        
+    Returns:
+        dict: Pagination state
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        int(state['o']), int(state['n'])
+        return state
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def request_window(request, default_page_size):
+    """
+    Work out which window of a result set a request asks for
+    
+    Args:
+        request (dict): Headlines or sources request data
+        default_page_size (int): Page size when the request gives none
+        
+    Returns:
+        tuple: (offset, page_size, cursor state or None)
+        
+    Raises:
+        ValueError: If page, page_size or cursor are invalid
+    """
+    if request.get('cursor'):
+        state = decode_cursor(request['cursor'])
+        return max(int(state['o']), 0), min(max(int(state['n']), 1), MAX_PAGE_SIZE), state
+    
+    page_size = int(request.get('page_size', default_page_size))
+    page = int(request.get('page', 1))
+    if page < 1 or page_size < 1:
+        raise ValueError('page and page_size must be positive')
+    page_size = min(page_size, MAX_PAGE_SIZE)
+    return (page - 1) * page_size, page_size, None
 
 class NewsServer:
     """
@@ -14,22 +124,144 @@ class NewsServer:
     - Modularity: Each method handles a specific aspect of server functionality
     """
     
-    def __init__(self, host='localhost', port=12345):
+    def __init__(self, host='localhost', port=12345, backlog=128, upstream_workers=32,
+                 cache_size=512, cache_ttls=None, pool_size=20, upstream_retries=2,
+                 store_path='news_store.db', keyword_search='local_then_remote',
+                 prefetch_interval=45, prefetch_budget=30,
+                 compress_threshold=COMPRESS_THRESHOLD, max_queue=64, max_clients=512,
+                 upstream_rate=60, upstream_burst=20, daily_quota=None,
+                 breaker_threshold=3, breaker_reset=30, idle_timeout=300, keepalive=True):
         """
         Constructor method - initializes server attributes
         
         Args:
             host (str): Server hostname to bind to
             port (int): Server port number to listen on
+            backlog (int): Pending connection queue size passed to listen()
+            upstream_workers (int): Threads processing requests (and the
+                blocking NewsAPI calls they make) on either engine
+            cache_size (int): Maximum number of cached NewsAPI responses
+            cache_ttls (dict): Per-endpoint cache lifetimes in seconds,
+                overriding DEFAULT_CACHE_TTLS
+            pool_size (int): Keep-alive connections kept open to NewsAPI
+            upstream_retries (int): Retries for NewsAPI connection errors
+                and 5xx answers, with exponential backoff
+            store_path (str): SQLite file for persisted snapshots, or None
+                to keep everything in memory
+            keyword_search (str): Default keyword search strategy, one of
+                KEYWORD_SEARCH_MODES
+            prefetch_interval (float): Seconds between background refreshes
+                of hot queries, or 0 to disable prefetching
+            prefetch_budget (int): Upstream requests per minute above which
+                background refreshes are skipped
+            compress_threshold (int): Smallest response body compressed for
+                clients that negotiated compression
+            max_queue (int): Requests allowed to wait for a free worker;
+                further requests are answered 'overloaded' at once
+            max_clients (int): Connections the threaded engine serves at
+                once (each costs a thread); further connections are refused
+                with an 'overloaded' message. The asyncio engine has no limit
+            upstream_rate (float): NewsAPI calls per minute allowed by our plan
+            upstream_burst (int): NewsAPI calls allowed back to back
+            daily_quota (int): NewsAPI calls allowed per day, or None
+            breaker_threshold (int): Consecutive NewsAPI failures after which
+                cached data is served without calling NewsAPI (0 disables)
+            breaker_reset (float): Seconds before NewsAPI is probed again
+            idle_timeout (float): Seconds a client may stay silent before
+                its connection is closed, or 0 to keep idle connections
+            keepalive (bool): Enable TCP keepalive on client connections so
+                vanished peers are detected by the kernel
         """
         self.host = host
         self.port = port
+        self.backlog = backlog
+        self.upstream_workers = upstream_workers
         self.socket = None
+        self.max_clients = max_clients
+        # Taken when a connection is accepted, before its thread exists, so
+        # sockets that never finish the handshake count against the limit
+        self.connection_slots = threading.BoundedSemaphore(max_clients)
+        self.refused_clients = 0
+        self.keepalive = keepalive
         self.api_key = "b8b8b8b8b8b8b8b8b8b8b8b8b8b8b8b8"  # NewsAPI key
         self.base_url = "https://newsapi.org/v2"
-        self.clients = []
+        self.clients = {}  # connection id -> registry entry
+        self.connection_ids = itertools.count(1)
         self.running = False
         
+        # Shared NewsAPI response cache keyed by normalized request params
+        self.cache_ttls = {**DEFAULT_CACHE_TTLS, **(cache_ttls or {})}
+        self.response_cache = TTLCache(max_entries=cache_size)
+        
+        # Persistent copy of fetched data, survives restarts; articles are
+        # kept as long as the search index would still match them
+        self.snapshot_store = (SnapshotStore(store_path, article_max_age=INDEX_MAX_AGE)
+                               if store_path else None)
+        
+        # Full-text index over the articles fetched recently
+        self.search_index = SearchIndex(max_age=INDEX_MAX_AGE)
+        self.keyword_search = keyword_search
+        
+        # Background refresh of the menu queries and other hot queries
+        self.prefetcher = None
+        if prefetch_interval > 0:
+            self.prefetcher = PrefetchScheduler(
+                self,
+                interval=prefetch_interval,
+                requests_per_minute=prefetch_budget
+            )
+        
+        # Closes connections of clients that stopped sending anything
+        self.idle_timeout = idle_timeout
+        self.reaper = IdleReaper(self, idle_timeout) if idle_timeout > 0 else None
+        
+        # Per-message compression of large responses, totals across clients
+        self.compress_threshold = compress_threshold
+        self.compression_counters = CompressionCounters()
+        
+        # Fixed request-processing pool; a full queue turns requests away
+        self.request_pool = WorkerPool(
+            workers=upstream_workers,
+            max_queue=max_queue,
+            name='request'
+        )
+        
+        # Sub-requests of batch requests, kept apart from the request pool so
+        # a batch waiting on its items can never starve them of threads
+        self.batch_executor = ThreadPoolExecutor(
+            max_workers=upstream_workers,
+            thread_name_prefix='batch'
+        )
+        
+        # Live headline subscriptions live in each client's registry entry
+        self.subscription_ids = itertools.count(1)
+        self.pushed = 0
+        
+        # Encoded response bodies shared by every client sending the same request
+        self.shared_frames = TTLCache(max_entries=cache_size)
+        self.shared_frame_hits = 0
+        self.shared_frame_misses = 0
+        self.stats_lock = threading.Lock()
+        
+        # Recent headline listings, answered by index for details requests
+        self.article_store = ArticleStore()
+        
+        # Keep-alive connection pool shared by every NewsAPI call, all of
+        # which pass the governor that keeps us within the plan's quota
+        self.upstream = UpstreamClient(
+            self.base_url,
+            self.api_key,
+            pool_size=pool_size,
+            retries=upstream_retries,
+            governor=UpstreamGovernor(
+                requests_per_minute=upstream_rate,
+                burst=upstream_burst,
+                daily_quota=daily_quota
+            ),
+            failure_threshold=breaker_threshold,
+            reset_timeout=breaker_reset
+        )
+        
     def start_server(self):
         """
         Start the server and begin listening for connections
@@ -38,10 +270,19 @@ class NewsServer:
             bool: True if server started successfully, False otherwise
         """
         try:
+            self.warm_caches()
+            if self.prefetcher:
+                self.prefetcher.start()
+            if self.reaper:
+                self.reaper.start()
+            
+            # Requests are processed here, so one connection can have several in flight
+            self.request_pool.start()
+            
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.socket.bind((self.host, self.port))
-            self.socket.listen(5)
+            self.socket.listen(self.backlog)
             self.running = True
             
             print(f"Server started on {self.host}:{self.port}")
@@ -52,13 +293,23 @@ class NewsServer:
                     client_socket, client_address = self.socket.accept()
                     print(f"New client connected from {client_address}")
                     
-                    # Create new thread for each client
-                    client_thread = threading.Thread(
-                        target=self.handle_client,
-                        args=(client_socket, client_address)
-                    )
-                    client_thread.daemon = True
-                    client_thread.start()
+                    # Every connection costs a thread; refuse rather than exhaust them
+                    if not self.connection_slots.acquire(blocking=False):
+                        self.refuse_client(client_socket, client_address)
+                        continue
+                    
+                    # Create new thread for each client; it releases the slot
+                    try:
+                        client_thread = threading.Thread(
+                            target=self.handle_client,
+                            args=(client_socket, client_address)
+                        )
+                        client_thread.daemon = True
+                        client_thread.start()
+                    except RuntimeError as e:
+                        self.connection_slots.release()
+                        print(f"Cannot start a thread for {client_address}: {e}")
+                        client_socket.close()
                     
                 except socket.error as e:
                     if self.running:
@@ -75,74 +326,582 @@ class NewsServer:
         """
         Handle individual client connections and requests
         
+        Runs in the connection's own thread and gives back the connection
+        slot start_server took for it when the connection ends.
+        
         Args:
             client_socket: Client socket connection
             client_address: Client address tuple (host, port)
         """
         username = ""
+        client = None
         
         try:
-            # Receive username
+            if self.keepalive:
+                enable_keepalive(client_socket)
+            
+            # Receive username; a client that never sends one is dropped
+            client_socket.settimeout(HANDSHAKE_TIMEOUT)
             username_data = client_socket.recv(1024)
+            client_socket.settimeout(None)
             if username_data:
                 username = username_data.decode('utf-8')
                 print(f"Client {client_address} identified as: {username}")
             
-            self.clients.append({
-                'socket': client_socket,
-                'address': client_address,
-                'username': username,
-                'connected_at': datetime.now()
-            })
+            client = self.register_client(
+                client_socket, client_address, username,
+                send_lock=threading.Lock(),
+                in_flight=threading.BoundedSemaphore(MAX_IN_FLIGHT),
+                loop=None  # Pushes are sent from a worker thread
+            )
+            
+            # Announce length-prefixed framing; every later message is framed
+            send_message(client_socket, build_welcome(username, self.compress_threshold,
+                                                      self.idle_timeout or None))
             
             while True:
-                # Receive request from client
-                request_data = client_socket.recv(4096)
+                # Receive one complete framed request from client
+                frame = recv_frame(client_socket, client['compression'])
                 
-                if not request_data:
+                if frame is None:
                     break
                 
-                try:
-                    request = json.loads(request_data.decode('utf-8'))
-                    print(f"Request from {username}: {request.get('type', 'unknown')}")
-                    
-                    # Process request based on type
-                    response = self.process_request(request)
-                    
-                    # Send response back to client
-                    response_json = json.dumps(response)
-                    client_socket.send(response_json.encode('utf-8'))
-                    
-                except json.JSONDecodeError:
-                    error_response = {
-                        'type': 'error',
-                        'message': 'Invalid JSON format'
-                    }
-                    client_socket.send(json.dumps(error_response).encode('utf-8'))
+                stream_id, request_data = frame
+                if client['codec'] is None and self.handle_hello(request_data, client):
+                    continue
+                self.record_received(client, request_data)
+                
+                # Process requests concurrently; stop reading while too many are pending
+                client['in_flight'].acquire()
+                if self.request_pool.submit(self.respond, client, stream_id, request_data) is None:
+                    try:
+                        body = self.overloaded_body(client)
+                        with client['send_lock']:
+                            send_frame(client_socket, body, stream_id, client['compression'])
+                            self.record_sent(client, body)
+                    finally:
+                        client['in_flight'].release()
                     
+        except socket.timeout:
+            print(f"Client {client_address} sent no username within {HANDSHAKE_TIMEOUT}s")
         except ConnectionResetError:
             print(f"Client {username} ({client_address}) disconnected unexpectedly")
+        except ProtocolError as e:
+            print(f"Protocol error from {username} ({client_address}): {e}")
         except Exception as e:
             print(f"Error handling client {username}: {e}")
         finally:
             # Clean up client connection
-            self.remove_client(client_socket)
+            if client is not None:
+                self.remove_client(client['id'])
             try:
                 client_socket.close()
                 print(f"Connection with {username} ({client_address}) closed")
             except:
                 pass
+            self.connection_slots.release()
+    
+    def respond(self, client, stream_id, request_data):
+        """
+        Answer one request of a threaded-engine connection
+        
+        Args:
+            client (dict): Registry entry of the requesting client
+            stream_id (int): Stream id the response is sent under
+            request_data (bytes): Frame body received from the client
+        """
+        try:
+            try:
+                body = self.handle_frame(request_data, client)
+            except Exception as e:
+                # The client is waiting on this stream id, so always answer it
+                print(f"Error answering {client['username']}: {e}")
+                body = self.server_error_body(client, e)
+            # Compression state must see frames in the order they are sent
+            with client['send_lock']:
+                send_frame(client['socket'], body, stream_id, client['compression'])
+                self.record_sent(client, body)
+        except OSError:
+            pass  # Client went away while the request was processed
+        finally:
+            client['in_flight'].release()
+    
+    def start_async_server(self):
+        """
+        Start the asyncio engine and serve until interrupted
+        
+        Each connection is a coroutine instead of a thread, so idle clients
+        only cost a socket and a small stream buffer. Blocking NewsAPI calls
+        are handed to a fixed-size thread pool so they never stall the loop.
+        
+        Returns:
+            bool: True if server ran successfully, False otherwise
+        """
+        try:
+            asyncio.run(self.serve_async())
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            print(f"Failed to start server: {e}")
+            return False
+        
+        return True
+    
+    async def serve_async(self):
+        """Create the listening socket and run the asyncio accept loop"""
+        raise_open_file_limit()
+        self.warm_caches()
+        if self.prefetcher:
+            self.prefetcher.start()
+        if self.reaper:
+            self.reaper.start()
+        self.request_pool.start()
+        
+        server = await asyncio.start_server(
+            self.handle_client_async,
+            self.host,
+            self.port,
+            backlog=self.backlog,
+            reuse_address=True
+        )
+        self.running = True
+        
+        print(f"Server started on {self.host}:{self.port} (asyncio, backlog {self.backlog})")
+        print("Waiting for client connections...")
+        
+        async with server:
+            await server.serve_forever()
+    
+    async def handle_client_async(self, reader, writer):
+        """
+        Handle an individual client connection on the asyncio engine
+        
+        Args:
+            reader (asyncio.StreamReader): Client stream reader
+            writer (asyncio.StreamWriter): Client stream writer
+        """
+        client_address = writer.get_extra_info('peername')
+        username = ""
+        print(f"New client connected from {client_address}")
+        
+        # No max_clients check: an idle coroutine costs no thread
+        client = None
+        try:
+            if self.keepalive:
+                enable_keepalive(writer.get_extra_info('socket'))
+            
+            # Receive username; a client that never sends one is dropped
+            username_data = await asyncio.wait_for(reader.read(1024), HANDSHAKE_TIMEOUT)
+            if username_data:
+                username = username_data.decode('utf-8')
+                print(f"Client {client_address} identified as: {username}")
+            
+            # The writer stands in for the socket so stop_server can close it
+            client = self.register_client(
+                writer, client_address, username,
+                send_lock=asyncio.Lock(),
+                in_flight=asyncio.Semaphore(MAX_IN_FLIGHT),
+                loop=asyncio.get_running_loop()  # Pushes are written on the loop
+            )
+            
+            await write_message(writer, build_welcome(username, self.compress_threshold,
+                                                      self.idle_timeout or None))
+            
+            tasks = set()
+            while True:
+                frame = await read_frame(reader, client['compression'])
+                
+                if frame is None:
+                    break
+                
+                stream_id, request_data = frame
+                if client['codec'] is None and self.handle_hello(request_data, client):
+                    continue
+                self.record_received(client, request_data)
+                
+                # Answer concurrently; stop reading while too many are pending
+                await client['in_flight'].acquire()
+                task = asyncio.create_task(self.respond_async(client, stream_id, request_data))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                
+        except asyncio.TimeoutError:
+            print(f"Client {client_address} sent no username within {HANDSHAKE_TIMEOUT}s")
+        except ConnectionResetError:
+            print(f"Client {username} ({client_address}) disconnected unexpectedly")
+        except ProtocolError as e:
+            print(f"Protocol error from {username} ({client_address}): {e}")
+        except Exception as e:
+            print(f"Error handling client {username}: {e}")
+        finally:
+            if client is not None:
+                self.remove_client(client['id'])
+            try:
+                writer.close()
+                print(f"Connection with {username} ({client_address}) closed")
+            except:
+                pass
     
-    def remove_client(self, client_socket):
-        """Remove client from active clients list"""
-        self.clients = [client for client in self.clients if client['socket'] != client_socket]
+    async def respond_async(self, client, stream_id, request_data):
+        """
+        Answer one request of an asyncio-engine connection
+        
+        Args:
+            client (dict): Registry entry of the requesting client
+            stream_id (int): Stream id the response is sent under
+            request_data (bytes): Frame body received from the client
+        """
+        try:
+            # Run the same dispatch as the threaded engine off the loop
+            future = self.request_pool.submit(self.handle_frame, request_data, client)
+            if future is None:
+                body = self.overloaded_body(client)
+            else:
+                try:
+                    body = await asyncio.wrap_future(future)
+                except Exception as e:
+                    # The client is waiting on this stream id, so always answer it
+                    print(f"Error answering {client['username']}: {e}")
+                    body = self.server_error_body(client, e)
+            async with client['send_lock']:
+                await write_frame(client['socket'], body, stream_id, client['compression'])
+                self.record_sent(client, body)
+        except (OSError, RuntimeError):
+            pass  # Client went away while the request was processed
+        finally:
+            client['in_flight'].release()
     
-    def process_request(self, request):
+    def overloaded_response(self, message='Server is overloaded, try again later'):
+        """
+        Build the error sent when a request or connection is turned away
+        
+        Args:
+            message (str): Human-readable reason
+            
+        Returns:
+            dict: Error response with code 'overloaded'
+        """
+        return {
+            'type': 'error',
+            'code': 'overloaded',
+            'message': message,
+            'retry_after': OVERLOADED_RETRY_AFTER
+        }
+    
+    def upstream_error_response(self, error):
+        """
+        Build the error sent when NewsAPI failed and nothing is cached
+        
+        Args:
+            error (UpstreamError): Error raised by the upstream client
+            
+        Returns:
+            dict: Error response; rate limiting and an open circuit carry
+            a code and a retry_after hint
+        """
+        if isinstance(error, RateLimited):
+            code = 'rate_limited'
+        elif isinstance(error, CircuitOpen):
+            code = 'upstream_unavailable'
+        else:
+            return {
+                'type': 'error',
+                'message': f'API request failed: {error.status_code}'
+            }
+        return {
+            'type': 'error',
+            'code': code,
+            'message': f'News service is busy: {error}',
+            'retry_after': round(error.retry_after, 1)
+        }
+    
+    def overloaded_body(self, client):
+        """Encode the overloaded error in the client's codec"""
+        return (client['codec'] or JSON_CODEC).encode(self.overloaded_response())
+    
+    def server_error_body(self, client, error):
+        """Encode the error sent for a request whose processing raised"""
+        return (client['codec'] or JSON_CODEC).encode({
+            'type': 'error',
+            'message': f'Server error: {str(error)}'
+        })
+    
+    def refuse_client(self, client_socket, client_address):
+        """
+        Turn away a connection of the threaded engine when at max_clients
+        
+        Args:
+            client_socket: Accepted client socket
+            client_address: Client address tuple (host, port)
+        """
+        self.refused_clients += 1
+        print(f"Refusing {client_address}: {self.max_clients} connections open")
+        try:
+            send_message(client_socket, self.overloaded_response('Too many clients connected'))
+        except OSError:
+            pass
+        finally:
+            client_socket.close()
+    
+    def handle_hello(self, request_data, client):
+        """
+        Apply the codec and compression chosen in a client's hello
+        
+        The first frame of a connection is JSON: either the hello or, from
+        clients that skip it, a plain request that is answered in JSON.
+        
+        Args:
+            request_data (bytes): First frame body received from the client
+            client (dict): Registry entry of the client
+            
+        Returns:
+            bool: True if the frame was a hello and needs no response
+        """
+        client['codec'] = JSON_CODEC
+        try:
+            hello = parse_hello(decode_message(request_data))
+        except ValueError:
+            hello = None
+        if hello is None:
+            return False
+        
+        client['codec'], compression = hello
+        if compression is not None:
+            client['compression'] = CompressionStream(
+                compression,
+                threshold=self.compress_threshold,
+                counters=self.compression_counters
+            )
+        print(f"Client {client['username']} selected codec: {client['codec'].name}, "
+              f"compression: {compression or 'none'}")
+        return True
+    
+    def handle_frame(self, request_data, client):
+        """
+        Decode one framed request and produce its encoded response
+        
+        Responses that only depend on the request and on cached data are
+        kept as ready-to-send encoded bodies, so identical hot requests
+        from any client skip formatting and encoding entirely.
+        
+        Args:
+            request_data (bytes): Frame body received from the client
+            client (dict): Registry entry of the requesting client
+            
+        Returns:
+            bytes: Encoded response body
+        """
+        codec = client['codec']
+        try:
+            request = decode_message(request_data, codec)
+        except ValueError:
+            request = None
+        
+        if not isinstance(request, dict):
+            return codec.encode({
+                'type': 'error',
+                'message': f'Invalid {codec.name.upper()} format'
+            })
+        
+        print(f"Request from {client['username']}: {request.get('type', 'unknown')}")
+        
+        shared = self.shared_frame_key(request)
+        if shared is None:
+            return codec.encode(self.process_request(request, client))
+        
+        key, query = (codec.name,) + shared[0], shared[1]
+        source = self.response_cache.get(query[0]) if query else None
+        entry = self.shared_frames.get(key)
+        # A listing's frame is only useful while details and later pages of
+        # it can still be answered, and serving it must keep it stored
+        if (entry is not None and entry[0] is source
+                and (not entry[2] or self.article_store.touch(entry[2]))):
+            with self.stats_lock:
+                self.shared_frame_hits += 1
+            if query and self.prefetcher:
+                self.prefetcher.record(*query)
+            return entry[1]
+        
+        with self.stats_lock:
+            self.shared_frame_misses += 1
+        response = self.process_request(request, client)
+        body = codec.encode(response)
+        
+        # Only keep frames built from data that is still the cached copy,
+        # so a refresh of the upstream response invalidates them
+        if response.get('type') != 'error' and not response.get('stale'):
+            if query is None:
+                self.shared_frames.set(key, (None, body, response.get('result_id')),
+                                       self.cache_ttls['top-headlines'])
+            elif source is not None and self.response_cache.get(query[0]) is source:
+                ttl = self.response_cache.time_to_live(query[0])
+                if ttl and ttl > 0:
+                    self.shared_frames.set(key, (source, body, response.get('result_id')), ttl)
+        return body
+    
+    def shared_frame_key(self, request):
+        """
+        Work out whether a response can be shared between clients
+        
+        Pages of a stored listing never change because result ids are
+        content hashes. Headlines and sources answered straight from a
+        cached NewsAPI response stay valid as long as that response does.
+        Local keyword searches depend on the whole index and are not shared.
+        
+        Args:
+            request (dict): Decoded request data
+            
+        Returns:
+            tuple: (request key, (cache key, endpoint, params) of the NewsAPI
+            response it is built from, or None for stored listings), or
+            None if the response must be built for this request
+        """
+        request_type = request.get('type')
+        try:
+            if request_type == 'headlines':
+                offset, page_size, cursor = request_window(request, DEFAULT_HEADLINES_PAGE_SIZE)
+                result_id = cursor.get('r') if cursor else request.get('result_id')
+                since = request.get('since')
+                # Only strings can be part of the key; the request itself reports the error
+                if not isinstance(result_id, (str, type(None))) or not isinstance(since, (str, type(None))):
+                    return None
+                if result_id:
+                    return ('page', result_id, offset, page_size, since), None
+                
+                search_mode = request.get('search', self.keyword_search)
+                if 'keyword' in request and search_mode != 'remote':
+                    return None
+                query = self.upstream_query(request)
+                return ('headlines', query[0], offset, page_size, since), query
+            
+            if request_type == 'sources':
+                offset, page_size, cursor = request_window(request, DEFAULT_SOURCES_PAGE_SIZE)
+                filters = cursor.get('f', {}) if cursor else request
+                query = self.upstream_query({**filters, 'type': 'sources'})
+                return ('sources', query[0], offset, page_size), query
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+        return None
+    
+    def register_client(self, connection, address, username, send_lock, in_flight, loop):
+        """
+        Create a client's registry entry and add it under a new connection id
+        
+        Adding and removing entries are single dict operations, which are
+        atomic, so connection threads need no lock and a disconnect costs
+        O(1) however many clients are connected. Readers iterate over a
+        list() snapshot of the values.
+        
+        Args:
+            connection: Client socket, or asyncio writer
+            address (tuple): Client address (host, port)
+            username (str): Name sent by the client
+            send_lock: Lock serializing writes to the connection
+            in_flight: Semaphore bounding the connection's pending requests
+            loop (asyncio.AbstractEventLoop): Loop the connection is served
+                on, or None for the threaded engine
+            
+        Returns:
+            dict: The registry entry
+        """
+        client = {
+            'id': next(self.connection_ids),
+            'socket': connection,
+            'address': address,
+            'username': username,
+            'connected_at': datetime.now(),
+            'codec': None,  # Chosen by the client's hello message
+            'compression': None,
+            'send_lock': send_lock,
+            'in_flight': in_flight,
+            'loop': loop,
+            'subscriptions': {},
+            'requests': 0,
+            'bytes_in': 0,
+            'bytes_out': 0,
+            'last_active': time.time()  # Last frame received; the reaper goes by it
+        }
+        self.clients[client['id']] = client
+        return client
+    
+    def remove_client(self, client_id):
+        """Remove client from active clients registry"""
+        self.clients.pop(client_id, None)
+    
+    def record_received(self, client, payload):
+        """Count one frame read from a client (only its reader calls this)"""
+        client['requests'] += 1
+        client['bytes_in'] += HEADER_SIZE + len(payload)
+        client['last_active'] = time.time()
+    
+    def record_sent(self, client, body):
+        """
+        Count one frame written to a client; call with its send_lock held
+        
+        Writes do not refresh last_active: pushes to a client that went
+        away can keep succeeding until the socket buffer fills, so only
+        frames from the client prove it is still there.
+        """
+        client['bytes_out'] += HEADER_SIZE + len(body)
+    
+    def close_client(self, client):
+        """
+        Close a connection from outside its handler
+        
+        The handler's blocked read then ends and it cleans up as if the
+        client had disconnected.
+        
+        Args:
+            client (dict): Registry entry of the connection
+        """
+        if client['loop'] is not None:
+            # Stream writers belong to their loop and must be closed on it
+            try:
+                client['loop'].call_soon_threadsafe(client['socket'].close)
+            except RuntimeError:
+                pass  # Loop already stopped
+            return
+        try:
+            # shutdown() wakes a recv() blocked in another thread, close() does not
+            client['socket'].shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    
+    def connection_stats(self, client):
+        """
+        Describe one connection for admin queries
+        
+        Byte counts are message sizes before compression, headers included.
+        
+        Args:
+            client (dict): Registry entry
+            
+        Returns:
+            dict: Identity, traffic counters and idle time of the connection
+        """
+        now = time.time()
+        return {
+            'id': client['id'],
+            'username': client['username'],
+            'address': f"{client['address'][0]}:{client['address'][1]}" if client['address'] else None,
+            'connected_for': round((datetime.now() - client['connected_at']).total_seconds(), 1),
+            'idle_for': round(now - client['last_active'], 1),
+            'requests': client['requests'],
+            'bytes_in': client['bytes_in'],
+            'bytes_out': client['bytes_out'],
+            'subscriptions': len(client['subscriptions']),
+            'codec': client['codec'].name if client['codec'] else None,
+            'compression': client['compression'].name if client['compression'] else None
+        }
+    
+    def process_request(self, request, client=None):
         """
         Process client requests and return appropriate responses
         
         Args:
             request (dict): Client request data
+            client (dict): Registry entry of the requesting client, used
+                by subscriptions and batches
             
         Returns:
             dict: Response data to send back to client
@@ -155,79 +914,277 @@ class NewsServer:
             return self.handle_sources_request(request)
         elif request_type == 'details':
             return self.handle_details_request(request)
+        elif request_type == 'stats':
+            return self.handle_stats_request(request)
+        elif request_type == 'batch':
+            return self.handle_batch_request(request, client)
+        elif request_type == 'subscribe':
+            return self.handle_subscribe_request(request, client)
+        elif request_type == 'unsubscribe':
+            return self.handle_unsubscribe_request(request, client)
+        elif request_type == 'ping':
+            return self.handle_ping_request(request)
         else:
             return {
                 'type': 'error',
                 'message': f'Unknown request type: {request_type}'
             }
     
-    def handle_headlines_request(self, request):
+    def headlines_params(self, request):
         """
-        Handle headlines requests from clients
+        Build NewsAPI top-headlines parameters for a headlines request
         
         Args:
             request (dict): Headlines request data
             
         Returns:
-            dict: Headlines response data
+            dict: Query parameters without the API key
+        """
+        params = {
+            'pageSize': UPSTREAM_PAGE_SIZE  # Pages are sliced server-side
+        }
+        
+        # Add search parameters
+        if 'keyword' in request:
+            params['q'] = request['keyword']
+        if 'category' in request:
+            params['category'] = request['category']
+        if 'country' in request:
+            params['country'] = request['country']
+        else:
+            params['country'] = 'us'  # Default country
+        return params
+    
+    def sources_params(self, request):
+        """
+        Build NewsAPI sources parameters for a sources request
+        
+        Args:
+            request (dict): Sources request data
+            
+        Returns:
+            dict: Query parameters without the API key
+        """
+        params = {}
+        
+        # Add search parameters
+        if 'category' in request:
+            params['category'] = request['category']
+        if 'country' in request:
+            params['country'] = request['country']
+        if 'language' in request:
+            params['language'] = request['language']
+        return params
+    
+    def upstream_query(self, request):
+        """
+        Map a headlines or sources request to the NewsAPI call serving it
+        
+        Args:
+            request (dict): Headlines or sources request data
+            
+        Returns:
+            tuple: (cache key, endpoint, params)
+        """
+        if request.get('type') == 'sources':
+            endpoint, params = 'sources', self.sources_params(request)
+        else:
+            endpoint, params = 'top-headlines', self.headlines_params(request)
+        return make_cache_key(endpoint, params), endpoint, params
+    
+    def fetch_newsapi(self, endpoint, params):
         """
+        Fetch a NewsAPI endpoint through the shared response cache
+        
+        Identical requests (after normalizing the params) are answered from
+        the cache until the endpoint's TTL expires, and concurrent misses
+        share a single upstream call. If NewsAPI times out, is unreachable
+        or rate limits us (including while the governor backs off or the
+        circuit breaker is open), the expired cache entry or the last
+        persisted snapshot is served instead.
+        
+        Args:
+            endpoint (str): NewsAPI endpoint, e.g. 'top-headlines'
+            params (dict): Query parameters without the API key
+            
+        Returns:
+            dict: Decoded JSON body of the NewsAPI response; snapshot
+            fallbacks also carry 'stale': True and 'fetched_at'
+            
+        Raises:
+            UpstreamError: If NewsAPI answered with a non-200 status
+            requests.exceptions.RequestException: On network failures
+        """
+        key = make_cache_key(endpoint, params)
+        ttl = self.cache_ttls.get(endpoint, self.response_cache.default_ttl)
+        if self.prefetcher:
+            self.prefetcher.record(key, endpoint, params)
         try:
-            # Build API URL
-            url = f"{self.base_url}/top-headlines"
-            params = {
-                'apiKey': self.api_key,
-                'pageSize': 15  # Limit results
-            }
+            return self.response_cache.get_or_fetch(
+                key, lambda: self.request_newsapi(endpoint, params), ttl
+            )
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError, UpstreamError) as e:
+            if isinstance(e, UpstreamError) and e.status_code != 429 and e.status_code < 500:
+                raise
+            snapshot = self.response_cache.get_stale(key)
+            if snapshot is None and self.snapshot_store:
+                snapshot = self.snapshot_store.load(key)
+            if snapshot is None:
+                raise
             
-            # Add search parameters
-            if 'keyword' in request:
-                params['q'] = request['keyword']
-            if 'category' in request:
-                params['category'] = request['category']
-            if 'country' in request:
-                params['country'] = request['country']
-            else:
-                params['country'] = 'us'  # Default country
+            data, fetched_at = snapshot
+            print(f"NewsAPI unavailable ({e}), serving {endpoint} snapshot from {datetime.fromtimestamp(fetched_at)}")
+            return {**data, 'stale': True, 'fetched_at': fetched_at}
+    
+    def request_newsapi(self, endpoint, params):
+        """
+        Perform one uncached NewsAPI call
+        
+        Args:
+            endpoint (str): NewsAPI endpoint, e.g. 'top-headlines'
+            params (dict): Query parameters without the API key
             
-            print(f"Fetching headlines with params: {params}")
+        Returns:
+            dict: Decoded JSON body of the NewsAPI response
+        """
+        print(f"Fetching {endpoint} with params: {params}")
+        data = self.upstream.get(endpoint, params)
+        
+        if endpoint == 'top-headlines':
+            key = make_cache_key(endpoint, params)
+            key_params = dict(key[1])
+            articles = data.get('articles', [])
+            self.search_index.add_all(articles, key_params.get('country'), key_params.get('category'))
+            self.publish(key, articles, key_params.get('country'), key_params.get('category'))
+        
+        if self.snapshot_store:
+            try:
+                self.snapshot_store.save(make_cache_key(endpoint, params), data)
+            except sqlite3.Error as e:
+                print(f"Could not save snapshot: {e}")
+        return data
+    
+    def refresh(self, endpoint, params):
+        """
+        Fetch a query from NewsAPI and replace its cache entry
+        
+        Args:
+            endpoint (str): NewsAPI endpoint
+            params (dict): Query parameters without the API key
             
-            # Make API request
-            response = requests.get(url, params=params, timeout=10)
+        Returns:
+            dict: Decoded JSON body of the NewsAPI response
+        """
+        data = self.request_newsapi(endpoint, params)
+        ttl = self.cache_ttls.get(endpoint, self.response_cache.default_ttl)
+        self.response_cache.set(make_cache_key(endpoint, params), data, ttl)
+        return data
+    
+    def warm_caches(self):
+        """Load persisted snapshots and articles into the response cache and search index"""
+        if not self.snapshot_store:
+            return
+        
+        self.snapshot_store.prune_articles(self.search_index.max_age)
+        for article, country, category, fetched_at in self.snapshot_store.iter_articles(
+                max_age=self.search_index.max_age):
+            self.search_index.add(article, country, category, listed_at=fetched_at)
+        
+        now = time.time()
+        warmed = 0
+        max_age = max(self.cache_ttls.values())
+        for key, data, fetched_at in self.snapshot_store.recent_snapshots(max_age):
+            remaining = self.cache_ttls.get(key[0], self.response_cache.default_ttl) - (now - fetched_at)
+            if remaining > 0 and self.response_cache.get(key) is None:
+                self.response_cache.set(key, data, remaining)
+                warmed += 1
+        
+        print(f"Warmed {warmed} cached responses and {self.search_index.stats()['documents']} "
+              f"indexed articles from {self.snapshot_store.path}")
+    
+    def handle_headlines_request(self, request):
+        """
+        Handle headlines requests from clients
+        
+        The full articles are kept in the server-side article store under
+        the listing's result_id; only one page of list view fields is sent.
+        Later pages (via 'cursor', or 'result_id' with 'page') are sliced
+        from the stored listing without another NewsAPI call.
+        
+        Args:
+            request (dict): Headlines request data
             
-            if response.status_code == 200:
-                data = response.json()
-                articles = data.get('articles', [])
-                
-                # Format articles for client
-                formatted_articles = []
-                full_articles = []
-                
-                for i, article in enumerate(articles):
-                    # Basic info for list display
-                    formatted_article = {
-                        'id': i,
-                        'title': article.get('title', 'No title'),
-                        'source': article.get('source', {}).get('name', 'Unknown'),
-                        'author': article.get('author', 'Unknown'),
-                        'publishedAt': article.get('publishedAt', 'Unknown')
-                    }
-                    formatted_articles.append(formatted_article)
-                    
-                    # Full article data for details
-                    full_articles.append(article)
-                
+        Returns:
+            dict: Headlines response data
+        """
+        try:
+            try:
+                offset, page_size, cursor = request_window(request, DEFAULT_HEADLINES_PAGE_SIZE)
+            except ValueError as e:
                 return {
-                    'type': 'headlines_list',
-                    'data': formatted_articles,
-                    'full_data': full_articles,
-                    'total': len(formatted_articles)
+                    'type': 'error',
+                    'message': str(e)
                 }
-            else:
+            
+            # Later pages of a listing come straight from the article store
+            result_id = cursor.get('r') if cursor else request.get('result_id')
+            since = request.get('since')
+            if not isinstance(result_id, (str, type(None))) or not isinstance(since, (str, type(None))):
+                return {
+                    'type': 'error',
+                    'message': 'result_id and since must be strings'
+                }
+            if result_id:
+                response = self.headlines_page(result_id, offset, page_size)
+                if response is None:
+                    return {
+                        'type': 'error',
+                        'message': 'Listing expired, please search again'
+                    }
+                return self.headlines_delta(response, since, offset, page_size)
+            
+            params = self.headlines_params(request)
+            
+            search_mode = request.get('search', self.keyword_search)
+            if search_mode not in KEYWORD_SEARCH_MODES:
                 return {
                     'type': 'error',
-                    'message': f'API request failed: {response.status_code}'
+                    'message': f'Unknown search mode: {search_mode}'
                 }
+            
+            # Keyword searches can be answered from the local index
+            data = {}
+            articles = None
+            endpoint = 'top-headlines'
+            if 'q' in params and search_mode != 'remote':
+                articles = self.search_index.search(
+                    params['q'],
+                    limit=params['pageSize'],
+                    country=params['country'].strip().lower(),
+                    category=params.get('category', '').strip().lower() or None
+                )
+                endpoint = 'local-search'
+                if not articles and search_mode == 'local_then_remote':
+                    articles = None
+            
+            if articles is None:
+                endpoint = 'top-headlines'
+                data = self.fetch_newsapi(endpoint, params)
+                articles = data.get('articles', [])
+            
+            # Keep the full articles server-side for details and later pages
+            result_id = make_result_id(make_cache_key(endpoint, params), articles)
+            self.article_store.put(result_id, articles)
+            
+            response = self.headlines_page(result_id, offset, page_size)
+            response['search'] = 'local' if endpoint == 'local-search' else 'remote'
+            if data.get('stale'):
+                response['stale'] = True
+                response['fetched_at'] = data['fetched_at']
+            return self.headlines_delta(response, since, offset, page_size)
                 
+        except UpstreamError as e:
+            return self.upstream_error_response(e)
         except requests.exceptions.Timeout:
             return {
                 'type': 'error',
@@ -244,6 +1201,99 @@ class NewsServer:
                 'message': f'Server error: {str(e)}'
             }
     
+    def headlines_delta(self, response, since, offset, page_size):
+        """
+        Reduce a headlines page to its changes since a listing the client has
+        
+        Result ids are content hashes, so a client that sends the result_id
+        it already holds as 'since' gets not_modified when the listing is
+        unchanged, or only the added articles and removed keys of the same
+        page window when it changed.
+        
+        Args:
+            response (dict): Full headlines_list response
+            since (str): Result id the client last received, or None
+            offset (int): Index of the first article on the page
+            page_size (int): Maximum articles on the page
+            
+        Returns:
+            dict: not_modified, headlines_delta or the full response when
+            the old listing expired or nothing is shared with it
+        """
+        if not since:
+            return response
+        if since == response['result_id']:
+            return {
+                'type': 'not_modified',
+                'result_id': since
+            }
+        
+        base = self.article_store.page(since, offset, page_size)
+        if base is None:
+            return response
+        
+        base_keys = {article_key(article) for article in base[0]}
+        keys = [article['key'] for article in response['data']]
+        added = [article for article in response['data'] if article['key'] not in base_keys]
+        if len(added) == len(keys):
+            return response
+        
+        delta = {
+            'type': 'headlines_delta',
+            'base': since,
+            'added': added,
+            'removed': sorted(base_keys.difference(keys)),
+            'order': keys,
+            'offset': offset
+        }
+        for field in ('result_id', 'total', 'page', 'page_size', 'next_cursor',
+                      'search', 'stale', 'fetched_at'):
+            if field in response:
+                delta[field] = response[field]
+        return delta
+    
+    def headlines_page(self, result_id, offset, page_size):
+        """
+        Build one page of a stored headlines listing
+        
+        Args:
+            result_id (str): Result-set id in the article store
+            offset (int): Index of the first article on the page
+            page_size (int): Maximum articles on the page
+            
+        Returns:
+            dict: Headlines response data, or None if the listing expired
+        """
+        page = self.article_store.page(result_id, offset, page_size)
+        if page is None:
+            return None
+        articles, total = page
+        
+        # Format articles for client; ids index the whole listing, keys
+        # identify the article itself so clients can apply deltas
+        formatted_articles = []
+        for i, article in enumerate(articles):
+            formatted_articles.append({
+                'id': offset + i,
+                'key': article_key(article),
+                'title': article.title,
+                'source': article.source,
+                'author': article.author,
+                'publishedAt': article.publishedAt
+            })
+        
+        next_offset = offset + len(articles)
+        return {
+            'type': 'headlines_list',
+            'result_id': result_id,
+            'data': formatted_articles,
+            'total': total,
+            'page': offset // page_size + 1,
+            'page_size': page_size,
+            'next_cursor': encode_cursor({'r': result_id, 'o': next_offset, 'n': page_size})
+                           if next_offset < total else None
+        }
+    
     def handle_sources_request(self, request):
         """
         Handle sources requests from clients
@@ -255,53 +1305,52 @@ class NewsServer:
             dict: Sources response data
         """
         try:
-            # Build API URL
-            url = f"{self.base_url}/sources"
-            params = {
-                'apiKey': self.api_key
-            }
-            
-            # Add search parameters
-            if 'category' in request:
-                params['category'] = request['category']
-            if 'country' in request:
-                params['country'] = request['country']
-            if 'language' in request:
-                params['language'] = request['language']
+            try:
+                offset, page_size, cursor = request_window(request, DEFAULT_SOURCES_PAGE_SIZE)
+            except ValueError as e:
+                return {
+                    'type': 'error',
+                    'message': str(e)
+                }
             
-            print(f"Fetching sources with params: {params}")
+            # A cursor carries the filters of the listing it continues
+            filters = cursor.get('f', {}) if cursor else request
+            params = self.sources_params(filters)
             
-            # Make API request
-            response = requests.get(url, params=params, timeout=10)
+            data = self.fetch_newsapi('sources', params)
+            sources = data.get('sources', [])
             
-            if response.status_code == 200:
-                data = response.json()
-                sources = data.get('sources', [])
-                
-                # Format sources for client
-                formatted_sources = []
-                for source in sources:
-                    formatted_source = {
-                        'name': source.get('name', 'Unknown'),
-                        'country': source.get('country', 'Unknown'),
-                        'category': source.get('category', 'Unknown'),
-                        'language': source.get('language', 'Unknown'),
-                        'url': source.get('url', 'Unknown'),
-                        'description': source.get('description', 'No description available')
-                    }
-                    formatted_sources.append(formatted_source)
-                
-                return {
-                    'type': 'sources_list',
-                    'data': formatted_sources,
-                    'total': len(formatted_sources)
-                }
-            else:
-                return {
-                    'type': 'error',
-                    'message': f'API request failed: {response.status_code}'
+            # Format only the requested window of sources for client
+            formatted_sources = []
+            for source in sources[offset:offset + page_size]:
+                formatted_source = {
+                    'name': source.get('name', 'Unknown'),
+                    'country': source.get('country', 'Unknown'),
+                    'category': source.get('category', 'Unknown'),
+                    'language': source.get('language', 'Unknown'),
+                    'url': source.get('url', 'Unknown'),
+                    'description': source.get('description', 'No description available')
                 }
+                formatted_sources.append(formatted_source)
+            
+            next_offset = offset + len(formatted_sources)
+            response = {
+                'type': 'sources_list',
+                'data': formatted_sources,
+                'total': len(sources),
+                'offset': offset,
+                'page': offset // page_size + 1,
+                'page_size': page_size,
+                'next_cursor': encode_cursor({'f': params, 'o': next_offset, 'n': page_size})
+                               if next_offset < len(sources) else None
+            }
+            if data.get('stale'):
+                response['stale'] = True
+                response['fetched_at'] = data['fetched_at']
+            return response
                 
+        except UpstreamError as e:
+            return self.upstream_error_response(e)
         except requests.exceptions.Timeout:
             return {
                 'type': 'error',
@@ -322,6 +1371,10 @@ class NewsServer:
         """
         Handle article details requests from clients
         
+        Articles are looked up by index in the listing named by result_id.
+        Requests on one connection are answered concurrently, so "the last
+        listing" is not well defined and result_id is required.
+        
         Args:
             request (dict): Details request data
             
@@ -337,19 +1390,23 @@ class NewsServer:
                     'message': 'Article ID is required'
                 }
             
-            # For this implementation, we'll return a mock detailed response
-            # In a real application, you might store the full articles or make another API call
+            result_id = request.get('result_id')
+            if not isinstance(result_id, str) or not result_id:
+                return {
+                    'type': 'error',
+                    'message': 'result_id of a headlines listing is required'
+                }
+            
+            article = self.article_store.get(result_id, int(article_id))
+            if article is None:
+                return {
+                    'type': 'error',
+                    'message': 'Article not found - the listing may have expired, please search again'
+                }
+            
             return {
                 'type': 'article_details',
-                'data': {
-                    'title': f'Detailed article {article_id}',
-                    'source': 'News Source',
-                    'author': 'News Author',
-                    'publishedAt': datetime.now().isoformat(),
-                    'url': 'https://example.com/article',
-                    'description': 'This is a detailed description of the article.',
-                    'content': 'This is the full content of the article. In a real implementation, this would contain the actual article content from the API.'
-                }
+                'data': article._asdict()
             }
             
         except Exception as e:
@@ -358,13 +1415,328 @@ class NewsServer:
                 'message': f'Server error: {str(e)}'
             }
     
+    def handle_batch_request(self, request, client=None):
+        """
+        Handle batch requests from clients
+        
+        Every sub-request runs concurrently through the normal dispatch, so
+        cached items return at once and upstream misses overlap instead of
+        queueing. A failing item only puts an error in its own slot.
+        
+        Args:
+            request (dict): Batch request data with a 'requests' list
+            client (dict): Registry entry of the requesting client
+            
+        Returns:
+            dict: Batch response data, one response per sub-request in order
+        """
+        items = request.get('requests')
+        if not isinstance(items, list) or not items:
+            return {
+                'type': 'error',
+                'message': 'Batch requests need a non-empty requests list'
+            }
+        if len(items) > MAX_BATCH_SIZE:
+            return {
+                'type': 'error',
+                'message': f'Batch too large: at most {MAX_BATCH_SIZE} requests'
+            }
+        
+        futures = [
+            self.batch_executor.submit(self.process_batch_item, item, client)
+            for item in items
+        ]
+        results = [future.result() for future in futures]
+        
+        return {
+            'type': 'batch_results',
+            'data': results,
+            'total': len(results),
+            'errors': sum(1 for result in results if result.get('type') == 'error')
+        }
+    
+    def process_batch_item(self, item, client=None):
+        """
+        Process one sub-request of a batch
+        
+        Args:
+            item (dict): Sub-request data
+            client (dict): Registry entry of the requesting client
+            
+        Returns:
+            dict: Response data for this item
+        """
+        if not isinstance(item, dict):
+            return {
+                'type': 'error',
+                'message': 'Batch items must be request objects'
+            }
+        if item.get('type') == 'batch':
+            return {
+                'type': 'error',
+                'message': 'Batch requests cannot be nested'
+            }
+        
+        try:
+            return self.process_request(item, client)
+        except Exception as e:
+            return {
+                'type': 'error',
+                'message': f'Server error: {str(e)}'
+            }
+    
+    def handle_subscribe_request(self, request, client=None):
+        """
+        Handle subscribe requests from clients
+        
+        Registers a country/category/keyword filter on the client's
+        registry entry. Articles already in the current listing are taken
+        as seen, so only articles that arrive later are pushed.
+        
+        Args:
+            request (dict): Subscribe request data
+            client (dict): Registry entry of the requesting client
+            
+        Returns:
+            dict: Subscription confirmation or error response
+        """
+        if client is None:
+            return {
+                'type': 'error',
+                'message': 'Subscriptions need a client connection'
+            }
+        if len(client['subscriptions']) >= MAX_SUBSCRIPTIONS:
+            return {
+                'type': 'error',
+                'message': f'Too many subscriptions: at most {MAX_SUBSCRIPTIONS}'
+            }
+        for field in ('country', 'category', 'keyword'):
+            if not isinstance(request.get(field, ''), str):
+                return {
+                    'type': 'error',
+                    'message': f'{field} must be a string'
+                }
+        
+        subscription = Subscription(
+            next(self.subscription_ids),
+            country=request.get('country', 'us'),
+            category=request.get('category'),
+            keyword=request.get('keyword')
+        )
+        
+        # Seed with the current listing so the first push only has news
+        key, endpoint, params = self.upstream_query(subscription.request())
+        try:
+            data = self.fetch_newsapi(endpoint, params)
+            key_params = dict(key[1])
+            subscription.take_new(
+                data.get('articles', []), key_params.get('country'), key_params.get('category')
+            )
+        except Exception as e:
+            print(f"Could not seed subscription {subscription.id}: {e}")
+        
+        client['subscriptions'][subscription.id] = subscription
+        print(f"Client {client['username']} subscribed to {subscription.describe()}")
+        return {
+            'type': 'subscribed',
+            'subscription_id': subscription.id,
+            'filter': subscription.describe()
+        }
+    
+    def handle_unsubscribe_request(self, request, client=None):
+        """
+        Handle unsubscribe requests from clients
+        
+        Args:
+            request (dict): Unsubscribe request data with 'subscription_id'
+            client (dict): Registry entry of the requesting client
+            
+        Returns:
+            dict: Confirmation or error response
+        """
+        subscriptions = client['subscriptions'] if client else {}
+        if subscriptions.pop(request.get('subscription_id'), None) is None:
+            return {
+                'type': 'error',
+                'message': 'Unknown subscription'
+            }
+        return {
+            'type': 'unsubscribed',
+            'subscription_id': request.get('subscription_id')
+        }
+    
+    def subscription_queries(self):
+        """
+        List the NewsAPI queries followed by current subscriptions
+        
+        Returns:
+            list: Distinct (cache key, endpoint, params) tuples
+        """
+        queries = {}
+        for client in list(self.clients.values()):
+            for subscription in list(client.get('subscriptions', {}).values()):
+                query = self.upstream_query(subscription.request())
+                queries.setdefault(query[0], query)
+        return list(queries.values())
+    
+    def publish(self, key, articles, country=None, category=None):
+        """
+        Push newly seen articles of a fetched listing to matching subscribers
+        
+        Called once per upstream fetch, so one NewsAPI call fans out to
+        every subscriber whose filter the listing can satisfy.
+        
+        Args:
+            key (tuple): Normalized cache key of the listing
+            articles (list): Raw NewsAPI articles in listing order
+            country (str): Country of the listing
+            category (str): Category of the listing
+        """
+        result_id = None
+        for client in list(self.clients.values()):
+            for subscription in list(client.get('subscriptions', {}).values()):
+                fresh = subscription.take_new(articles, country, category)
+                if not fresh:
+                    continue
+                
+                # Keep the listing so pushed ids work with details requests
+                if result_id is None:
+                    result_id = make_result_id(key, articles)
+                    self.article_store.put(result_id, articles)
+                
+                formatted_articles = []
+                for index, article in fresh:
+                    stored = compact_article(article)
+                    formatted_articles.append({
+                        'id': index,
+                        'key': article_key(stored),
+                        'title': stored.title,
+                        'source': stored.source,
+                        'author': stored.author,
+                        'publishedAt': stored.publishedAt
+                    })
+                self.push(client, {
+                    'type': 'headlines_update',
+                    'subscription_id': subscription.id,
+                    'result_id': result_id,
+                    'data': formatted_articles
+                })
+    
+    def push(self, client, message):
+        """
+        Send an unsolicited message to a client on stream 0
+        
+        Args:
+            client (dict): Registry entry of the receiving client
+            message (dict): Message data to send
+        """
+        with self.stats_lock:
+            self.pushed += 1
+        if client['loop'] is not None:
+            asyncio.run_coroutine_threadsafe(self.push_async(client, message), client['loop'])
+        else:
+            self.request_pool.submit(self.push_threaded, client, message, admit=False)
+    
+    def push_threaded(self, client, message):
+        """Write a pushed message to a threaded-engine connection"""
+        try:
+            body = client['codec'].encode(message)
+            with client['send_lock']:
+                send_frame(client['socket'], body, 0, client['compression'])
+                self.record_sent(client, body)
+        except OSError:
+            pass  # Client went away; its registry entry is removed on disconnect
+    
+    async def push_async(self, client, message):
+        """Write a pushed message to an asyncio-engine connection"""
+        try:
+            body = client['codec'].encode(message)
+            async with client['send_lock']:
+                await write_frame(client['socket'], body, 0, client['compression'])
+                self.record_sent(client, body)
+        except (OSError, RuntimeError):
+            pass  # Client went away; its registry entry is removed on disconnect
+    
+    def handle_ping_request(self, request):
+        """
+        Handle keepalive pings from clients
+        
+        Receiving the ping already counted as activity; the pong lets the
+        client confirm the server is still there.
+        
+        Args:
+            request (dict): Ping request data; any 'data' is echoed back
+            
+        Returns:
+            dict: Pong response data
+        """
+        return {
+            'type': 'pong',
+            'data': request.get('data'),
+            'server_time': time.time()
+        }
+    
+    def handle_stats_request(self, request):
+        """
+        Handle server statistics requests from clients
+        
+        Args:
+            request (dict): Stats request data; 'connections': true adds
+                one entry per connected client
+            
+        Returns:
+            dict: Server statistics response data
+        """
+        stats = self.get_stats()
+        if request.get('connections'):
+            stats['connections'] = [
+                self.connection_stats(client) for client in list(self.clients.values())
+            ]
+        return {
+            'type': 'server_stats',
+            'data': stats
+        }
+    
+    def get_stats(self):
+        """
+        Collect runtime statistics from the server components
+        
+        Returns:
+            dict: Connected clients, response cache and upstream pool stats
+        """
+        return {
+            'clients': len(self.clients),
+            'cache': self.response_cache.stats(),
+            'stored_listings': len(self.article_store),
+            'search_index': self.search_index.stats(),
+            'prefetch': self.prefetcher.stats() if self.prefetcher else None,
+            'upstream': self.upstream.stats(),
+            'request_pool': self.request_pool.stats(),
+            'refused_clients': self.refused_clients,
+            'reaper': self.reaper.stats() if self.reaper else None,
+            'compression': self.compression_counters.stats(),
+            'subscriptions': sum(len(client.get('subscriptions', {})) for client in list(self.clients.values())),
+            'pushed': self.pushed,
+            'shared_frames': {
+                'entries': self.shared_frames.stats()['entries'],
+                'hits': self.shared_frame_hits,
+                'misses': self.shared_frame_misses
+            },
+            'store': self.snapshot_store.stats() if self.snapshot_store else None
+        }
+    
     def stop_server(self):
         """Stop the server and close all connections"""
         print("\nShutting down server...")
         self.running = False
         
+        if self.prefetcher:
+            self.prefetcher.stop()
+        if self.reaper:
+            self.reaper.stop()
+        
         # Close all client connections
-        for client in self.clients:
+        for client in list(self.clients.values()):
             try:
                 client['socket'].close()
             except:
@@ -377,14 +1749,115 @@ class NewsServer:
             except:
                 pass
         
+        self.request_pool.shutdown()
+        self.batch_executor.shutdown(wait=False)
+        
+        print(f"Upstream stats: {self.upstream.stats()}")
+        self.upstream.close()
+        
+        if self.snapshot_store:
+            self.snapshot_store.close()
+        
         print("Server stopped")
 
+def raise_open_file_limit():
+    """Raise the soft open-file limit so the asyncio engine can hold many sockets"""
+    if resource is None:
+        return
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if hard == resource.RLIM_INFINITY or hard > soft:
+            target = hard if hard != resource.RLIM_INFINITY else 65536
+            resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, target), hard))
+    except (ValueError, OSError) as e:
+        print(f"Could not raise open file limit: {e}")
+
 def main():
     """Main function to start the news server"""
-    server = NewsServer()
+    parser = argparse.ArgumentParser(description="News server")
+    parser.add_argument('--host', default='localhost', help="Hostname to bind to")
+    parser.add_argument('--port', type=int, default=12345, help="Port to listen on")
+    parser.add_argument('--mode', choices=['threaded', 'asyncio'], default='threaded',
+                        help="Connection engine: one thread per client, or asyncio")
+    parser.add_argument('--backlog', type=int, default=128,
+                        help="Pending connection queue size")
+    parser.add_argument('--upstream-workers', type=int, default=32,
+                        help="Threads processing requests and their NewsAPI calls")
+    parser.add_argument('--max-queue', type=int, default=64,
+                        help="Requests waiting for a worker before new ones get 'overloaded'")
+    parser.add_argument('--max-clients', type=int, default=512,
+                        help="Connections the threaded engine serves before refusing new ones")
+    parser.add_argument('--cache-size', type=int, default=512,
+                        help="Maximum number of cached NewsAPI responses")
+    parser.add_argument('--headlines-ttl', type=float, default=DEFAULT_CACHE_TTLS['top-headlines'],
+                        help="Seconds a cached headlines listing stays fresh")
+    parser.add_argument('--sources-ttl', type=float, default=DEFAULT_CACHE_TTLS['sources'],
+                        help="Seconds a cached sources catalog stays fresh")
+    parser.add_argument('--pool-size', type=int, default=20,
+                        help="Keep-alive connections kept open to NewsAPI")
+    parser.add_argument('--upstream-retries', type=int, default=2,
+                        help="Retries for failed NewsAPI connections and 5xx answers")
+    parser.add_argument('--upstream-rate', type=float, default=60,
+                        help="NewsAPI calls per minute allowed by the plan")
+    parser.add_argument('--upstream-burst', type=int, default=20,
+                        help="NewsAPI calls allowed back to back")
+    parser.add_argument('--daily-quota', type=int, default=None,
+                        help="NewsAPI calls allowed per day (default: unlimited)")
+    parser.add_argument('--breaker-threshold', type=int, default=3,
+                        help="Consecutive NewsAPI failures before serving cached data only (0 disables)")
+    parser.add_argument('--breaker-reset', type=float, default=30,
+                        help="Seconds before NewsAPI is probed again after the breaker opens")
+    parser.add_argument('--idle-timeout', type=float, default=300,
+                        help="Seconds a silent client keeps its connection (0 disables reaping)")
+    parser.add_argument('--no-keepalive', action='store_true',
+                        help="Do not enable TCP keepalive on client connections")
+    parser.add_argument('--keyword-search', choices=KEYWORD_SEARCH_MODES, default='local_then_remote',
+                        help="Answer keyword searches from the local index, NewsAPI, or both")
+    parser.add_argument('--prefetch-interval', type=float, default=45,
+                        help="Seconds between background refreshes of hot queries (0 disables)")
+    parser.add_argument('--prefetch-budget', type=int, default=30,
+                        help="Upstream requests per minute above which refreshes are skipped")
+    parser.add_argument('--compress-threshold', type=int, default=COMPRESS_THRESHOLD,
+                        help="Smallest response in bytes compressed for clients that support it")
+    parser.add_argument('--store', default='news_store.db',
+                        help="SQLite file for persisted NewsAPI snapshots")
+    parser.add_argument('--no-store', action='store_true',
+                        help="Do not persist NewsAPI snapshots")
+    args = parser.parse_args()
+    
+    server = NewsServer(
+        host=args.host,
+        port=args.port,
+        backlog=args.backlog,
+        upstream_workers=args.upstream_workers,
+        cache_size=args.cache_size,
+        cache_ttls={
+            'top-headlines': args.headlines_ttl,
+            'sources': args.sources_ttl
+        },
+        pool_size=args.pool_size,
+        upstream_retries=args.upstream_retries,
+        store_path=None if args.no_store else args.store,
+        keyword_search=args.keyword_search,
+        prefetch_interval=args.prefetch_interval,
+        prefetch_budget=args.prefetch_budget,
+        compress_threshold=args.compress_threshold,
+        max_queue=args.max_queue,
+        max_clients=args.max_clients,
+        upstream_rate=args.upstream_rate,
+        upstream_burst=args.upstream_burst,
+        daily_quota=args.daily_quota,
+        breaker_threshold=args.breaker_threshold,
+        breaker_reset=args.breaker_reset,
+        idle_timeout=args.idle_timeout,
+        keepalive=not args.no_keepalive
+    )
     
     try:
-        server.start_server()
+        if args.mode == 'asyncio':
+            server.start_async_server()
+        else:
+            server.start_server()
     except KeyboardInterrupt:
         print("\nServer shutdown requested")
     finally:
@@ -392,4 +1865,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,219 @@
+import json
+import sqlite3
+import threading
+import time
+
+# Let SQLite serve reads straight from a memory-mapped view of the file
+MMAP_SIZE = 256 * 1024 * 1024
+
+# Seconds between deletions of articles older than article_max_age
+PRUNE_INTERVAL = 3600
+
+
+def key_to_text(cache_key):
+    """Serialize a make_cache_key tuple for storage"""
+    endpoint, params = cache_key
+    return json.dumps([endpoint, [list(pair) for pair in params]])
+
+
+def text_to_key(text):
+    """Rebuild a make_cache_key tuple from its stored form"""
+    endpoint, params = json.loads(text)
+    return (endpoint, tuple(tuple(pair) for pair in params))
+
+
+class SnapshotStore:
+    """
+    SnapshotStore Class - Persistent SQLite copy of fetched NewsAPI data
+
+    Every successful upstream response is saved as a snapshot keyed by
+    its normalized request, and every fetched article is kept by URL
+    until it has not been fetched for article_max_age seconds.
+    The server warms its caches from here after a restart and falls back
+    to the last snapshot when NewsAPI is slow or rate limited.
+    """
+
+    def __init__(self, path, article_max_age=None):
+        """
+        Constructor method - opens (or creates) the database
+
+        Args:
+            path (str): SQLite database file
+            article_max_age (float): Seconds an article is kept after it
+                was last fetched, or None to keep articles forever
+        """
+        self.path = path
+        self.article_max_age = article_max_age
+        self.last_pruned = 0.0
+        self.pruned = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS snapshots (
+                cache_key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                body TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                country TEXT,
+                category TEXT,
+                fetched_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS snapshots_fetched_at ON snapshots (fetched_at);
+            CREATE INDEX IF NOT EXISTS articles_fetched_at ON articles (fetched_at);
+        ''')
+
+        # Databases written before articles kept their listing need the columns added
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info(articles)')}
+        for column in ('country', 'category'):
+            if column not in columns:
+                self.connection.execute(f'ALTER TABLE articles ADD COLUMN {column} TEXT')
+        self.connection.commit()
+
+    def save(self, cache_key, data):
+        """
+        Persist one upstream response and the articles it contains
+
+        Args:
+            cache_key (tuple): Normalized request key from make_cache_key
+            data (dict): Decoded NewsAPI response body
+        """
+        now = time.time()
+        params = dict(cache_key[1])
+        articles = [
+            (article['url'], json.dumps(article), params.get('country'), params.get('category'), now)
+            for article in data.get('articles', [])
+            if article.get('url')
+        ]
+
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO snapshots (cache_key, endpoint, body, fetched_at) '
+                'VALUES (?, ?, ?, ?)',
+                (key_to_text(cache_key), cache_key[0], json.dumps(data), now)
+            )
+            if articles:
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO articles (url, body, country, category, fetched_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    articles
+                )
+            self.connection.commit()
+
+        if self.article_max_age is not None and now - self.last_pruned >= PRUNE_INTERVAL:
+            self.prune_articles(self.article_max_age)
+
+    def load(self, cache_key):
+        """
+        Read the last snapshot saved for a request
+
+        Args:
+            cache_key (tuple): Normalized request key from make_cache_key
+
+        Returns:
+            tuple: (data, fetched_at) or None if never fetched
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT body, fetched_at FROM snapshots WHERE cache_key = ?',
+                (key_to_text(cache_key),)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def recent_snapshots(self, max_age):
+        """
+        Read every snapshot fetched within the last max_age seconds
+
+        Args:
+            max_age (float): Maximum snapshot age in seconds
+
+        Returns:
+            list: (cache_key, data, fetched_at) tuples, newest first
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT cache_key, body, fetched_at FROM snapshots '
+                'WHERE fetched_at >= ? ORDER BY fetched_at DESC',
+                (time.time() - max_age,)
+            ).fetchall()
+
+        return [(text_to_key(key), json.loads(body), fetched_at) for key, body, fetched_at in rows]
+
+    def iter_articles(self, max_age=None, batch_size=500):
+        """
+        Yield stored articles oldest first, reading the table in batches
+
+        Args:
+            max_age (float): Only articles fetched within this many
+                seconds, or None for all of them
+            batch_size (int): Rows fetched per query
+
+        Yields:
+            tuple: (raw NewsAPI article, country, category, fetched_at)
+            where country and category are those of the listing it was
+            last fetched in
+        """
+        last = (time.time() - max_age if max_age is not None else 0.0, '')
+        while True:
+            with self.lock:
+                rows = self.connection.execute(
+                    'SELECT url, body, country, category, fetched_at FROM articles '
+                    'WHERE (fetched_at, url) > (?, ?) ORDER BY fetched_at, url LIMIT ?',
+                    last + (batch_size,)
+                ).fetchall()
+            if not rows:
+                return
+            for url, body, country, category, fetched_at in rows:
+                yield json.loads(body), country, category, fetched_at
+            last = (rows[-1][4], rows[-1][0])
+
+    def prune_articles(self, max_age):
+        """
+        Delete articles not fetched within the last max_age seconds
+
+        Args:
+            max_age (float): Maximum article age in seconds
+
+        Returns:
+            int: Number of articles deleted
+        """
+        now = time.time()
+        with self.lock:
+            deleted = self.connection.execute(
+                'DELETE FROM articles WHERE fetched_at < ?', (now - max_age,)
+            ).rowcount
+            self.connection.commit()
+            self.last_pruned = now
+            self.pruned += deleted
+        return deleted
+
+    def stats(self):
+        """
+        Report how much data is stored
+
+        Returns:
+            dict: Snapshot and article counts
+        """
+        with self.lock:
+            snapshots = self.connection.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0]
+            articles = self.connection.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+        return {
+            'path': self.path,
+            'snapshots': snapshots,
+            'articles': articles,
+            'pruned_articles': self.pruned
+        }
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.connection.close()
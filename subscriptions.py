@@ -0,0 +1,107 @@
+import threading
+from collections import OrderedDict
+from search_index import tokenize
+
+# Live headline filters one client may hold at once
+MAX_SUBSCRIPTIONS = 10
+
+# Delivered article URLs remembered per subscription to suppress repeats
+MAX_SEEN = 1000
+
+
+class Subscription:
+    """
+    Subscription Class - One client's live headline filter
+
+    The server offers every freshly fetched headlines listing to each
+    subscription; only articles that match the filter and were not
+    delivered before are pushed, so a subscriber receives each new
+    article once no matter how many listings it shows up in.
+    """
+
+    def __init__(self, subscription_id, country='us', category=None, keyword=None):
+        """
+        Constructor method - stores the filter
+
+        Args:
+            subscription_id (int): Server-wide id sent with every update
+            country (str): Country code listings must be fetched for
+            category (str): Category listings must be fetched for, or None
+                for any category
+            keyword (str): Words that must all appear in the title or
+                description, or None for every article
+        """
+        self.id = subscription_id
+        self.country = country.strip().lower()
+        self.category = category.strip().lower() if category else None
+        self.keyword = keyword.strip() if keyword else None
+        self.terms = set(tokenize(self.keyword))
+        self.seen = OrderedDict()  # url -> None, oldest first
+        self.lock = threading.Lock()
+
+    def request(self):
+        """
+        Build the headlines request whose listing this subscription follows
+
+        Returns:
+            dict: Client request dictionary, kept warm by the prefetcher
+        """
+        request = {'type': 'headlines', 'country': self.country}
+        if self.category:
+            request['category'] = self.category
+        if self.keyword:
+            request['keyword'] = self.keyword
+        return request
+
+    def describe(self):
+        """Return the filter as sent back to the client"""
+        return {
+            'country': self.country,
+            'category': self.category,
+            'keyword': self.keyword
+        }
+
+    def matches(self, article, country, category):
+        """
+        Check an article against the filter
+
+        Args:
+            article (dict): Raw NewsAPI article
+            country (str): Country of the listing it was fetched in
+            category (str): Category of the listing it was fetched in
+
+        Returns:
+            bool: True if the article belongs to this subscription
+        """
+        if country != self.country:
+            return False
+        if self.category and category != self.category:
+            return False
+        if self.terms:
+            text = f"{article.get('title') or ''} {article.get('description') or ''}"
+            return self.terms.issubset(tokenize(text))
+        return True
+
+    def take_new(self, articles, country=None, category=None):
+        """
+        Pick the matching articles this subscriber has not received yet
+
+        Args:
+            articles (list): Raw NewsAPI articles of one listing
+            country (str): Country of the listing
+            category (str): Category of the listing
+
+        Returns:
+            list: (index in the listing, article) pairs, now marked as seen
+        """
+        fresh = []
+        with self.lock:
+            for index, article in enumerate(articles):
+                url = article.get('url')
+                if not url or url in self.seen or not self.matches(article, country, category):
+                    continue
+                self.seen[url] = None
+                fresh.append((index, article))
+            while len(self.seen) > MAX_SEEN:
+                self.seen.popitem(last=False)
+        return fresh
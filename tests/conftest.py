@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The modules live at the repository root, not in a package; make them
+# importable however pytest is started
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
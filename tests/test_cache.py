@@ -0,0 +1,111 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from cache import TTLCache, make_cache_key
+
+
+class MakeCacheKeyTest(unittest.TestCase):
+
+    def test_case_and_whitespace_share_a_key(self):
+        self.assertEqual(
+            make_cache_key('top-headlines', {'country': ' US ', 'category': 'Sports'}),
+            make_cache_key('top-headlines', {'category': 'sports', 'country': 'us'})
+        )
+
+
+class TTLCacheTest(unittest.TestCase):
+
+    def test_entries_expire(self):
+        cache = TTLCache(default_ttl=10)
+        with mock.patch('cache.time.monotonic', return_value=100.0):
+            cache.set('key', 'value')
+            self.assertEqual(cache.get('key'), 'value')
+        with mock.patch('cache.time.monotonic', return_value=111.0):
+            self.assertIsNone(cache.get('key'))
+            self.assertEqual(cache.get_stale('key')[0], 'value')
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+
+
+class GetOrFetchTest(unittest.TestCase):
+    """Concurrent misses for one key cost a single fetch"""
+
+    def run_concurrently(self, cache, fetch, count=8):
+        """Call get_or_fetch from count threads; returns (results, errors)"""
+        results, errors = [], []
+
+        def call():
+            try:
+                results.append(cache.get_or_fetch('key', fetch))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, results, errors
+
+    def wait_for_waiters(self, cache, count):
+        """Wait until count - 1 callers are coalesced behind the leader"""
+        deadline = time.monotonic() + 5
+        while cache.stats()['coalesced'] < count - 1:
+            self.assertLess(time.monotonic(), deadline, 'callers were not coalesced')
+            time.sleep(0.01)
+
+    def test_concurrent_misses_fetch_once(self):
+        cache = TTLCache()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return 'fresh'
+
+        threads, results, errors = self.run_concurrently(cache, fetch)
+        self.wait_for_waiters(cache, len(threads))
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['fresh'] * len(threads))
+        self.assertEqual(errors, [])
+        stats = cache.stats()
+        self.assertEqual((stats['misses'], stats['coalesced']), (1, len(threads) - 1))
+        # Later callers are plain hits
+        self.assertEqual(cache.get_or_fetch('key', fetch), 'fresh')
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_fetch_error_reaches_every_waiter_and_is_not_cached(self):
+        cache = TTLCache()
+        release = threading.Event()
+
+        def fetch():
+            release.wait(5)
+            raise RuntimeError('upstream down')
+
+        threads, results, errors = self.run_concurrently(cache, fetch)
+        self.wait_for_waiters(cache, len(threads))
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), len(threads))
+        self.assertTrue(all(str(error) == 'upstream down' for error in errors))
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.get_or_fetch('key', lambda: 'recovered'), 'recovered')
+
+
+if __name__ == '__main__':
+    unittest.main()
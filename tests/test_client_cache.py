@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+
+from client_cache import CachingClient, ClientCache, request_key
+
+HEADLINES = {'type': 'headlines', 'country': 'us'}
+
+
+def listing(result_id, titles):
+    return {
+        'type': 'headlines_list',
+        'result_id': result_id,
+        'data': [{'id': index, 'key': title.lower(), 'title': title} for index, title in enumerate(titles)],
+        'total': len(titles)
+    }
+
+
+class FakeConnection:
+    """Answers submitted requests from a list of canned responses"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def submit(self, request):
+        self.sent.append(request)
+        future = Future()
+        future.set_result(self.responses.pop(0))
+        return future
+
+
+class ClientCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1_000_000.0
+        patcher = mock.patch('client_cache.time.time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class ClientCacheTest(ClientCacheTestCase):
+
+    def test_entries_age_from_fresh_to_stale_to_expired(self):
+        cache = ClientCache(ttl=60, stale_ttl=600)
+        cache.store(HEADLINES, listing('a', ['One']))
+        self.assertEqual(cache.lookup(HEADLINES)[1], 'fresh')
+        self.now += 61
+        self.assertEqual(cache.lookup(HEADLINES)[1], 'stale')
+        self.now += 600
+        response, state = cache.lookup(HEADLINES)
+        self.assertEqual((response['result_id'], state), ('a', 'expired'))
+
+    def test_only_full_current_responses_are_stored(self):
+        cache = ClientCache()
+        cache.store(HEADLINES, {'type': 'error', 'message': 'Request timeout'})
+        cache.store(HEADLINES, {**listing('a', ['One']), 'stale': True, 'fetched_at': 0})
+        cache.store({'type': 'stats'}, {'type': 'stats', 'data': {}})
+        cache.store({'type': 'details', 'article_id': 0}, {'type': 'article_details', 'data': {}})
+        self.assertEqual(len(cache), 0)
+
+    def test_since_is_not_part_of_the_key(self):
+        self.assertEqual(request_key({**HEADLINES, 'since': 'a'}), request_key(HEADLINES))
+
+    def test_entries_survive_a_restart(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'cache.db')
+
+        cache = ClientCache(max_entries=2, path=path)
+        for country in ('us', 'gb', 'fr'):
+            cache.store({'type': 'headlines', 'country': country}, listing(country, [country]))
+        cache.close()
+
+        reopened = ClientCache(max_entries=2, path=path)
+        self.addCleanup(reopened.close)
+        self.assertIsNone(reopened.lookup({'type': 'headlines', 'country': 'us'}))
+        response, state = reopened.lookup({'type': 'headlines', 'country': 'fr'})
+        self.assertEqual((response['result_id'], state), ('fr', 'fresh'))
+        rows = reopened.connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        self.assertEqual(rows, 2)
+
+
+class CachingClientTest(ClientCacheTestCase):
+    """How send_request uses each state of a cached entry"""
+
+    def make_client(self, *responses):
+        self.cache = ClientCache(ttl=60, stale_ttl=600)
+        self.cache.store(HEADLINES, listing('a', ['One', 'Two']))
+        client = CachingClient(cache=self.cache)
+        client.connection = FakeConnection(*responses) if responses else None
+        return client
+
+    def test_fresh_entry_is_answered_locally(self):
+        client = self.make_client(listing('b', ['Other']))
+        self.assertEqual(client.send_request(HEADLINES)['result_id'], 'a')
+        self.assertEqual(client.connection.sent, [])
+
+    def test_stale_entry_is_answered_and_revalidated(self):
+        delta = {
+            'type': 'headlines_delta', 'base': 'a', 'result_id': 'b',
+            'added': [{'key': 'three', 'title': 'Three'}], 'removed': ['one'],
+            'order': ['two', 'three'], 'offset': 0, 'total': 2
+        }
+        client = self.make_client(delta)
+        self.now += 120
+        self.assertEqual(client.send_request(HEADLINES)['result_id'], 'a')
+        self.assertEqual(client.connection.sent, [{**HEADLINES, 'since': 'a'}])
+
+        response, state = self.cache.lookup(HEADLINES)
+        self.assertEqual(state, 'fresh')
+        self.assertEqual([article['title'] for article in response['data']], ['Two', 'Three'])
+
+    def test_expired_entry_asks_the_server(self):
+        client = self.make_client(listing('b', ['Other']))
+        self.now += 3600
+        self.assertEqual(client.send_request(HEADLINES)['result_id'], 'b')
+        self.assertEqual(self.cache.lookup(HEADLINES), (listing('b', ['Other']), 'fresh'))
+
+    def test_any_entry_is_used_offline(self):
+        client = self.make_client()
+        self.now += 3600
+        with mock.patch('builtins.print'):
+            response = client.send_request(HEADLINES)
+        self.assertEqual((response['result_id'], response['stale']), ('a', True))
+        # Marking it stale did not change the cached copy
+        self.assertNotIn('stale', self.cache.lookup(HEADLINES)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,238 @@
+import socket
+import unittest
+import zlib
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from protocol import (
+    COMPRESSION, HEADER, JSON_CODEC, MAX_MESSAGE_SIZE, CompressionStream, MultiplexedConnection,
+    ProtocolError, decode_message, merge_headlines_delta, recv_frame, send_frame, send_message
+)
+
+
+class FramingTest(unittest.TestCase):
+    """Length-prefixed frames with stream ids and optional compression"""
+
+    def setUp(self):
+        self.left, self.right = socket.socketpair()
+        self.left.settimeout(5)
+        self.right.settimeout(5)
+
+    def tearDown(self):
+        self.left.close()
+        self.right.close()
+
+    def test_round_trip_keeps_stream_id(self):
+        send_message(self.left, {'type': 'headlines', 'country': 'us'}, stream_id=7)
+        stream_id, payload = recv_frame(self.right)
+        self.assertEqual(stream_id, 7)
+        self.assertEqual(decode_message(payload), {'type': 'headlines', 'country': 'us'})
+
+    def test_frames_arrive_in_order(self):
+        for number in range(1, 4):
+            send_frame(self.left, JSON_CODEC.encode({'n': number}), number)
+        received = [recv_frame(self.right) for _ in range(3)]
+        self.assertEqual([stream_id for stream_id, _ in received], [1, 2, 3])
+        self.assertEqual([decode_message(body)['n'] for _, body in received], [1, 2, 3])
+
+    def test_compressed_frames_share_one_stream(self):
+        sender = CompressionStream('zlib', threshold=16)
+        receiver = CompressionStream('zlib')
+        messages = [{'type': 'headlines_list', 'data': ['same headline'] * 50, 'n': n} for n in range(3)]
+        for message in messages:
+            send_message(self.left, message, compression=sender, stream_id=1)
+        for message in messages:
+            _, payload = recv_frame(self.right, receiver)
+            self.assertEqual(decode_message(payload), message)
+        self.assertEqual(sender.counters.stats()['compressed'], 3)
+
+    def test_small_bodies_are_not_compressed(self):
+        sender = CompressionStream('zlib', threshold=1024)
+        send_message(self.left, {'type': 'ping'}, compression=sender)
+        # A flagged frame would need a CompressionStream to be read
+        stream_id, payload = recv_frame(self.right)
+        self.assertEqual(decode_message(payload), {'type': 'ping'})
+
+    def test_closed_connection_returns_none(self):
+        self.left.close()
+        self.assertIsNone(recv_frame(self.right))
+
+    def test_truncated_frame_is_rejected(self):
+        self.left.sendall(HEADER.pack(100, 1) + b'{"type":')
+        self.left.close()
+        with self.assertRaises(ProtocolError):
+            recv_frame(self.right)
+
+    def test_oversized_frame_is_rejected_before_reading_it(self):
+        self.left.sendall(HEADER.pack(MAX_MESSAGE_SIZE + 1, 1))
+        with self.assertRaises(ProtocolError):
+            recv_frame(self.right)
+
+
+class DecompressionLimitTest(unittest.TestCase):
+    """Compressed bodies may not expand past MAX_MESSAGE_SIZE"""
+
+    def test_zlib_bomb_is_rejected(self):
+        compressor = zlib.compressobj(9)
+        bomb = compressor.compress(bytes(MAX_MESSAGE_SIZE * 2)) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        with self.assertRaises(ProtocolError):
+            CompressionStream('zlib').decompress(bomb)
+
+    def test_zlib_body_at_the_limit_is_accepted(self):
+        body, compressed = CompressionStream('zlib', threshold=0).compress(b'a' * MAX_MESSAGE_SIZE)
+        self.assertTrue(compressed)
+        self.assertEqual(len(CompressionStream('zlib').decompress(body)), MAX_MESSAGE_SIZE)
+
+    def test_zstd_bomb_is_rejected(self):
+        if 'zstd' not in COMPRESSION:
+            self.skipTest('zstandard is not installed')
+        # Built with our own window size, so only the output limit can stop it
+        bomb, _ = CompressionStream('zstd', threshold=0).compress(bytes(MAX_MESSAGE_SIZE * 2))
+        with self.assertRaises(ProtocolError) as raised:
+            CompressionStream('zstd').decompress(bomb)
+        self.assertIn('too large', str(raised.exception))
+
+
+class CompressionContextTest(unittest.TestCase):
+    """Contexts are created on first use and kept small"""
+
+    def test_contexts_are_created_on_first_use(self):
+        stream = CompressionStream('zlib', threshold=64)
+        stream.compress(b'small')
+        self.assertIsNone(stream.compressor)
+        body, _ = stream.compress(b'x' * 100)
+        self.assertIsNotNone(stream.compressor)
+        self.assertIsNone(stream.decompressor)
+
+        receiver = CompressionStream('zlib')
+        self.assertEqual(receiver.decompress(body), b'x' * 100)
+        self.assertIsNone(receiver.compressor)
+
+    def test_zstd_window_larger_than_ours_is_rejected(self):
+        try:
+            import zstandard
+        except ImportError:
+            self.skipTest('zstandard is not installed')
+        compressor = zstandard.ZstdCompressor(level=19).compressobj()
+        body = compressor.compress(bytes(range(256)) * 64)
+        body += compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        with self.assertRaises(ProtocolError):
+            CompressionStream('zstd').decompress(body)
+
+
+class MultiplexedConnectionTest(unittest.TestCase):
+    """Responses resolve the Future of their stream id, in any order"""
+
+    def setUp(self):
+        self.client_sock, self.server_sock = socket.socketpair()
+        self.pushes = []
+        self.connection = MultiplexedConnection(self.client_sock, on_push=self.pushes.append)
+
+    def tearDown(self):
+        self.connection.close()
+        self.server_sock.close()
+
+    def read_requests(self, count):
+        """Read count requests on the server side as (stream id, message)"""
+        requests = []
+        for _ in range(count):
+            stream_id, payload = recv_frame(self.server_sock)
+            requests.append((stream_id, decode_message(payload)))
+        return requests
+
+    def test_responses_answered_out_of_order(self):
+        futures = [self.connection.submit({'type': 'echo', 'n': n}) for n in range(5)]
+        requests = self.read_requests(5)
+        self.assertEqual(len({stream_id for stream_id, _ in requests}), 5)
+        self.assertNotIn(0, [stream_id for stream_id, _ in requests])
+
+        for stream_id, request in reversed(requests):
+            send_message(self.server_sock, {'type': 'echoed', 'n': request['n']}, stream_id=stream_id)
+
+        self.assertEqual([future.result(5)['n'] for future in futures], list(range(5)))
+
+    def test_stream_zero_goes_to_on_push(self):
+        future = self.connection.submit({'type': 'echo'})
+        (stream_id, _), = self.read_requests(1)
+        send_message(self.server_sock, {'type': 'headlines_update', 'data': []}, stream_id=0)
+        send_message(self.server_sock, {'type': 'echoed'}, stream_id=stream_id)
+
+        self.assertEqual(future.result(5), {'type': 'echoed'})
+        self.assertEqual(self.pushes, [{'type': 'headlines_update', 'data': []}])
+
+    def test_unanswered_requests_fail_when_connection_closes(self):
+        answered = self.connection.submit({'type': 'echo', 'n': 1})
+        unanswered = self.connection.submit({'type': 'echo', 'n': 2})
+        (stream_id, _), _ = self.read_requests(2)
+        send_message(self.server_sock, {'type': 'echoed'}, stream_id=stream_id)
+        self.assertEqual(answered.result(5), {'type': 'echoed'})
+
+        self.server_sock.close()
+        with self.assertRaises(ConnectionError):
+            unanswered.result(5)
+        with self.assertRaises(ConnectionError):
+            self.connection.submit({'type': 'echo'})
+
+    def test_request_times_out_without_response(self):
+        with self.assertRaises(FutureTimeoutError):
+            self.connection.request({'type': 'echo'}, timeout=0.1)
+
+    def test_heartbeat_pings_idle_connection(self):
+        self.connection.start_heartbeat(0.05)
+        (_, request), = self.read_requests(1)
+        self.assertEqual(request, {'type': 'ping'})
+
+
+class MergeHeadlinesDeltaTest(unittest.TestCase):
+    """Rebuilding a full listing from a headlines_delta"""
+
+    def article(self, key, title=None):
+        return {'key': key, 'title': title or f'Headline {key}', 'source': 'Example'}
+
+    def setUp(self):
+        self.previous = {
+            'type': 'headlines_list',
+            'result_id': 'old',
+            'data': [{**self.article(key), 'id': index} for index, key in enumerate('abc')]
+        }
+
+    def test_added_and_removed_articles(self):
+        delta = {
+            'type': 'headlines_delta',
+            'base': 'old',
+            'result_id': 'new',
+            'added': [self.article('d')],
+            'removed': ['b'],
+            'order': ['d', 'a', 'c'],
+            'offset': 0,
+            'total': 3
+        }
+        merged = merge_headlines_delta(self.previous, delta)
+        self.assertEqual(merged['type'], 'headlines_list')
+        self.assertEqual(merged['result_id'], 'new')
+        self.assertEqual(merged['total'], 3)
+        self.assertEqual([article['key'] for article in merged['data']], ['d', 'a', 'c'])
+        self.assertEqual([article['id'] for article in merged['data']], [0, 1, 2])
+        for field in ('added', 'removed', 'order', 'base', 'offset'):
+            self.assertNotIn(field, merged)
+
+    def test_ids_follow_the_page_offset(self):
+        delta = {
+            'base': 'old', 'result_id': 'new', 'added': [], 'removed': [],
+            'order': ['c', 'b'], 'offset': 15
+        }
+        merged = merge_headlines_delta(self.previous, delta)
+        self.assertEqual([article['id'] for article in merged['data']], [15, 16])
+
+    def test_delta_for_another_listing_is_rejected(self):
+        delta = {'base': 'other', 'added': [], 'removed': [], 'order': ['a'], 'offset': 0}
+        with self.assertRaises(ValueError):
+            merge_headlines_delta(self.previous, delta)
+
+    def test_unknown_article_key_is_rejected(self):
+        delta = {'base': 'old', 'added': [], 'removed': [], 'order': ['a', 'z'], 'offset': 0}
+        with self.assertRaises(ValueError):
+            merge_headlines_delta(self.previous, delta)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import time
+import unittest
+
+from reaper import IdleReaper
+
+
+class FakeServer:
+    """Just the registry and close_client the reaper uses"""
+
+    def __init__(self, clients):
+        self.clients = {client['id']: client for client in clients}
+        self.closed = []
+
+    def close_client(self, client):
+        self.closed.append(client['id'])
+
+
+class IdleReaperTest(unittest.TestCase):
+
+    def client(self, client_id, silent_for):
+        return {'id': client_id, 'username': f'user{client_id}', 'address': ('127.0.0.1', client_id),
+                'last_active': time.time() - silent_for}
+
+    def test_only_idle_connections_are_closed(self):
+        server = FakeServer([self.client(1, 10), self.client(2, 400), self.client(3, 299)])
+        reaper = IdleReaper(server, idle_timeout=300)
+        self.assertEqual(reaper.reap(), 1)
+        self.assertEqual(server.closed, [2])
+        self.assertEqual(reaper.stats()['reaped'], 1)
+
+    def test_default_interval(self):
+        self.assertEqual(IdleReaper(None, idle_timeout=60).interval, 15)
+        self.assertEqual(IdleReaper(None, idle_timeout=600).interval, 30)
+        self.assertEqual(IdleReaper(None, idle_timeout=600, interval=5).interval, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from cache import make_cache_key
+from search_index import SearchIndex, tokenize
+from snapshot_store import SnapshotStore
+
+
+def article(number, title, description=''):
+    return {'url': f'https://example.com/{number}', 'title': title, 'description': description}
+
+
+class SearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1_000_000.0
+        patcher = mock.patch('search_index.time.time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.index = SearchIndex(max_age=3600, max_documents=3)
+
+    def titles(self, results):
+        return [result['title'] for result in results]
+
+    def test_tokenize_drops_stopwords_and_single_characters(self):
+        self.assertEqual(tokenize('The Fed raises a rate, again'), ['fed', 'raises', 'rate', 'again'])
+
+    def test_title_matches_rank_first(self):
+        self.index.add(article(1, 'Markets rally', 'Election results are due'))
+        self.index.add(article(2, 'Election night'))
+        self.assertEqual(self.titles(self.index.search('election')), ['Election night', 'Markets rally'])
+
+    def test_listing_filters(self):
+        self.index.add(article(1, 'Cup final tonight'), country='us', category='sports')
+        self.index.add(article(2, 'Final budget vote'), country='gb')
+        self.index.add(article(1, 'Cup final tonight'), country='gb')  # Listed again elsewhere
+        self.assertEqual(self.titles(self.index.search('final', country='gb', category='sports')),
+                         ['Cup final tonight'])
+        self.assertEqual(len(self.index.search('final', country='gb')), 2)
+        self.assertEqual(self.index.search('final', country='fr'), [])
+
+    def test_old_articles_no_longer_match(self):
+        self.index.add(article(1, 'Storm warning'), listed_at=self.now - 7200)
+        self.index.add(article(2, 'Storm passes'))
+        self.assertEqual(self.titles(self.index.search('storm')), ['Storm passes'])
+        self.assertEqual(self.index.stats()['documents'], 1)
+
+        self.now += 3601
+        self.assertEqual(self.index.search('storm'), [])
+        self.assertEqual(self.index.postings, {})
+
+    def test_listing_again_keeps_an_article_recent(self):
+        self.index.add(article(1, 'Storm warning'))
+        self.now += 3000
+        self.index.add(article(1, 'Storm warning'))
+        self.now += 3000
+        self.assertEqual(self.titles(self.index.search('storm')), ['Storm warning'])
+
+    def test_least_recently_listed_article_is_evicted(self):
+        for number in range(3):
+            self.index.add(article(number, f'Story {number}'))
+            self.now += 1
+        self.index.add(article(0, 'Story 0'))  # Listed again, now the most recent
+        self.index.add(article(3, 'Story 3'))
+
+        self.assertEqual(sorted(self.titles(self.index.search('story'))), ['Story 0', 'Story 2', 'Story 3'])
+        stats = self.index.stats()
+        self.assertEqual((stats['documents'], stats['evicted']), (3, 1))
+        self.assertNotIn('https://example.com/1', self.index.doc_ids)
+
+
+class SnapshotStoreArticlesTest(unittest.TestCase):
+    """Stored articles are pruned by age and reloaded oldest first"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = SnapshotStore(os.path.join(directory.name, 'store.db'))
+        self.addCleanup(self.store.close)
+
+    def save(self, fetched_at, *articles, country='us'):
+        with mock.patch('snapshot_store.time.time', return_value=fetched_at):
+            self.store.save(make_cache_key('top-headlines', {'country': country}),
+                            {'articles': list(articles)})
+
+    def test_articles_are_pruned_and_reloaded_by_age(self):
+        now = time.time()
+        self.save(now - 10 * 86400, article(1, 'Old news'))
+        self.save(now - 60, article(2, 'Recent news'))
+        self.save(now - 30, article(3, 'Latest news'), country='gb')
+
+        stored = list(self.store.iter_articles(max_age=3600, batch_size=1))
+        self.assertEqual([(item[0]['title'], item[1]) for item in stored],
+                         [('Recent news', 'us'), ('Latest news', 'gb')])
+
+        self.assertEqual(self.store.prune_articles(86400), 1)
+        self.assertEqual(self.store.stats()['articles'], 2)
+        self.assertEqual(len(list(self.store.iter_articles())), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,507 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from cache import make_cache_key
+from protocol import JSON_CODEC, decode_message, merge_headlines_delta, recv_frame, send_message
+from server import MAX_BATCH_SIZE, MAX_PAGE_SIZE, NewsServer, decode_cursor, encode_cursor, request_window
+from upstream import UpstreamError
+
+
+def make_article(number, title=None):
+    """Raw NewsAPI article"""
+    return {
+        'source': {'name': f'Source {number % 3}'},
+        'author': f'Author {number}',
+        'title': title or f'Headline {number}',
+        'description': f'Description {number}',
+        'url': f'https://example.com/{number}',
+        'publishedAt': f'2026-10-17T{number % 24:02d}:00:00Z',
+        'content': f'Content {number}'
+    }
+
+
+class StubbedServerTestCase(unittest.TestCase):
+    """
+    A NewsServer whose NewsAPI calls are answered by fake_newsapi
+
+    Requests go through handle_frame as if they came from a connected
+    client, so nothing touches the network.
+    """
+
+    def setUp(self):
+        self.server = NewsServer(store_path=None, prefetch_interval=0, idle_timeout=0)
+        self.addCleanup(self.server.stop_server)
+        self.articles = [make_article(number) for number in range(40)]
+        self.upstream_calls = []
+        patcher = mock.patch.object(self.server.upstream, 'call', self.fake_newsapi)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = self.connect_client()
+
+    def fake_newsapi(self, endpoint, params):
+        self.upstream_calls.append((endpoint, params))
+        if endpoint == 'sources':
+            return {'status': 'ok', 'sources': [
+                {'id': f'source-{n}', 'name': f'Source {n}', 'country': 'us',
+                 'category': 'general', 'language': 'en', 'url': '', 'description': ''}
+                for n in range(5)
+            ]}
+        return {'status': 'ok', 'totalResults': len(self.articles), 'articles': list(self.articles)}
+
+    def connect_client(self, username='tester'):
+        """Registry entry of a client that negotiated JSON"""
+        client = self.server.register_client(
+            None, ('127.0.0.1', 0), username,
+            send_lock=threading.Lock(), in_flight=threading.BoundedSemaphore(16), loop=None
+        )
+        client['codec'] = JSON_CODEC
+        self.addCleanup(self.server.remove_client, client['id'])
+        return client
+
+    def request(self, client=None, **request):
+        """Answer one request the way a connection's worker does"""
+        body = self.server.handle_frame(JSON_CODEC.encode(request), client or self.client)
+        return decode_message(body)
+
+
+class ThreadedServerTestCase(unittest.TestCase):
+    """Runs the threaded engine on a free port for the duration of a test"""
+
+    server_options = {}
+
+    def setUp(self):
+        options = {'store_path': None, 'prefetch_interval': 0, 'idle_timeout': 0, **self.server_options}
+        self.server = NewsServer(port=0, **options)
+        thread = threading.Thread(target=self.server.start_server, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while not self.server.running:
+            self.assertLess(time.monotonic(), deadline, 'server did not start')
+            time.sleep(0.01)
+        self.port = self.server.socket.getsockname()[1]
+        self.addCleanup(self.server.stop_server)
+
+    def connect(self):
+        """Open a connection that has not sent anything yet"""
+        sock = socket.create_connection(('localhost', self.port), timeout=5)
+        self.addCleanup(sock.close)
+        return sock
+
+    def login(self, username='tester'):
+        """Connect and complete the handshake; returns the socket"""
+        sock = self.connect()
+        sock.sendall(username.encode('utf-8'))
+        _, welcome = recv_frame(sock)
+        self.assertEqual(decode_message(welcome)['type'], 'welcome')
+        return sock
+
+    def wait_for(self, condition, message):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, message)
+            time.sleep(0.01)
+
+
+class ConnectionLimitTest(ThreadedServerTestCase):
+    """max_clients counts connections from accept, not from registration"""
+
+    server_options = {'max_clients': 3}
+
+    def assert_refused(self, sock):
+        _, body = recv_frame(sock)
+        self.assertEqual(decode_message(body)['code'], 'overloaded')
+        self.assertIsNone(recv_frame(sock))
+
+    def test_silent_sockets_count_against_the_limit(self):
+        silent = [self.connect() for _ in range(3)]
+        # None of them has sent a username, so none is registered yet
+        self.assertEqual(len(self.server.clients), 0)
+        for _ in range(2):
+            self.assert_refused(self.connect())
+        self.assertEqual(self.server.refused_clients, 2)
+
+        # Closing a connection frees its slot
+        silent[0].close()
+        self.wait_for(lambda: self.server.connection_slots.acquire(blocking=False),
+                      'slot was not released')
+        self.server.connection_slots.release()
+        self.login()
+
+
+class OverloadedRequestTest(ThreadedServerTestCase):
+    """Requests the worker pool cannot queue are answered 'overloaded'"""
+
+    server_options = {'max_queue': 0}
+
+    def test_request_is_turned_away(self):
+        sock = self.login()
+        send_message(sock, {'type': 'ping'}, stream_id=1)
+        stream_id, body = recv_frame(sock)
+        self.assertEqual(stream_id, 1)
+        response = decode_message(body)
+        self.assertEqual((response['type'], response['code']), ('error', 'overloaded'))
+        self.assertEqual(self.server.request_pool.stats()['rejected'], 1)
+
+
+class DetailsTest(StubbedServerTestCase):
+    """Details are looked up by index in a stored listing"""
+
+    def test_details_by_index(self):
+        listing = self.request(type='headlines', country='us')
+        self.assertEqual(listing['data'][2]['title'], 'Headline 2')
+
+        details = self.request(type='details', result_id=listing['result_id'], article_id=2)
+        self.assertEqual(details['type'], 'article_details')
+        self.assertEqual(details['data']['url'], 'https://example.com/2')
+        self.assertEqual(details['data']['source'], 'Source 2')
+        # Articles past the first page are stored too
+        details = self.request(type='details', result_id=listing['result_id'], article_id=30)
+        self.assertEqual(details['data']['title'], 'Headline 30')
+        self.assertEqual(len(self.upstream_calls), 1)
+
+    def test_unknown_listing_or_index_is_an_error(self):
+        listing = self.request(type='headlines', country='us')
+        for request in ({'result_id': listing['result_id'], 'article_id': 40},
+                        {'result_id': 'expired', 'article_id': 0},
+                        {'article_id': 0},
+                        {'result_id': listing['result_id']}):
+            with self.subTest(request=request):
+                self.assertEqual(self.request(type='details', **request)['type'], 'error')
+
+    def test_evicted_listing_cannot_be_read(self):
+        self.server.article_store.max_results = 1
+        first = self.request(type='headlines', country='us')
+        self.articles.reverse()
+        self.request(type='headlines', country='gb')
+        details = self.request(type='details', result_id=first['result_id'], article_id=0)
+        self.assertEqual(details['type'], 'error')
+
+
+class RequestWindowTest(unittest.TestCase):
+
+    def test_page_and_page_size(self):
+        self.assertEqual(request_window({}, 15), (0, 15, None))
+        self.assertEqual(request_window({'page': 3, 'page_size': 10}, 15), (20, 10, None))
+        self.assertEqual(request_window({'page_size': 1000}, 15)[1], MAX_PAGE_SIZE)
+
+    def test_invalid_values_raise(self):
+        for request in ({'page': 0}, {'page_size': -1}, {'page': 'two'}, {'cursor': 'not-a-cursor'}):
+            with self.subTest(request=request):
+                with self.assertRaises(ValueError):
+                    request_window(request, 15)
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor({'r': 'abc', 'o': 30, 'n': 15})
+        self.assertEqual(decode_cursor(cursor), {'r': 'abc', 'o': 30, 'n': 15})
+        self.assertEqual(request_window({'cursor': cursor, 'page': 1}, 50)[:2], (30, 15))
+
+
+class PaginationTest(StubbedServerTestCase):
+    """Later pages come from the stored listing, not from NewsAPI"""
+
+    def test_cursor_walks_the_whole_headlines_listing(self):
+        page = self.request(type='headlines', country='us', page_size=15)
+        self.assertEqual((page['total'], page['page']), (40, 1))
+        titles = []
+        while True:
+            titles += [article['title'] for article in page['data']]
+            if not page['next_cursor']:
+                break
+            page = self.request(type='headlines', cursor=page['next_cursor'])
+        self.assertEqual(titles, [f'Headline {number}' for number in range(40)])
+        self.assertEqual(page['page'], 3)
+        self.assertEqual(len(self.upstream_calls), 1)
+
+    def test_page_of_a_stored_listing(self):
+        first = self.request(type='headlines', country='us')
+        page = self.request(type='headlines', result_id=first['result_id'], page=2, page_size=10)
+        self.assertEqual([article['id'] for article in page['data']], list(range(10, 20)))
+        self.assertEqual(page['data'][0]['title'], 'Headline 10')
+
+    def test_sources_cursor_keeps_the_filters(self):
+        page = self.request(type='sources', country='us', page_size=2)
+        names = [source['name'] for source in page['data']]
+        while page['next_cursor']:
+            page = self.request(type='sources', cursor=page['next_cursor'])
+            names += [source['name'] for source in page['data']]
+        self.assertEqual(names, [f'Source {n}' for n in range(5)])
+        self.assertEqual({params.get('country') for _, params in self.upstream_calls}, {'us'})
+
+    def test_bad_window_is_an_error(self):
+        self.assertEqual(self.request(type='headlines', page=0)['type'], 'error')
+        self.assertEqual(self.request(type='sources', cursor='garbage')['type'], 'error')
+
+
+class SharedFramesTest(StubbedServerTestCase):
+    """Identical requests reuse one encoded body while its data is current"""
+
+    def frame(self, client, **request):
+        return self.server.handle_frame(JSON_CODEC.encode(request), client)
+
+    def shared_stats(self):
+        stats = self.server.get_stats()['shared_frames']
+        return stats['hits'], stats['misses']
+
+    def test_identical_requests_share_one_body(self):
+        other = self.connect_client('other')
+        # The request that fetched from NewsAPI cannot tell which cached
+        # copy it was built from, so sharing starts with the next one
+        fetched = self.frame(self.client, type='headlines', country='us')
+        first = self.frame(self.client, type='headlines', country='us')
+        second = self.frame(other, type='headlines', country=' US ')
+        self.assertEqual(fetched, first)
+        self.assertIs(first, second)
+        self.assertEqual(self.shared_stats(), (1, 2))
+        self.assertEqual(len(self.upstream_calls), 1)
+
+    def test_refreshed_response_invalidates_the_frame(self):
+        self.request(type='headlines', country='us')
+        self.request(type='headlines', country='us')
+        old = self.request(type='headlines', country='us')
+        self.assertEqual(self.shared_stats(), (1, 2))
+        self.articles[0] = make_article(0, 'Breaking update')
+        _, endpoint, params = self.server.upstream_query({'type': 'headlines', 'country': 'us'})
+        self.server.refresh(endpoint, params)
+
+        new = self.request(type='headlines', country='us')
+        self.assertEqual(new['data'][0]['title'], 'Breaking update')
+        self.assertNotEqual(new['result_id'], old['result_id'])
+        self.assertEqual(self.shared_stats(), (1, 3))
+
+    def test_frame_of_an_evicted_listing_is_rebuilt(self):
+        self.server.article_store.max_results = 1
+        self.request(type='headlines', country='us')
+        listing = self.request(type='headlines', country='us')  # Stores the frame
+        self.articles.reverse()
+        self.request(type='headlines', country='gb')
+
+        again = self.request(type='headlines', country='us')
+        self.assertEqual(again['result_id'], listing['result_id'])
+        self.assertEqual(self.shared_stats(), (0, 4))
+        details = self.request(type='details', result_id=listing['result_id'], article_id=0)
+        self.assertEqual(details['type'], 'article_details')
+
+    def test_serving_a_frame_keeps_its_listing_stored(self):
+        self.server.article_store.max_results = 2
+        listing = self.request(type='headlines', country='us')
+        self.request(type='headlines', country='us')  # Stores the frame
+        self.request(type='headlines', country='gb')
+        self.request(type='headlines', country='us')  # Shared frame, touches the listing
+        self.request(type='headlines', country='fr')
+
+        self.assertEqual(self.shared_stats()[0], 1)
+        details = self.request(type='details', result_id=listing['result_id'], article_id=0)
+        self.assertEqual(details['type'], 'article_details')
+
+
+class HeadlinesDeltaTest(StubbedServerTestCase):
+    """Clients that send 'since' only get what changed in their page"""
+
+    def refresh(self):
+        _, endpoint, params = self.server.upstream_query({'type': 'headlines', 'country': 'us'})
+        self.server.refresh(endpoint, params)
+
+    def test_unchanged_listing_is_not_modified(self):
+        listing = self.request(type='headlines', country='us')
+        response = self.request(type='headlines', country='us', since=listing['result_id'])
+        self.assertEqual(response, {'type': 'not_modified', 'result_id': listing['result_id']})
+
+    def test_changed_page_is_sent_as_a_delta(self):
+        previous = self.request(type='headlines', country='us', page_size=10)
+        self.articles[3] = make_article(100, 'Breaking news')
+        self.articles.insert(0, make_article(101, 'Developing story'))
+        self.refresh()
+
+        delta = self.request(type='headlines', country='us', page_size=10, since=previous['result_id'])
+        self.assertEqual(delta['type'], 'headlines_delta')
+        self.assertEqual(delta['base'], previous['result_id'])
+        self.assertEqual(sorted(article['title'] for article in delta['added']),
+                         ['Breaking news', 'Developing story'])
+        self.assertEqual(len(delta['removed']), 2)  # Headline 3, and Headline 9 pushed off the page
+
+        full = self.request(type='headlines', country='us', page_size=10)
+        self.assertEqual(merge_headlines_delta(previous, delta), full)
+
+    def test_later_page_delta_keeps_its_offset(self):
+        previous = self.request(type='headlines', country='us', page=2, page_size=10)
+        self.articles[15] = make_article(100, 'Breaking news')
+        self.refresh()
+
+        delta = self.request(type='headlines', country='us', page=2, page_size=10,
+                             since=previous['result_id'])
+        self.assertEqual(delta['offset'], 10)
+        full = self.request(type='headlines', country='us', page=2, page_size=10)
+        self.assertEqual(merge_headlines_delta(previous, delta), full)
+
+    def test_unknown_base_gets_the_full_listing(self):
+        response = self.request(type='headlines', country='us', since='expired')
+        self.assertEqual(response['type'], 'headlines_list')
+        self.assertEqual(len(response['data']), 15)
+
+    def test_page_with_nothing_in_common_is_sent_in_full(self):
+        previous = self.request(type='headlines', country='us', page_size=5)
+        self.articles[:5] = [make_article(200 + number) for number in range(5)]
+        self.refresh()
+        response = self.request(type='headlines', country='us', page_size=5, since=previous['result_id'])
+        self.assertEqual(response['type'], 'headlines_list')
+
+
+class BatchTest(StubbedServerTestCase):
+    """A failing batch item only puts an error in its own slot"""
+
+    def test_items_are_answered_in_order(self):
+        response = self.request(type='batch', requests=[
+            {'type': 'headlines', 'country': 'us'},
+            'not a request',
+            {'type': 'batch', 'requests': []},
+            {'type': 'unknown'},
+            {'type': 'details', 'result_id': 'expired', 'article_id': 0},
+            {'type': 'sources'}
+        ])
+        self.assertEqual(response['type'], 'batch_results')
+        self.assertEqual([item['type'] for item in response['data']], [
+            'headlines_list', 'error', 'error', 'error', 'error', 'sources_list'
+        ])
+        self.assertEqual((response['total'], response['errors']), (6, 4))
+        self.assertIn('nested', response['data'][2]['message'])
+
+    def test_item_that_raises_gets_an_error(self):
+        with mock.patch.object(self.server, 'handle_sources_request', side_effect=RuntimeError('boom')):
+            response = self.request(type='batch', requests=[{'type': 'sources'}, {'type': 'ping'}])
+        self.assertEqual(response['data'][0], {'type': 'error', 'message': 'Server error: boom'})
+        self.assertEqual(response['data'][1]['type'], 'pong')
+        self.assertEqual(response['errors'], 1)
+
+    def test_upstream_failure_stays_in_its_slot(self):
+        def fake_newsapi(endpoint, params):
+            if params.get('country') == 'xx':
+                raise UpstreamError(400)
+            return StubbedServerTestCase.fake_newsapi(self, endpoint, params)
+
+        with mock.patch.object(self.server.upstream, 'call', fake_newsapi):
+            response = self.request(type='batch', requests=[
+                {'type': 'headlines', 'country': 'xx'},
+                {'type': 'headlines', 'country': 'us'}
+            ])
+        self.assertEqual([item['type'] for item in response['data']], ['error', 'headlines_list'])
+
+    def test_empty_or_oversized_batch_is_rejected(self):
+        self.assertEqual(self.request(type='batch', requests=[])['type'], 'error')
+        too_many = [{'type': 'ping'}] * (MAX_BATCH_SIZE + 1)
+        self.assertEqual(self.request(type='batch', requests=too_many)['type'], 'error')
+
+
+class SubscriptionPushTest(StubbedServerTestCase):
+    """A fetched listing pushes only unseen matching articles to subscribers"""
+
+    def setUp(self):
+        super().setUp()
+        self.pushes = []
+        patcher = mock.patch.object(self.server, 'push',
+                                    side_effect=lambda client, message: self.pushes.append((client, message)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def refresh(self, country='us'):
+        _, endpoint, params = self.server.upstream_query({'type': 'headlines', 'country': country})
+        self.server.refresh(endpoint, params)
+
+    def test_only_new_articles_are_pushed(self):
+        subscribed = self.request(type='subscribe', country='us')
+        self.assertEqual(subscribed['type'], 'subscribed')
+        self.refresh()
+        self.assertEqual(self.pushes, [])  # The seeded listing is nothing new
+
+        self.articles.insert(5, make_article(100, 'Breaking news'))
+        self.refresh()
+        (client, message), = self.pushes
+        self.assertIs(client, self.client)
+        self.assertEqual(message['type'], 'headlines_update')
+        self.assertEqual(message['subscription_id'], subscribed['subscription_id'])
+        self.assertEqual([(item['id'], item['title']) for item in message['data']], [(5, 'Breaking news')])
+
+        # Pushed ids can be used for details
+        details = self.request(type='details', result_id=message['result_id'], article_id=5)
+        self.assertEqual(details['data']['title'], 'Breaking news')
+
+    def test_each_matching_subscriber_gets_the_article(self):
+        other = self.connect_client('other')
+        self.request(type='subscribe', country='us', keyword='breaking')
+        self.request(other, type='subscribe', country='us')
+        self.request(other, type='subscribe', country='gb')
+
+        self.articles.append(make_article(100, 'Breaking news'))
+        self.articles.append(make_article(101, 'Quiet day'))
+        self.refresh()
+        received = {(client['username'], item['title']) for client, message in self.pushes
+                    for item in message['data']}
+        self.assertEqual(received, {('tester', 'Breaking news'), ('other', 'Breaking news'),
+                                    ('other', 'Quiet day')})
+
+    def test_unsubscribe_stops_pushes(self):
+        subscribed = self.request(type='subscribe', country='us')
+        response = self.request(type='unsubscribe', subscription_id=subscribed['subscription_id'])
+        self.assertEqual(response['type'], 'unsubscribed')
+        self.articles.append(make_article(100, 'Breaking news'))
+        self.refresh()
+        self.assertEqual(self.pushes, [])
+        again = self.request(type='unsubscribe', subscription_id=subscribed['subscription_id'])
+        self.assertEqual(again['type'], 'error')
+
+    def test_invalid_filters_are_rejected(self):
+        response = self.request(type='subscribe', country=['us'])
+        self.assertEqual(response, {'type': 'error', 'message': 'country must be a string'})
+        self.assertEqual(self.client['subscriptions'], {})
+
+
+class IdleReaperTest(ThreadedServerTestCase):
+    """Connections silent for idle_timeout are closed; pings keep them open"""
+
+    server_options = {'idle_timeout': 0.4}
+
+    def test_silent_connection_is_closed(self):
+        silent = self.login('silent')
+        chatty = self.login('chatty')
+        deadline = time.monotonic() + 1.2
+        stream_id = 1
+        while time.monotonic() < deadline:
+            send_message(chatty, {'type': 'ping'}, stream_id=stream_id)
+            self.assertEqual(decode_message(recv_frame(chatty)[1])['type'], 'pong')
+            stream_id += 1
+            time.sleep(0.1)
+
+        self.assertIsNone(recv_frame(silent))
+        self.wait_for(lambda: len(self.server.clients) == 1, 'idle client was not removed')
+        self.assertEqual([client['username'] for client in self.server.clients.values()], ['chatty'])
+        self.assertGreaterEqual(self.server.get_stats()['reaper']['reaped'], 1)
+
+
+class WarmCachesTest(unittest.TestCase):
+    """A restart only indexes articles the search window still covers"""
+
+    def test_old_stored_articles_are_pruned_not_indexed(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'store.db')
+        server = NewsServer(store_path=path, prefetch_interval=0, idle_timeout=0)
+        self.addCleanup(server.stop_server)
+        key = make_cache_key('top-headlines', {'country': 'us'})
+        now = time.time()
+        for age, title in ((server.search_index.max_age + 60, 'Old storm'), (60, 'New storm')):
+            with mock.patch('snapshot_store.time.time', return_value=now - age):
+                server.snapshot_store.save(key, {'articles': [{'url': f'https://example.com/{age}',
+                                                               'title': title}]})
+
+        server.warm_caches()
+        self.assertEqual([article['title'] for article in server.search_index.search('storm')],
+                         ['New storm'])
+        self.assertEqual(server.snapshot_store.stats()['articles'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
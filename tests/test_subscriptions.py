@@ -0,0 +1,41 @@
+import unittest
+from unittest import mock
+
+from subscriptions import Subscription
+
+
+def article(number, title, description=''):
+    return {'url': f'https://example.com/{number}', 'title': title, 'description': description}
+
+
+class SubscriptionTest(unittest.TestCase):
+
+    def test_filter_on_listing_and_keywords(self):
+        subscription = Subscription(1, country=' US ', category='Sports', keyword='cup final')
+        articles = [
+            article(1, 'Cup final tonight'),
+            article(2, 'Final whistle', 'The cup goes home'),
+            article(3, 'Cup draw announced')
+        ]
+        self.assertEqual([index for index, _ in subscription.take_new(articles, 'us', 'sports')], [0, 1])
+        self.assertEqual(subscription.take_new([article(4, 'Cup final replay')], 'gb', 'sports'), [])
+        self.assertEqual(subscription.take_new([article(4, 'Cup final replay')], 'us', 'business'), [])
+
+    def test_articles_are_taken_once(self):
+        subscription = Subscription(1)
+        first = [article(1, 'One'), article(2, 'Two')]
+        self.assertEqual(len(subscription.take_new(first, 'us')), 2)
+        later = [article(3, 'Three')] + first
+        self.assertEqual(subscription.take_new(later, 'us'), [(0, later[0])])
+
+    def test_seen_urls_are_bounded(self):
+        subscription = Subscription(1)
+        with mock.patch('subscriptions.MAX_SEEN', 2):
+            subscription.take_new([article(number, f'Story {number}') for number in range(3)], 'us')
+        self.assertEqual(list(subscription.seen), ['https://example.com/1', 'https://example.com/2'])
+        # The forgotten article counts as new again
+        self.assertEqual(len(subscription.take_new([article(0, 'Story 0')], 'us')), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
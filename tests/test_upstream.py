@@ -0,0 +1,211 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from upstream import CircuitBreaker, CircuitOpen, RateLimited, TokenBucket, UpstreamGovernor
+
+
+class FakeClock:
+    """Stands in for time.monotonic so tests control the passing of time"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class ClockTestCase(unittest.TestCase):
+    """Patches upstream.time.monotonic with a FakeClock for every test"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch('upstream.time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TokenBucketTest(ClockTestCase):
+
+    def test_burst_then_sustained_rate(self):
+        bucket = TokenBucket(rate=2, capacity=3)
+        self.assertEqual([bucket.take() for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(bucket.take(), 0.5)
+
+        self.clock.advance(0.5)
+        self.assertEqual(bucket.take(), 0)
+        self.assertAlmostEqual(bucket.take(), 0.5)
+
+    def test_refill_stops_at_capacity(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        bucket.take()
+        self.clock.advance(60)
+        bucket.refill()
+        self.assertEqual(bucket.tokens, 2)
+
+
+class UpstreamGovernorTest(ClockTestCase):
+
+    def test_calls_beyond_the_burst_are_held_back(self):
+        governor = UpstreamGovernor(requests_per_minute=60, burst=2)
+        governor.acquire()
+        governor.acquire()
+        self.assertFalse(governor.headroom())
+        with self.assertRaises(RateLimited) as raised:
+            governor.acquire()
+        self.assertAlmostEqual(raised.exception.retry_after, 1)
+
+        self.clock.advance(1)
+        self.assertTrue(governor.headroom())
+        governor.acquire()
+        self.assertEqual(governor.stats()['throttled'], 1)
+
+    def test_429_backoff_doubles_until_a_success(self):
+        governor = UpstreamGovernor(burst=100, base_backoff=5, max_backoff=12)
+        self.assertEqual(governor.record_rate_limited(), 5)
+        with self.assertRaises(RateLimited):
+            governor.acquire()
+
+        self.clock.advance(5)
+        governor.acquire()
+        self.assertEqual(governor.record_rate_limited(), 10)
+        self.clock.advance(9)
+        with self.assertRaises(RateLimited) as raised:
+            governor.acquire()
+        self.assertAlmostEqual(raised.exception.retry_after, 1)
+
+        self.clock.advance(1)
+        self.assertEqual(governor.record_rate_limited(), 12)  # capped at max_backoff
+
+        governor.record_success()
+        self.clock.advance(12)
+        governor.acquire()
+        self.assertEqual(governor.record_rate_limited(), 5)
+
+    def test_retry_after_header_sets_the_backoff(self):
+        governor = UpstreamGovernor(base_backoff=5)
+        self.assertEqual(governor.record_rate_limited(retry_after=30), 30)
+        self.clock.advance(29)
+        self.assertFalse(governor.headroom())
+        self.clock.advance(1)
+        self.assertTrue(governor.headroom())
+
+    def test_daily_quota(self):
+        governor = UpstreamGovernor(burst=10, daily_quota=2)
+        governor.acquire()
+        governor.acquire()
+        with self.assertRaises(RateLimited):
+            governor.acquire()
+        self.assertEqual(governor.stats()['calls_today'], 2)
+
+
+class CircuitBreakerTest(ClockTestCase):
+
+    def make_breaker(self, probe_succeeds):
+        """Breaker whose probe reports its outcome the way UpstreamClient.probe does"""
+        probed = threading.Event()
+
+        def probe(endpoint, params):
+            self.probed_call = (endpoint, params)
+            try:
+                if probe_succeeds:
+                    breaker.record_success()
+                else:
+                    breaker.record_failure(endpoint, params)
+                    raise ConnectionError('still down')
+            finally:
+                probed.set()
+
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, probe=probe)
+        return breaker, probed
+
+    def open_breaker(self, breaker):
+        for _ in range(3):
+            breaker.record_failure('top-headlines', {'country': 'us'})
+        self.assertEqual(breaker.state, 'open')
+
+    def wait_for_state(self, breaker, state):
+        deadline = time.time() + 5
+        while breaker.state != state:
+            self.assertLess(time.time(), deadline, f'breaker never became {state}')
+            time.sleep(0.01)
+
+    def test_stays_closed_below_the_threshold(self):
+        breaker, _ = self.make_breaker(True)
+        breaker.record_failure('sources', {})
+        breaker.record_failure('sources', {})
+        breaker.record_success()
+        breaker.record_failure('sources', {})
+        breaker.record_failure('sources', {})
+        self.assertEqual(breaker.state, 'closed')
+        breaker.before_call('sources', {})
+
+    def test_open_circuit_fails_fast_until_reset_timeout(self):
+        breaker, probed = self.make_breaker(True)
+        self.open_breaker(breaker)
+        self.clock.advance(10)
+        with self.assertRaises(CircuitOpen) as raised:
+            breaker.before_call('sources', {})
+        self.assertAlmostEqual(raised.exception.retry_after, 20)
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(probed.is_set())
+
+    def test_successful_probe_closes_the_circuit(self):
+        breaker, probed = self.make_breaker(True)
+        self.open_breaker(breaker)
+        self.clock.advance(30)
+
+        # The call that finds the reset timeout over still fails fast
+        with self.assertRaises(CircuitOpen):
+            breaker.before_call('sources', {})
+        self.assertTrue(probed.wait(5))
+        self.wait_for_state(breaker, 'closed')
+        # The probe repeats the last failed call
+        self.assertEqual(self.probed_call, ('top-headlines', {'country': 'us'}))
+        breaker.before_call('sources', {})
+        self.assertEqual(breaker.stats()['consecutive_failures'], 0)
+
+    def test_failed_probe_reopens_the_circuit(self):
+        breaker, probed = self.make_breaker(False)
+        self.open_breaker(breaker)
+        self.clock.advance(30)
+
+        with self.assertRaises(CircuitOpen):
+            breaker.before_call('sources', {})
+        self.assertTrue(probed.wait(5))
+        self.wait_for_state(breaker, 'open')
+        self.assertEqual(breaker.opened_at, self.clock.now)
+
+        # Only one probe per reset_timeout; calls keep failing fast meanwhile
+        self.clock.advance(29)
+        with self.assertRaises(CircuitOpen):
+            breaker.before_call('sources', {})
+        self.assertEqual(breaker.state, 'open')
+
+    def test_half_open_circuit_starts_no_second_probe(self):
+        release = threading.Event()
+        probes = []
+
+        def probe(endpoint, params):
+            probes.append(endpoint)
+            release.wait(5)
+            breaker.record_success()
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, probe=probe)
+        breaker.record_failure('sources', {})
+        self.clock.advance(30)
+        for _ in range(3):
+            with self.assertRaises(CircuitOpen):
+                breaker.before_call('sources', {})
+        self.assertEqual(breaker.state, 'half_open')
+        release.set()
+        self.wait_for_state(breaker, 'closed')
+        self.assertEqual(probes, ['sources'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import threading
+import time
+import unittest
+
+from worker_pool import WorkerPool
+
+
+class WorkerPoolTest(unittest.TestCase):
+    """Bounded admission: work beyond max_queue is refused, not queued"""
+
+    def setUp(self):
+        self.pool = WorkerPool(workers=1, max_queue=2, name='test')
+        self.addCleanup(self.pool.shutdown)
+
+    def block_worker(self):
+        """Occupy the only worker until the returned event is set"""
+        started, release = threading.Event(), threading.Event()
+
+        def task():
+            started.set()
+            release.wait(5)
+            return 'done'
+
+        future = self.pool.submit(task)
+        self.assertTrue(started.wait(5))
+        return future, release
+
+    def wait_for_idle(self):
+        deadline = time.monotonic() + 5
+        while self.pool.stats()['busy']:
+            self.assertLess(time.monotonic(), deadline, 'worker stayed busy')
+            time.sleep(0.01)
+
+    def test_tasks_run_and_return_results(self):
+        self.pool.start()
+        futures = [self.pool.submit(pow, 2, n) for n in range(2)]
+        self.assertEqual([future.result(5) for future in futures], [1, 2])
+        self.wait_for_idle()
+        self.assertEqual(self.pool.stats()['completed'], 2)
+
+    def test_full_queue_rejects_at_once(self):
+        self.pool.start()
+        running, release = self.block_worker()
+        queued = [self.pool.submit(str, n) for n in range(2)]
+        self.assertIsNone(self.pool.submit(str, 'overflow'))
+        stats = self.pool.stats()
+        self.assertEqual((stats['busy'], stats['queue_depth'], stats['rejected']), (1, 2, 1))
+
+        release.set()
+        self.assertEqual(running.result(5), 'done')
+        self.assertEqual([future.result(5) for future in queued], ['0', '1'])
+        self.assertEqual(stats['peak_queue'], 2)
+
+    def test_unadmitted_tasks_bypass_the_limit(self):
+        self.pool.start()
+        _, release = self.block_worker()
+        for n in range(2):
+            self.pool.submit(str, n)
+        push = self.pool.submit(str, 'push', admit=False)
+        self.assertIsNotNone(push)
+        release.set()
+        self.assertEqual(push.result(5), 'push')
+
+    def test_shutdown_cancels_queued_tasks(self):
+        self.pool.start()
+        _, release = self.block_worker()
+        queued = self.pool.submit(str, 'queued')
+        self.pool.shutdown()
+        release.set()
+        self.assertTrue(queued.cancelled())
+        self.assertIsNone(self.pool.submit(str, 'late'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,558 @@
+import threading
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+
+class UpstreamError(Exception):
+    """Raised when NewsAPI answers with a non-200 status code"""
+
+    def __init__(self, status_code, message=None):
+        super().__init__(message or f'API request failed: {status_code}')
+        self.status_code = status_code
+
+
+class RateLimited(UpstreamError):
+    """Raised when NewsAPI is rate limiting us, or would if the call were made"""
+
+    def __init__(self, retry_after, message=None):
+        super().__init__(429, message or f'NewsAPI rate limit reached, retry in {retry_after:.0f}s')
+        self.retry_after = retry_after
+
+
+class CircuitOpen(UpstreamError):
+    """Raised without calling NewsAPI while the circuit breaker is open"""
+
+    def __init__(self, retry_after):
+        super().__init__(503, f'NewsAPI is not responding, retry in {retry_after:.0f}s')
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    TokenBucket Class - Allows bursts up to a capacity at a sustained rate
+
+    Tokens refill continuously at rate per second up to capacity; each
+    call spends one.
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        Constructor method - starts with a full bucket
+
+        Args:
+            rate (float): Tokens added per second
+            capacity (float): Most tokens held, i.e. the largest burst
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        """Add the tokens earned since the last update"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        """
+        Spend one token if available
+
+        Returns:
+            float: 0 if a token was spent, otherwise seconds until one is
+        """
+        self.refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class UpstreamGovernor:
+    """
+    UpstreamGovernor Class - Keeps every NewsAPI call within our plan's quota
+
+    Calls spend tokens from a bucket sized to the plan's per-minute rate
+    and burst, and are counted against an optional daily quota. When
+    NewsAPI answers 429 anyway, every call is held back for a backoff
+    period that doubles with each consecutive 429 (or follows the
+    Retry-After header) and resets after the next success. Held-back
+    calls fail fast with RateLimited so callers can serve stale data.
+    """
+
+    def __init__(self, requests_per_minute=60, burst=20, daily_quota=None,
+                 base_backoff=5, max_backoff=300):
+        """
+        Constructor method - initializes the bucket and backoff state
+
+        Args:
+            requests_per_minute (float): Sustained upstream call rate
+            burst (int): Calls allowed back to back after an idle period
+            daily_quota (int): Calls allowed per calendar day, or None
+            base_backoff (float): Seconds of the first backoff after a 429
+            max_backoff (float): Longest backoff in seconds
+        """
+        self.bucket = TokenBucket(requests_per_minute / 60, burst)
+        self.daily_quota = daily_quota
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lock = threading.Lock()
+        self.day = time.strftime('%Y-%m-%d')
+        self.calls_today = 0
+        self.backoff_until = 0.0
+        self.consecutive_429 = 0
+        self.throttled = 0
+        self.rate_limited = 0
+
+    def acquire(self):
+        """
+        Reserve one upstream call
+
+        Raises:
+            RateLimited: If the call must not be made now
+        """
+        with self.lock:
+            now = time.monotonic()
+            if now < self.backoff_until:
+                self.throttled += 1
+                raise RateLimited(self.backoff_until - now)
+
+            today = time.strftime('%Y-%m-%d')
+            if today != self.day:
+                self.day = today
+                self.calls_today = 0
+            if self.daily_quota is not None and self.calls_today >= self.daily_quota:
+                self.throttled += 1
+                raise RateLimited(seconds_until_midnight(), 'Daily NewsAPI quota used up')
+
+            wait = self.bucket.take()
+            if wait:
+                self.throttled += 1
+                raise RateLimited(wait)
+            self.calls_today += 1
+
+    def headroom(self):
+        """
+        Report whether a call could be made right now without waiting
+
+        Returns:
+            bool: False while backing off or out of tokens or daily quota
+        """
+        with self.lock:
+            if time.monotonic() < self.backoff_until:
+                return False
+            if self.daily_quota is not None and self.calls_today >= self.daily_quota:
+                return False
+            self.bucket.refill()
+            return self.bucket.tokens >= 1
+
+    def record_rate_limited(self, retry_after=None):
+        """
+        Start or extend the backoff after NewsAPI answered 429
+
+        Args:
+            retry_after (float): Seconds from the Retry-After header, if any
+
+        Returns:
+            float: Backoff length in seconds
+        """
+        with self.lock:
+            self.rate_limited += 1
+            self.consecutive_429 += 1
+            delay = retry_after
+            if delay is None:
+                delay = self.base_backoff * 2 ** (self.consecutive_429 - 1)
+            delay = min(delay, self.max_backoff)
+            self.backoff_until = max(self.backoff_until, time.monotonic() + delay)
+            return delay
+
+    def record_success(self):
+        """Reset the backoff after a successful call"""
+        with self.lock:
+            self.consecutive_429 = 0
+
+    def stats(self):
+        """
+        Report quota use and backoff state
+
+        Returns:
+            dict: Tokens left, calls today, backoff and throttling counters
+        """
+        with self.lock:
+            self.bucket.refill()
+            return {
+                'tokens': round(self.bucket.tokens, 2),
+                'burst': self.bucket.capacity,
+                'requests_per_minute': round(self.bucket.rate * 60, 2),
+                'calls_today': self.calls_today,
+                'daily_quota': self.daily_quota,
+                'backoff_s': round(max(self.backoff_until - time.monotonic(), 0), 1),
+                'rate_limited': self.rate_limited,
+                'throttled': self.throttled
+            }
+
+
+class CircuitBreaker:
+    """
+    CircuitBreaker Class - Stops calling NewsAPI while it keeps failing
+
+    After failure_threshold consecutive timeouts, connection errors or 5xx
+    answers the circuit opens and calls fail at once with CircuitOpen, so
+    callers serve cached data instead of waiting out the timeout. Once
+    reset_timeout has passed the circuit goes half-open and a single
+    background probe repeats the last failed call: success closes the
+    circuit, failure opens it for another reset_timeout. Client calls
+    never wait on the probe.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=30, probe=None):
+        """
+        Constructor method - starts closed
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds the circuit stays open before probing
+            probe (callable): Called with (endpoint, params) on a background
+                thread to test NewsAPI; must report its outcome through
+                record_success or record_failure
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe = probe
+        self.lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.last_call = None  # (endpoint, params) of the last failed call
+        self.opened = 0
+        self.short_circuited = 0
+
+    def before_call(self, endpoint, params):
+        """
+        Let a call through while closed, start a probe when it is due
+
+        Raises:
+            CircuitOpen: If the circuit is open or half-open
+        """
+        with self.lock:
+            if self.state == 'closed':
+                return
+            self.short_circuited += 1
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            start_probe = self.state == 'open' and remaining <= 0
+            if start_probe:
+                self.state = 'half_open'
+            call = self.last_call or (endpoint, params)
+
+        if start_probe:
+            threading.Thread(target=self.run_probe, args=call, name='upstream-probe', daemon=True).start()
+        raise CircuitOpen(max(remaining, 0))
+
+    def run_probe(self, endpoint, params):
+        """Probe thread: reopen the circuit unless the probe closed it"""
+        try:
+            if self.probe is not None:
+                self.probe(endpoint, params)
+        except Exception as e:
+            print(f"NewsAPI probe failed: {e}")
+        finally:
+            with self.lock:
+                if self.state == 'half_open':
+                    self.state = 'open'
+                    self.opened_at = time.monotonic()
+
+    def record_success(self):
+        """Close the circuit after NewsAPI answered"""
+        with self.lock:
+            if self.state != 'closed':
+                print("NewsAPI is responding again, circuit closed")
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self, endpoint, params):
+        """
+        Count a failed call, opening the circuit at the threshold
+
+        Args:
+            endpoint (str): Endpoint of the failed call
+            params (dict): Query parameters of the failed call
+        """
+        with self.lock:
+            self.failures += 1
+            self.last_call = (endpoint, params)
+            if self.state == 'closed' and self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self.opened += 1
+                print(f"NewsAPI failed {self.failures} times in a row, circuit opened "
+                      f"for {self.reset_timeout}s")
+
+    def stats(self):
+        """
+        Report breaker state
+
+        Returns:
+            dict: State, consecutive failures and short-circuited calls
+        """
+        with self.lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'opened': self.opened,
+                'short_circuited': self.short_circuited
+            }
+
+
+def seconds_until_midnight():
+    """Seconds left in the current local day"""
+    now = time.localtime()
+    return 86400 - (now.tm_hour * 3600 + now.tm_min * 60 + now.tm_sec)
+
+
+def parse_retry_after(value):
+    """
+    Read a Retry-After header given in seconds
+
+    Args:
+        value (str): Header value, or None
+
+    Returns:
+        float: Seconds, or None if absent or not a number
+    """
+    try:
+        return max(float(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_connect_error(error):
+    """
+    Tell whether a request failed before it could reach NewsAPI
+
+    Args:
+        error (requests.exceptions.RequestException): Failure of one attempt
+
+    Returns:
+        bool: True if the connection could not be opened
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.exceptions.ConnectionError) or not error.args:
+        return False
+    return isinstance(getattr(error.args[0], 'reason', None), NewConnectionError)
+
+
+class UpstreamClient:
+    """
+    UpstreamClient Class - Pooled keep-alive HTTP access to NewsAPI
+
+    All server threads share one urllib3 connection pool, so after the
+    first few calls requests reuse open TLS connections instead of paying
+    a fresh TCP and TLS handshake each time. Each thread gets its own
+    requests.Session (sessions are not thread-safe) but every session is
+    mounted on the same HTTPAdapter, which owns the pool.
+    """
+
+    def __init__(self, base_url, api_key, pool_size=20, timeout=10,
+                 retries=2, backoff_factor=0.5, governor=None,
+                 failure_threshold=3, reset_timeout=30):
+        """
+        Constructor method - initializes the shared connection pool
+
+        Args:
+            base_url (str): NewsAPI base URL
+            api_key (str): NewsAPI key, sent as the X-Api-Key header
+            pool_size (int): Maximum keep-alive connections kept per host
+            timeout (float): Per-request timeout in seconds
+            retries (int): Retries for failed connection attempts and 5xx
+                answers; read timeouts are never retried
+            backoff_factor (float): Exponential backoff base between retries
+            governor (UpstreamGovernor): Rate limiter every call must pass,
+                or None to call NewsAPI without limits
+            failure_threshold (int): Consecutive failed calls after which
+                calls fail fast, or 0 to never stop calling
+            reset_timeout (float): Seconds calls fail fast before NewsAPI
+                is probed again
+        """
+        self.base_url = base_url
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.governor = governor
+        self.breaker = None
+        if failure_threshold > 0:
+            self.breaker = CircuitBreaker(failure_threshold, reset_timeout, probe=self.probe)
+
+        # Retries happen in call(), where every attempt passes the governor
+        self.adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=pool_size,
+            max_retries=0
+        )
+
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.total_time = 0.0
+        self.call_times = deque()  # monotonic start time of calls in the last minute
+
+    def session(self):
+        """Return this thread's session, mounted on the shared adapter"""
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', self.adapter)
+            session.mount('http://', self.adapter)
+            session.headers['X-Api-Key'] = self.api_key
+            self.local.session = session
+        return session
+
+    def get(self, endpoint, params):
+        """
+        Perform one GET request against a NewsAPI endpoint
+
+        Args:
+            endpoint (str): Endpoint path, e.g. 'top-headlines'
+            params (dict): Query parameters
+
+        Returns:
+            dict: Decoded JSON body
+
+        Raises:
+            CircuitOpen: If NewsAPI kept failing and is not called for now
+            RateLimited: If the governor held the call back or NewsAPI
+                answered 429
+            UpstreamError: If NewsAPI answered with another non-200 status
+            requests.exceptions.RequestException: On network failures
+        """
+        if self.breaker is not None:
+            self.breaker.before_call(endpoint, params)
+        return self.call(endpoint, params)
+
+    def probe(self, endpoint, params):
+        """Test call made by the circuit breaker, bypassing the open circuit"""
+        print(f"Probing NewsAPI with {endpoint} {params}")
+        self.call(endpoint, params)
+
+    def call(self, endpoint, params):
+        """
+        Make the HTTP request of get(), retrying failures that are safe to repeat
+
+        Only attempts that never reached NewsAPI (the connection could not
+        be opened) and 5xx answers are retried, with exponential backoff.
+        A read timeout is not: the attempt already waited the full timeout
+        and NewsAPI may have counted the request. The final failure is
+        reported to the breaker once.
+        """
+        attempt = 0
+        while True:
+            try:
+                return self.attempt(endpoint, params)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError, UpstreamError) as e:
+                server_error = isinstance(e, UpstreamError) and e.status_code >= 500
+                if attempt < self.retries and (server_error or is_connect_error(e)):
+                    delay = self.backoff_factor * 2 ** attempt
+                    attempt += 1
+                    print(f"Retrying {endpoint} in {delay:g}s after: {e}")
+                    time.sleep(delay)
+                    continue
+                if self.breaker is not None and (server_error or not isinstance(e, UpstreamError)):
+                    self.breaker.record_failure(endpoint, params)
+                raise
+
+    def attempt(self, endpoint, params):
+        """Send one HTTP request of call() once the governor allows it"""
+        if self.governor is not None:
+            self.governor.acquire()
+
+        url = f"{self.base_url}/{endpoint}"
+        started = time.monotonic()
+        with self.lock:
+            self.call_times.append(started)
+        try:
+            response = self.session().get(url, params=params, timeout=self.timeout)
+            if response.status_code >= 500:
+                raise UpstreamError(response.status_code)
+            # NewsAPI answered, so it is reachable whatever the status
+            if self.breaker is not None:
+                self.breaker.record_success()
+            if response.status_code == 429:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if self.governor is not None:
+                    retry_after = self.governor.record_rate_limited(retry_after)
+                raise RateLimited(retry_after or 0)
+            if response.status_code != 200:
+                raise UpstreamError(response.status_code)
+            if self.governor is not None:
+                self.governor.record_success()
+            return response.json()
+        except Exception:
+            with self.lock:
+                self.failures += 1
+            raise
+        finally:
+            with self.lock:
+                self.calls += 1
+                self.total_time += time.monotonic() - started
+
+    def calls_last_minute(self):
+        """
+        Count upstream calls started in the last 60 seconds
+
+        Returns:
+            int: Number of recent calls
+        """
+        cutoff = time.monotonic() - 60
+        with self.lock:
+            while self.call_times and self.call_times[0] < cutoff:
+                self.call_times.popleft()
+            return len(self.call_times)
+
+    def stats(self):
+        """
+        Report pool reuse counters
+
+        A pool "miss" is a newly opened connection (a full TCP and TLS
+        handshake); every other request is a hit on a kept-alive one.
+
+        Returns:
+            dict: Call counts, connections opened and reuse ratio
+        """
+        opened = 0
+        requests_sent = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            requests_sent += pool.num_requests
+
+        with self.lock:
+            calls = self.calls
+            failures = self.failures
+            average = self.total_time / calls if calls else 0.0
+
+        hits = max(requests_sent - opened, 0)
+        return {
+            'calls': calls,
+            'calls_last_minute': self.calls_last_minute(),
+            'failures': failures,
+            'avg_latency_ms': round(average * 1000, 1),
+            'pool_size': self.pool_size,
+            'pool_hits': hits,
+            'pool_misses': opened,
+            'reuse_ratio': round(hits / requests_sent, 3) if requests_sent else 0.0,
+            'governor': self.governor.stats() if self.governor is not None else None,
+            'breaker': self.breaker.stats() if self.breaker is not None else None
+        }
+
+    def close(self):
+        """Close every pooled connection"""
+        self.adapter.close()
@@ -0,0 +1,123 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualList(tk.Frame):
+    """
+    VirtualList Class - Scrollable result list that only builds visible rows
+
+    Every row has the same height, so the row under any scroll position is
+    known without laying anything out. The list keeps just enough row
+    widgets to fill the window and, on every scroll or resize, moves them
+    to the rows now in view and refills their text. Showing ten thousand
+    sources costs the same handful of widgets as showing ten.
+    """
+
+    def __init__(self, parent, describe, on_select, action_text="View Details",
+                 row_height=100, bg='#f0f8ff'):
+        """
+        Constructor method - builds the canvas and scrollbar
+
+        Args:
+            parent (tk.Widget): Containing widget
+            describe (callable): Called with (item, index); returns the
+                (title, info) text shown for that row
+            on_select (callable): Called with (item, index) when the row's
+                button is pressed
+            action_text (str): Label of the button on every row
+            row_height (int): Height of one row in pixels, spacing included
+            bg (str): Background colour around the rows
+        """
+        super().__init__(parent, bg=bg)
+        self.describe = describe
+        self.on_select = on_select
+        self.action_text = action_text
+        self.row_height = row_height
+        self.items = []
+        self.rows = []  # recycled (canvas window id, frame, title, info, button)
+        self.bound = {}  # slot -> index of the item it currently shows
+
+        self.canvas = tk.Canvas(self, bg=bg, highlightthickness=0,
+                                yscrollincrement=row_height // 4)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.canvas.bind("<Configure>", lambda e: self.refresh())
+        self.bind_wheel(self.canvas)
+
+    def bind_wheel(self, widget):
+        """Scroll the list with the mouse wheel while over widget"""
+        widget.bind("<MouseWheel>", lambda e: self.yview('scroll', -1 if e.delta > 0 else 1, 'units'))
+        widget.bind("<Button-4>", lambda e: self.yview('scroll', -1, 'units'))
+        widget.bind("<Button-5>", lambda e: self.yview('scroll', 1, 'units'))
+
+    def set_items(self, items):
+        """
+        Replace the rows shown
+
+        Args:
+            items (list): Articles or sources, one per row
+        """
+        self.items = items
+        self.bound = {}
+        self.canvas.configure(scrollregion=(0, 0, 0, len(items) * self.row_height))
+        self.refresh()
+
+    def yview(self, *args):
+        """Scroll command shared by the scrollbar and the mouse wheel"""
+        self.canvas.yview(*args)
+        self.refresh()
+
+    def make_row(self):
+        """Build one reusable row and hide it until it is bound to an item"""
+        frame = tk.Frame(self.canvas, relief=tk.RAISED, borderwidth=1, bg='white', padx=10, pady=8)
+        frame.columnconfigure(0, weight=1)
+        title = tk.Label(frame, font=('Arial', 12, 'bold'), bg='white', anchor=tk.NW,
+                         justify=tk.LEFT, height=2, wraplength=700)
+        title.grid(row=0, column=0, columnspan=2, sticky='we')
+        info = tk.Label(frame, font=('Arial', 10), bg='white', fg='#666', anchor=tk.W)
+        info.grid(row=1, column=0, sticky='we', pady=(4, 0))
+        slot = len(self.rows)
+        button = ttk.Button(frame, text=self.action_text, command=lambda: self.select(slot))
+        button.grid(row=1, column=1, sticky=tk.E)
+        for widget in (frame, title, info):
+            self.bind_wheel(widget)
+
+        window = self.canvas.create_window(0, 0, window=frame, anchor="nw",
+                                           height=self.row_height - 10, state='hidden')
+        self.rows.append((window, frame, title, info, button))
+
+    def select(self, slot):
+        """Forward a row button press to on_select with the item it shows"""
+        index = self.bound.get(slot)
+        if index is not None and index < len(self.items):
+            self.on_select(self.items[index], index)
+
+    def refresh(self):
+        """Bind the row widgets to the items currently in view"""
+        height = max(self.canvas.winfo_height(), self.row_height)
+        width = max(self.canvas.winfo_width(), 200)
+        first = max(int(self.canvas.canvasy(0)) // self.row_height, 0)
+        needed = min(height // self.row_height + 2, len(self.items))
+
+        while len(self.rows) < needed:
+            self.make_row()
+
+        for slot, (window, frame, title, info, _) in enumerate(self.rows):
+            index = first + slot
+            if index >= len(self.items):
+                self.canvas.itemconfigure(window, state='hidden')
+                self.bound.pop(slot, None)
+                continue
+
+            self.canvas.coords(window, 5, index * self.row_height + 5)
+            self.canvas.itemconfigure(window, width=width - 10, state='normal')
+            title.configure(wraplength=width - 40)
+            # Only rewrite text for rows that now show a different item
+            if self.bound.get(slot) != index:
+                title_text, info_text = self.describe(self.items[index], index)
+                title.configure(text=title_text)
+                info.configure(text=info_text)
+                self.bound[slot] = index
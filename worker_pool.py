@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class WorkerPool:
+    """
+    WorkerPool Class - Fixed set of threads fed by a bounded queue
+
+    Unlike ThreadPoolExecutor, whose queue grows without limit, submit()
+    refuses work once max_queue tasks are waiting, so the server can turn
+    excess requests away at once instead of making every client wait
+    behind a backlog it will never clear.
+    """
+
+    def __init__(self, workers=32, max_queue=64, name='request'):
+        """
+        Constructor method - initializes the pool without starting threads
+
+        Args:
+            workers (int): Threads processing tasks
+            max_queue (int): Tasks allowed to wait for a free thread
+            name (str): Prefix of the worker thread names
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self.name = name
+        self.queue = deque()  # (future, function, args, enqueued_at)
+        self.condition = threading.Condition()
+        self.threads = []
+        self.stopped = False
+        self.busy = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.peak_queue = 0
+
+    def start(self):
+        """Start the worker threads"""
+        with self.condition:
+            if self.threads:
+                return
+            self.stopped = False
+            for number in range(self.workers):
+                thread = threading.Thread(target=self.run, name=f'{self.name}_{number}', daemon=True)
+                self.threads.append(thread)
+                thread.start()
+
+    def submit(self, function, *args, admit=True):
+        """
+        Queue a task for the next free worker
+
+        Args:
+            function (callable): Task to run
+            *args: Arguments passed to function
+            admit (bool): Apply admission control; False always queues the
+                task, for small internal work such as pushes that must not
+                be dropped
+
+        Returns:
+            concurrent.futures.Future: Resolves to the task's result, or
+            None if the queue is full or the pool is stopped
+        """
+        future = Future()
+        with self.condition:
+            if self.stopped:
+                return None
+            if admit and len(self.queue) >= self.max_queue:
+                self.rejected += 1
+                return None
+            self.queue.append((future, function, args, time.monotonic()))
+            self.peak_queue = max(self.peak_queue, len(self.queue))
+            self.condition.notify()
+        return future
+
+    def run(self):
+        """Worker loop: take the oldest task and run it"""
+        while True:
+            with self.condition:
+                while not self.queue and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                future, function, args, enqueued_at = self.queue.popleft()
+                waited = time.monotonic() - enqueued_at
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+                self.busy += 1
+
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(function(*args))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self.condition:
+                    self.busy -= 1
+                    self.completed += 1
+
+    def shutdown(self):
+        """Stop the workers; queued tasks are cancelled"""
+        with self.condition:
+            self.stopped = True
+            pending = list(self.queue)
+            self.queue.clear()
+            self.condition.notify_all()
+        for future, _, _, _ in pending:
+            future.cancel()
+
+    def stats(self):
+        """
+        Report pool load
+
+        Returns:
+            dict: Queue depth, busy workers, task counts and queue wait times
+        """
+        with self.condition:
+            started = self.completed + self.busy
+            return {
+                'workers': self.workers,
+                'busy': self.busy,
+                'queue_depth': len(self.queue),
+                'max_queue': self.max_queue,
+                'peak_queue': self.peak_queue,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(self.total_wait / started * 1000, 2) if started else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 2)
+            }